@@ -0,0 +1,290 @@
+"""An in-process registry of metrics, served at /metrics in the Prometheus text exposition format.
+
+Metrics are either instruments that the code updates as it runs (`Counter`, `Gauge` and `Histogram`, created with
+`registry.counter` etc) or collectors, functions that report the current value of some state (such as the hit counts
+of a cache) as `MetricFamily`s whenever the metrics are scraped (added with `registry.add_collector`).
+
+`MetricsMiddleware` records the latency and the number of database queries of every request, and collectors report the
+state of the database connections. The items app registers its own metrics in `items.metrics`.
+
+Each process keeps its own metrics, so a server running several worker processes needs to scrape each of them. They
+are only served if `METRICS_ENABLED` is set (as it is in debug mode), to staff users and clients whose address is in
+`METRICS_ALLOWED_IPS`.
+"""
+
+import threading
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.db import connections
+from django.http import Http404, HttpResponse
+
+# A metric and its samples, as reported by a collector. `type` is "counter", "gauge", "histogram" or "summary".
+MetricFamily = namedtuple("MetricFamily", ["name", "type", "help", "samples"])
+
+# One value of a metric (`name` includes any suffix such as "_bucket") with its labels, a dict
+Sample = namedtuple("Sample", ["name", "labels", "value"])
+
+# The most label combinations a metric records, beyond which new ones are recorded as "other", so that labels taken
+# from requests (eg GraphQL operation names) cannot grow the registry without bound
+MAX_SERIES = 1000
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class Metric:
+    """A metric whose values are recorded by label values."""
+
+    type = None
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} has the labels {self.labelnames}.")
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        if key not in self._values and len(self._values) >= MAX_SERIES:
+            key = ("other",) * len(self.labelnames)
+        return key
+
+    def collect(self):
+        """Return the metric's `MetricFamily`."""
+        with self._lock:
+            samples = [
+                sample
+                for key, value in sorted(self._values.items())
+                for sample in self._samples(dict(zip(self.labelnames, key)), value)
+            ]
+        return [MetricFamily(self.name, self.type, self.help, samples)]
+
+    def _samples(self, labels, value):
+        return [Sample(self.name, labels, value)]
+
+
+class Counter(Metric):
+    """A total that only increases."""
+
+    type = "counter"
+
+    def inc(self, amount=1, **labels):
+        with self._lock:
+            key = self._key(labels)
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    """A value that can go up and down."""
+
+    type = "gauge"
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(Metric):
+    """Counts of observed values in cumulative buckets, with their sum and count."""
+
+    type = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        with self._lock:
+            key = self._key(labels)
+            counts = self._values.get(key)
+            if counts is None:
+                # [count in each bucket, count in +Inf, sum]
+                counts = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+            else:
+                counts[len(self.buckets)] += 1
+            counts[-1] += value
+
+    def _samples(self, labels, counts):
+        samples, cumulative = [], 0
+        for bound, count in zip((*self.buckets, "+Inf"), counts):
+            cumulative += count
+            samples.append(
+                Sample(f"{self.name}_bucket", {**labels, "le": str(bound)}, cumulative)
+            )
+        samples.append(Sample(f"{self.name}_sum", labels, counts[-1]))
+        samples.append(Sample(f"{self.name}_count", labels, cumulative))
+        return samples
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (
+        (name, str(value).replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n"))
+        for name, value in labels.items()
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+class MetricsRegistry:
+    """The metrics and collectors of the process."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"A metric named {metric.name} is already registered.")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help, labelnames=()):
+        return self._register(Counter(name, help, labelnames))
+
+    def gauge(self, name, help, labelnames=()):
+        return self._register(Gauge(name, help, labelnames))
+
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, help, labelnames, buckets))
+
+    def add_collector(self, collector):
+        """Add a function that returns a list of `MetricFamily`s whenever the metrics are collected."""
+        with self._lock:
+            self._collectors.append(collector)
+
+    def collect(self):
+        """Return every `MetricFamily`, merging the samples of families with the same name."""
+        with self._lock:
+            sources = [metric.collect for metric in self._metrics.values()]
+            sources += self._collectors
+        families = {}
+        for source in sources:
+            for family in source():
+                if family.name in families:
+                    families[family.name].samples.extend(family.samples)
+                else:
+                    families[family.name] = family._replace(
+                        samples=list(family.samples)
+                    )
+        return list(families.values())
+
+    def expose(self):
+        """Return every metric in the Prometheus text exposition format."""
+        lines = []
+        for family in self.collect():
+            lines.append(f"# HELP {family.name} {family.help}")
+            lines.append(f"# TYPE {family.name} {family.type}")
+            for sample in family.samples:
+                lines.append(
+                    f"{sample.name}{_format_labels(sample.labels)} {sample.value}"
+                )
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+http_request_duration = registry.histogram(
+    "http_request_duration_seconds",
+    "The time taken to respond to each request.",
+    ["view", "method", "status"],
+)
+http_request_db_queries = registry.histogram(
+    "http_request_db_queries",
+    "The number of database queries made by each request.",
+    ["view"],
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200, 500),
+)
+
+
+def collect_connection_metrics():
+    """Report whether each database connection is open and, for pooled connections, the pool's statistics."""
+    open_samples, pool_families = [], {}
+    for connection in connections.all(initialized_only=True):
+        labels = {"alias": connection.alias}
+        open_samples.append(
+            Sample("db_connection_open", labels, int(connection.connection is not None))
+        )
+        pool = getattr(connection, "pool", None)
+        for stat, value in (pool.get_stats() if pool is not None else {}).items():
+            name = f"db_pool_{stat}"
+            family = pool_families.setdefault(
+                name,
+                MetricFamily(name, "gauge", f"The {stat} statistic of the pool.", []),
+            )
+            family.samples.append(Sample(name, labels, value))
+    return [
+        MetricFamily(
+            "db_connection_open",
+            "gauge",
+            "Whether each database connection of the process is open.",
+            open_samples,
+        ),
+        *pool_families.values(),
+    ]
+
+
+registry.add_collector(collect_connection_metrics)
+
+
+class CountQueries:
+    """A database execute wrapper that counts the queries it executes."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class MetricsMiddleware:
+    """Records the latency and number of database queries of every request, by the name of the view that handled it."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        queries = CountQueries()
+        start = time.perf_counter()
+        with connections["default"].execute_wrapper(queries):
+            response = self.get_response(request)
+        duration = time.perf_counter() - start
+
+        match = request.resolver_match
+        view = (match.url_name or match.view_name) if match else "unmatched"
+        http_request_duration.observe(
+            duration, view=view, method=request.method, status=response.status_code
+        )
+        http_request_db_queries.observe(queries.count, view=view)
+        return response
+
+
+def metrics_allowed(request):
+    """Return whether a request may read the metrics: if they are enabled, from a staff user or an allowed address."""
+    if not getattr(settings, "METRICS_ENABLED", settings.DEBUG):
+        return False
+    user = getattr(request, "user", None)
+    if user is not None and user.is_active and user.is_staff:
+        return True
+    return request.META.get("REMOTE_ADDR") in getattr(
+        settings, "METRICS_ALLOWED_IPS", ()
+    )
+
+
+def metrics_view(request):
+    """Serve every metric in the Prometheus text exposition format, or a 404 if the request may not read them (so
+    that disabled metrics look the same as forbidden ones)."""
+    if not metrics_allowed(request):
+        raise Http404()
+    return HttpResponse(registry.expose(), content_type="text/plain; version=0.0.4")
@@ -47,6 +47,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "backend.metrics.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "corsheaders.middleware.CorsMiddleware",
@@ -92,6 +93,26 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Set REDIS_URL to share the cache between processes, which the GraphQL response cache needs to invalidate responses
+# cached by other processes.
+
+if os.getenv("REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.getenv("REDIS_URL"),
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -134,6 +155,70 @@ STATIC_URL = "static/"
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 
+# Item hierarchy
+# "path" queries descendants with a prefix match on the materialized path stored on each item, "closure" joins against
+# the ItemClosure table, which is only maintained while selected (run `python manage.py check_item_tree --fix` after
+# switching to populate it) and "cte" follows the parent relationships with `WITH RECURSIVE` queries.
+
+ITEM_TREE_STRATEGY = os.getenv("ITEM_TREE_STRATEGY", "path")
+
+# The memory budget, in bytes, of the per-project hierarchy indexes that "cte" walks in Python on databases without
+# recursive queries, see items/tree_index.py.
+
+ITEM_TREE_INDEX_CACHE_BYTES = 32 * 1024 * 1024
+
+
+# GraphQL response cache
+# The alias of the cache in CACHES that query responses are cached in (for GRAPHQL_RESPONSE_CACHE_TIMEOUT seconds), or
+# unset to disable caching. Responses are invalidated by any write to the models they read, see items/response_cache.py.
+
+GRAPHQL_RESPONSE_CACHE = os.getenv("GRAPHQL_RESPONSE_CACHE")
+GRAPHQL_RESPONSE_CACHE_TIMEOUT = int(os.getenv("GRAPHQL_RESPONSE_CACHE_TIMEOUT", 300))
+
+# The number of parsed and validated query documents kept by each process, and the alias of the cache in CACHES that
+# persisted queries are stored in by their hash, see items/graphql/documents.py.
+
+GRAPHQL_DOCUMENT_CACHE_SIZE = 256
+GRAPHQL_PERSISTED_QUERY_CACHE = "default"
+
+# The deepest that an operation's fields may nest and the highest estimated cost (the number of objects it may
+# resolve, estimated from the stored counters cached for GRAPHQL_COST_COUNTS_TIMEOUT seconds) of any operation, see
+# items/graphql/cost.py.
+
+GRAPHQL_MAX_DEPTH = int(os.getenv("GRAPHQL_MAX_DEPTH", 10))
+GRAPHQL_MAX_COST = int(os.getenv("GRAPHQL_MAX_COST", 50000))
+GRAPHQL_COST_COUNTS_TIMEOUT = 60
+
+# Whether requests with the X-GraphQL-Tracing header get the timings of their fields in extensions.tracing, the
+# fraction of other requests traced for the percentiles served at /metrics, and the number of the most recent timings
+# of each field that those are calculated from, see items/graphql/tracing.py. Untraced requests run without any
+# per-field or per-query instrumentation.
+
+GRAPHQL_TRACING = DEBUG
+GRAPHQL_TRACING_SAMPLE_RATE = float(
+    os.getenv("GRAPHQL_TRACING_SAMPLE_RATE", 1 if DEBUG else 0.01)
+)
+GRAPHQL_TRACING_WINDOW_SIZE = 1000
+
+# Whether the metrics are served at /metrics, and the addresses (besides staff users) allowed to scrape them, see
+# backend/metrics.py.
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", str(DEBUG)).lower() in ("1", "true")
+METRICS_ALLOWED_IPS = [
+    ip.strip()
+    for ip in os.getenv("METRICS_ALLOWED_IPS", "127.0.0.1,::1").split(",")
+    if ip.strip()
+]
+
+# What the endpoint does with a field that makes the same shape of query for each object of a list (an N+1 query):
+# "raise" an error (as the tests do), "log" a warning for a GRAPHQL_NPLUSONE_SAMPLE_RATE fraction of requests, or
+# nothing if unset. See items/graphql/nplusone.py.
+
+GRAPHQL_NPLUSONE_DETECTION = os.getenv("GRAPHQL_NPLUSONE_DETECTION", "log")
+GRAPHQL_NPLUSONE_SAMPLE_RATE = float(os.getenv("GRAPHQL_NPLUSONE_SAMPLE_RATE", 0.01))
+GRAPHQL_NPLUSONE_THRESHOLD = 2
+
+
 # CORS Settings
 # https://pypi.org/project/django-cors-headers/
 
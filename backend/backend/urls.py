@@ -18,9 +18,10 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path
 from django.views.decorators.csrf import csrf_exempt
-from graphene_django.views import GraphQLView
 
+from backend.metrics import metrics_view
 from items.graphql.schema import schema
+from items.graphql.views import GraphQLView
 
 urlpatterns = [
     path("admin/", admin.site.urls),
@@ -29,4 +30,5 @@ urlpatterns = [
         csrf_exempt(GraphQLView.as_view(graphiql=True, schema=schema)),
         name="graphql",
     ),
+    path("metrics", metrics_view, name="metrics"),
 ]
@@ -0,0 +1,8 @@
+"""Benchmarks of the item hierarchy and the GraphQL API, against a generated hierarchy.
+
+Run `python -m benchmarks` from the backend directory to generate projects (in a transaction that is rolled back),
+time each of the benchmarks in `benchmarks.cases` and print the percentiles of their latencies and the number of queries
+they make. Pass `--baseline benchmarks/baseline.json` to fail if any benchmark makes more queries or is slower than the
+stored baseline, and `--save-baseline` to store new results. Latencies depend on the machine, so compare against a
+baseline measured on the same one.
+"""
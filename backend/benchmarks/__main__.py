@@ -0,0 +1,128 @@
+import argparse
+import os
+import sys
+
+
+def parse_args(args=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description=(
+            "Generate a hierarchy of items in a transaction that is rolled back afterwards, time reading and writing "
+            "it and compare the results against a baseline."
+        ),
+    )
+    parser.add_argument(
+        "--projects",
+        type=int,
+        default=2,
+        help="The number of projects to generate (default 2).",
+    )
+    parser.add_argument(
+        "--breadth",
+        type=int,
+        default=5,
+        help="The number of root items of each project and children of each item (default 5).",
+    )
+    parser.add_argument(
+        "--depth",
+        type=int,
+        default=4,
+        help="The number of levels of items in each project (default 4).",
+    )
+    parser.add_argument(
+        "--items",
+        type=int,
+        help="The most items to generate in each project.",
+    )
+    parser.add_argument(
+        "--iterations",
+        type=int,
+        default=50,
+        help="The number of timed calls of each benchmark (default 50).",
+    )
+    parser.add_argument(
+        "--benchmark",
+        action="append",
+        help="Only run the benchmark with this name (can be repeated).",
+    )
+    parser.add_argument(
+        "--baseline",
+        help="A baseline file to compare the results against, failing if any benchmark regressed.",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        help="The proportion by which a median can be slower than its baseline (default 0.25).",
+    )
+    parser.add_argument(
+        "--save-baseline",
+        help="Store the results in this baseline file.",
+    )
+    return parser.parse_args(args)
+
+
+def main(args=None):
+    options = parse_args(args)
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+
+    import django
+
+    django.setup()
+
+    from django.db import transaction
+
+    from benchmarks.cases import BENCHMARKS, get_dataset
+    from benchmarks.runner import (
+        DEFAULT_TOLERANCE,
+        compare,
+        format_results,
+        load_baseline,
+        run_benchmarks,
+        save_baseline,
+    )
+    from items.management.commands.generate_hierarchy import generate_project
+    from items.tree import get_tree_strategy
+
+    benchmarks = [
+        benchmark
+        for benchmark in BENCHMARKS
+        if not options.benchmark or benchmark.name in options.benchmark
+    ]
+    with transaction.atomic():
+        projects = [
+            generate_project(
+                f"benchmark {i + 1}", options.breadth, options.depth, options.items
+            )
+            for i in range(options.projects)
+        ]
+        results = run_benchmarks(benchmarks, get_dataset(projects), options.iterations)
+        transaction.set_rollback(True)
+
+    baseline = load_baseline(options.baseline) if options.baseline else None
+    print(
+        f"{options.projects} project(s) of {projects[0].num_descendants} item(s), "
+        f"{get_tree_strategy()} strategy, {options.iterations} iteration(s):"
+    )
+    print(format_results(results, baseline))
+
+    if options.save_baseline:
+        parameters = {
+            name: getattr(options, name)
+            for name in ("projects", "breadth", "depth", "items", "iterations")
+        }
+        parameters["strategy"] = get_tree_strategy()
+        save_baseline(options.save_baseline, results, parameters)
+    if baseline is not None:
+        tolerance = (
+            DEFAULT_TOLERANCE if options.tolerance is None else options.tolerance
+        )
+        regressions = compare(results, baseline, tolerance)
+        for name, message in regressions:
+            print(f"REGRESSION {name}: {message}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+"""The operations that are benchmarked, against a generated hierarchy (see `items.management.commands.generate_hierarchy`).
+
+Each `Benchmark` has a `setup` function that takes the `Dataset` and returns the function that is timed. Benchmarks
+that write run each iteration in a savepoint that is rolled back, so every iteration starts from the same data.
+"""
+
+import json
+from collections import namedtuple
+
+from django.db import transaction
+from django.test import RequestFactory
+
+from items.graphql.schema import schema
+from items.graphql.views import GraphQLView
+from items.models import Item
+
+# The generated projects, a root item of the first, its deepest item and a status to filter on
+Dataset = namedtuple("Dataset", ["projects", "root", "deep_item", "item_status"])
+
+Benchmark = namedtuple("Benchmark", ["name", "setup"])
+
+# The example query of the README, which the dashboard is based on
+README_QUERY = """
+{
+  projects {
+    name
+    children {
+      title
+      itemType { name }
+      itemStatus { name }
+      itemLocation { name }
+      numChildren
+    }
+  }
+}
+"""
+
+ITEMS_LIST_QUERY = """
+query ListItems($filters: ItemFilterInput) {
+  itemsConnection(first: 100, filters: $filters) {
+    totalCount
+    edges { node { id title itemType { name } itemStatus { name } numChildren } }
+  }
+}
+"""
+
+# The frontend's autosave of a field of the item detail page
+UPDATE_ITEM_MUTATION = """
+mutation UpdateItem($id: ID!, $input: UpdateItemInput!) {
+  updateItem(id: $id, input: $input) {
+    item { id }
+  }
+}
+"""
+
+CREATE_ITEM_MUTATION = """
+mutation CreateItem($input: CreateItemInput!) {
+  createItem(input: $input) {
+    item { id numAncestors }
+  }
+}
+"""
+
+_request_factory = RequestFactory()
+_graphql_view = GraphQLView.as_view(schema=schema)
+
+
+def execute_graphql(query, variables=None):
+    """Post a query to the GraphQL view (without the request middleware) and return its data, failing on any errors."""
+    request = _request_factory.post(
+        "/graphql/",
+        json.dumps({"query": query, "variables": variables or {}}),
+        content_type="application/json",
+    )
+    response = _graphql_view(request)
+    result = json.loads(response.content)
+    if response.status_code != 200 or result.get("errors"):
+        raise AssertionError(f"The query failed: {result.get('errors')}")
+    return result["data"]
+
+
+def rolled_back(function):
+    """Wrap a function that writes so that each call runs in a savepoint that is rolled back."""
+
+    def call():
+        with transaction.atomic():
+            function()
+            transaction.set_rollback(True)
+
+    return call
+
+
+def _update_item(data):
+    variables = {"id": data.deep_item.id, "input": {"title": "autosaved title"}}
+    return rolled_back(lambda: execute_graphql(UPDATE_ITEM_MUTATION, variables))
+
+
+def _create_item(data):
+    project = data.root.project
+    variables = {
+        "input": {
+            "title": "created item",
+            "project": project.id,
+            "parent": data.root.id,
+            "itemType": data.root.item_type_id,
+            "itemStatus": data.item_status.id,
+            "itemLocation": data.root.item_location_id,
+        }
+    }
+    return rolled_back(lambda: execute_graphql(CREATE_ITEM_MUTATION, variables))
+
+
+BENCHMARKS = [
+    Benchmark("ancestors", lambda data: lambda: list(data.deep_item.get_ancestors())),
+    Benchmark("descendants", lambda data: lambda: list(data.root.get_descendants())),
+    Benchmark(
+        "filtered count",
+        lambda data: lambda: data.root.project.get_num_descendants(
+            item_status=data.item_status.id, title_contains="1"
+        ),
+    ),
+    Benchmark(
+        "items list",
+        lambda data: lambda: execute_graphql(
+            ITEMS_LIST_QUERY, {"filters": {"project": data.root.project_id}}
+        ),
+    ),
+    Benchmark("README query", lambda data: lambda: execute_graphql(README_QUERY)),
+    Benchmark("updateItem mutation", _update_item),
+    Benchmark("createItem mutation", _create_item),
+]
+
+
+def get_dataset(projects):
+    """Return the `Dataset` of some generated projects."""
+    root = (
+        Item.objects.filter(project=projects[0], parent=None)
+        .select_related("project")
+        .order_by("id")
+        .first()
+    )
+    deep_item = Item.objects.filter(project=projects[0]).order_by("-depth", "id")[0]
+    return Dataset(
+        projects, root, deep_item, projects[0].get_item_statuses().order_by("id")[0]
+    )
@@ -0,0 +1,424 @@
+"""A load generator replaying the frontend's GraphQL traffic against a running backend.
+
+Run `python -m benchmarks.load --url http://localhost:8000/graphql/ --concurrency 20 --duration 60` to send a weighted
+mix of the queries and mutations the frontend makes (see `OPERATIONS`) from that many concurrent clients, each sending
+its next request as soon as the last one is answered, and print the throughput, latency percentiles and error rate of
+each operation. It only needs the standard library (each client keeps one HTTP/1.1 connection open with asyncio), so it
+can be run from anywhere that can reach the backend, without Django.
+
+The items are picked from the first page of `itemsConnection`, so run it against a generated hierarchy (see the
+`generate_hierarchy` command). The autosave mutation writes each item's title back unchanged.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import ssl
+import sys
+import time
+from collections import namedtuple
+from urllib.parse import urlsplit
+
+# The dashboard's list of projects and their root items
+DASHBOARD_QUERY = """
+query GetProjects {
+  projects {
+    id
+    name
+    children {
+      id
+      title
+    }
+  }
+}
+"""
+
+# The item detail page
+ITEM_DETAIL_QUERY = """
+query GetItem($id: ID!) {
+  item(id: $id) {
+    id
+    itemType { id name }
+    itemStatus { id name }
+    title
+    changelog
+    requirements
+    outcome
+    project { id name }
+    parent { id itemType { id name } itemStatus { id name } title numChildren }
+    children { id itemType { id name } itemStatus { id name } title numChildren }
+  }
+}
+"""
+
+# The breadcrumbs of the item detail page
+BREADCRUMBS_QUERY = """
+query GetBreadcrumbs($id: ID!) {
+  item(id: $id) {
+    id
+    title
+    project { id name }
+    ancestors { id title siblings { id title } }
+    siblings { id title }
+    children { id title }
+  }
+  projects { id name }
+}
+"""
+
+# The autosave of a field of the item detail page
+UPDATE_ITEM_MUTATION = """
+mutation UpdateItem($id: ID!, $input: UpdateItemInput!) {
+  updateItem(id: $id, input: $input) {
+    item { id }
+  }
+}
+"""
+
+ITEMS_QUERY = """
+query ListItems {
+  itemsConnection(first: 100) {
+    edges { node { id title } }
+  }
+}
+"""
+
+# An operation of the mix: its relative weight and a function of an item (id, title) returning its query and variables
+Operation = namedtuple("Operation", ["weight", "request"])
+
+OPERATIONS = {
+    "dashboard": Operation(40, lambda item: (DASHBOARD_QUERY, {})),
+    "item detail": Operation(25, lambda item: (ITEM_DETAIL_QUERY, {"id": item[0]})),
+    "breadcrumbs": Operation(20, lambda item: (BREADCRUMBS_QUERY, {"id": item[0]})),
+    "autosave": Operation(
+        15,
+        lambda item: (
+            UPDATE_ITEM_MUTATION,
+            {"id": item[0], "input": {"title": item[1]}},
+        ),
+    ),
+}
+
+# The percentiles reported for each operation
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+class HttpConnection:
+    """A minimal HTTP/1.1 client connection, kept open between requests."""
+
+    def __init__(self, url, timeout):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or (443 if parts.scheme == "https" else 80)
+        self.ssl = ssl.create_default_context() if parts.scheme == "https" else None
+        self.path = parts.path or "/"
+        self.host_header = parts.netloc
+        self.timeout = timeout
+        self.reader = self.writer = None
+
+    async def post_json(self, data):
+        """Post a JSON body and return the status and body of the response, reconnecting if the connection closed."""
+        body = json.dumps(data).encode()
+        request = (
+            f"POST {self.path} HTTP/1.1\r\n"
+            f"Host: {self.host_header}\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "\r\n"
+        ).encode() + body
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.wait_for(
+                asyncio.open_connection(self.host, self.port, ssl=self.ssl),
+                self.timeout,
+            )
+        try:
+            self.writer.write(request)
+            await self.writer.drain()
+            return await asyncio.wait_for(self._read_response(), self.timeout)
+        except BaseException:
+            self.close()
+            raise
+
+    async def _read_response(self):
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionError("The server closed the connection.")
+        status = int(status_line.split()[1])
+        headers = {}
+        while (line := await self.reader.readline()) not in (b"\r\n", b"\n", b""):
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while size := int((await self.reader.readline()).split(b";")[0], 16):
+                chunks.append(await self.reader.readexactly(size))
+                await self.reader.readline()
+            await self.reader.readline()
+            body = b"".join(chunks)
+        elif "content-length" in headers:
+            body = await self.reader.readexactly(int(headers["content-length"]))
+        else:
+            body = await self.reader.read()
+            headers["connection"] = "close"
+
+        if headers.get("connection", "").lower() == "close":
+            self.close()
+        return status, body
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.reader = self.writer = None
+
+
+class OperationStats:
+    """The latencies and errors of one operation."""
+
+    def __init__(self):
+        self.durations = []
+        self.errors = 0
+        self.error_messages = {}
+
+    def add_error(self, message):
+        self.errors += 1
+        self.error_messages[message] = self.error_messages.get(message, 0) + 1
+
+
+def get_error(status, body):
+    """Return the error of a GraphQL response, or None if it succeeded."""
+    if status != 200:
+        return f"HTTP {status}"
+    try:
+        result = json.loads(body)
+    except ValueError:
+        return "Invalid JSON"
+    if result.get("errors"):
+        return result["errors"][0].get("message", "GraphQL error")
+    return None
+
+
+async def get_items(url, timeout):
+    """Return the (id, title)s of the first page of items, to request the detail of and autosave."""
+    connection = HttpConnection(url, timeout)
+    try:
+        status, body = await connection.post_json({"query": ITEMS_QUERY})
+    finally:
+        connection.close()
+    error = get_error(status, body)
+    if error:
+        raise RuntimeError(f"Could not list the items: {error}")
+    edges = json.loads(body)["data"]["itemsConnection"]["edges"]
+    return [(edge["node"]["id"], edge["node"]["title"]) for edge in edges]
+
+
+async def run_client(url, timeout, items, operations, deadline, stats, rng):
+    """Send operations picked from the weighted mix, one at a time, until the deadline."""
+    connection = HttpConnection(url, timeout)
+    names = list(operations)
+    weights = [operations[name].weight for name in names]
+    try:
+        while time.perf_counter() < deadline:
+            name = rng.choices(names, weights)[0]
+            query, variables = operations[name].request(rng.choice(items))
+            start = time.perf_counter()
+            try:
+                status, body = await connection.post_json(
+                    {"query": query, "variables": variables, "operationName": None}
+                )
+                error = get_error(status, body)
+            except (
+                OSError,
+                EOFError,  # A connection closed part way through a response
+                asyncio.IncompleteReadError,
+                asyncio.TimeoutError,
+                ValueError,
+                IndexError,
+            ) as e:
+                error = type(e).__name__
+            stats[name].durations.append(time.perf_counter() - start)
+            if error:
+                stats[name].add_error(error)
+    finally:
+        connection.close()
+
+
+async def run_load(url, concurrency, duration, timeout=30, seed=None, operations=None):
+    """Replay the mix of operations from `concurrency` clients for `duration` seconds and return the
+    `OperationStats` of each operation, by name, and the time taken."""
+    operations = operations or OPERATIONS
+    items = await get_items(url, timeout)
+    if not items:
+        raise RuntimeError("There are no items, generate some with generate_hierarchy.")
+    rng = random.Random(seed)
+    stats = {name: OperationStats() for name in operations}
+    start = time.perf_counter()
+    deadline = start + duration
+    await asyncio.gather(
+        *(
+            run_client(
+                url,
+                timeout,
+                items,
+                operations,
+                deadline,
+                stats,
+                random.Random(rng.random()),
+            )
+            for _ in range(concurrency)
+        )
+    )
+    return stats, time.perf_counter() - start
+
+
+def summarize(stats, elapsed):
+    """Return the throughput, latency percentiles (in milliseconds) and error rate of each operation and in total."""
+    summary = {}
+    all_durations, all_errors = [], 0
+    for name, operation_stats in [*stats.items(), ("total", None)]:
+        if operation_stats is None:
+            durations, errors = all_durations, all_errors
+        else:
+            durations, errors = operation_stats.durations, operation_stats.errors
+            all_durations += durations
+            all_errors += errors
+        durations = sorted(durations)
+        result = {
+            "requests": len(durations),
+            "throughput": round(len(durations) / elapsed, 2) if elapsed else 0,
+            "error_rate": round(errors / len(durations), 4) if durations else 0,
+        }
+        for quantile in (*QUANTILES, 1):
+            key = "max_ms" if quantile == 1 else f"p{int(quantile * 100)}_ms"
+            result[key] = (
+                round(
+                    durations[min(int(quantile * len(durations)), len(durations) - 1)]
+                    * 1000,
+                    3,
+                )
+                if durations
+                else None
+            )
+        summary[name] = result
+    return summary
+
+
+def format_summary(summary):
+    """Return the summary as a table."""
+    lines = [
+        f"{'operation':<14}{'requests':>10}{'req/s':>10}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}"
+        f"{'errors':>9}"
+    ]
+    for name, result in summary.items():
+        latencies = "".join(
+            f"{'-' if result[key] is None else format(result[key], '.1f'):>10}"
+            for key in ("p50_ms", "p90_ms", "p99_ms", "max_ms")
+        )
+        lines.append(
+            f"{name:<14}{result['requests']:>10}{result['throughput']:>10.1f}{latencies}"
+            f"{result['error_rate']:>8.1%}"
+        )
+    return "\n".join(lines)
+
+
+def parse_weight(value):
+    """Parse an `OPERATION=WEIGHT` argument into the operation's name and its (non-negative) weight."""
+    name, _, weight = value.rpartition("=")
+    if name not in OPERATIONS:
+        raise argparse.ArgumentTypeError(
+            f"unknown operation {name!r}, choose from {', '.join(OPERATIONS)}"
+        )
+    try:
+        weight = float(weight)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid weight {weight!r} for {name!r}")
+    if not 0 <= weight < float("inf"):
+        raise argparse.ArgumentTypeError(
+            f"the weight of {name!r} must be a non-negative number"
+        )
+    return name, weight
+
+
+def parse_args(args=None):
+    """Parse the command line arguments, with the weighted mix of operations to replay as `operations`."""
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.load",
+        description="Replay a weighted mix of the frontend's GraphQL operations against a running backend.",
+    )
+    parser.add_argument(
+        "--url",
+        default="http://localhost:8000/graphql/",
+        help="The URL of the GraphQL endpoint (default http://localhost:8000/graphql/).",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=10,
+        help="The number of clients sending requests at once (default 10).",
+    )
+    parser.add_argument(
+        "--duration",
+        type=float,
+        default=30,
+        help="The number of seconds to send requests for (default 30).",
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=30,
+        help="The number of seconds to wait for each response (default 30).",
+    )
+    parser.add_argument(
+        "--weight",
+        action="append",
+        type=parse_weight,
+        default=[],
+        metavar="OPERATION=WEIGHT",
+        help=f"Change the weight of an operation of the mix ({', '.join(OPERATIONS)}), can be repeated.",
+    )
+    parser.add_argument(
+        "--seed", type=int, help="Seed the choice of operations and items."
+    )
+    parser.add_argument("--json", help="Also write the summary to this JSON file.")
+    options = parser.parse_args(args)
+
+    operations = dict(OPERATIONS)
+    for name, weight in options.weight:
+        operations[name] = operations[name]._replace(weight=weight)
+    options.operations = {
+        name: operation for name, operation in operations.items() if operation.weight
+    }
+    if not options.operations:
+        parser.error("--weight: at least one operation must have a weight above 0")
+    return options
+
+
+def main(args=None):
+    options = parse_args(args)
+
+    stats, elapsed = asyncio.run(
+        run_load(
+            options.url,
+            options.concurrency,
+            options.duration,
+            options.timeout,
+            options.seed,
+            options.operations,
+        )
+    )
+    summary = summarize(stats, elapsed)
+    print(f"{options.concurrency} client(s) for {elapsed:.1f}s against {options.url}:")
+    print(format_summary(summary))
+    for name, operation_stats in stats.items():
+        for message, count in sorted(operation_stats.error_messages.items()):
+            print(f"{name}: {count} x {message}")
+    if options.json:
+        with open(options.json, "w") as file:
+            json.dump(summary, file, indent=2)
+            file.write("\n")
+    return 1 if summary["total"]["error_rate"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
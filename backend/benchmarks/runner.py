@@ -0,0 +1,110 @@
+"""Timing the benchmarks, and comparing their results against a baseline."""
+
+import json
+import time
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+# The percentiles reported for each benchmark
+QUANTILES = (0.5, 0.9, 0.99)
+
+# The default proportion by which a benchmark's median can be slower than its baseline before it is a regression
+DEFAULT_TOLERANCE = 0.25
+
+
+def percentile(durations, quantile):
+    """Return the duration at a quantile of a sorted list of durations."""
+    return durations[min(int(quantile * len(durations)), len(durations) - 1)]
+
+
+def measure(function, iterations, warmup=1):
+    """Time calls of a function, after `warmup` untimed calls, and return its percentiles (in milliseconds) and the
+    number of queries each call makes."""
+    for _ in range(warmup):
+        function()
+    durations = []
+    for _ in range(iterations):
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            function()
+            durations.append(time.perf_counter() - start)
+    durations.sort()
+    result = {
+        f"p{int(quantile * 100)}_ms": round(percentile(durations, quantile) * 1000, 3)
+        for quantile in QUANTILES
+    }
+    result["queries"] = len(queries)
+    return result
+
+
+def run_benchmarks(benchmarks, dataset, iterations, warmup=1):
+    """Return the results of each benchmark against a dataset, by name."""
+    return {
+        benchmark.name: measure(benchmark.setup(dataset), iterations, warmup)
+        for benchmark in benchmarks
+    }
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """Return a list of `(name, message)`s of the benchmarks that regressed from the baseline results.
+
+    A benchmark regresses if it makes more queries than its baseline, or if its median is more than `tolerance` slower.
+    """
+    regressions = []
+    for name, result in results.items():
+        expected = baseline.get(name)
+        if expected is None:
+            continue
+        if result["queries"] > expected["queries"]:
+            regressions.append(
+                (
+                    name,
+                    f"{result['queries']} queries, up from {expected['queries']}",
+                )
+            )
+        if result["p50_ms"] > expected["p50_ms"] * (1 + tolerance):
+            regressions.append(
+                (
+                    name,
+                    f"a median of {result['p50_ms']:.3f}ms, up from {expected['p50_ms']:.3f}ms",
+                )
+            )
+    return regressions
+
+
+def format_results(results, baseline=None):
+    """Return the results as a table, with the change in each median from the baseline if there is one."""
+    lines = [
+        f"{'benchmark':<24}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'queries':>9}"
+        + (f"{'vs baseline':>13}" if baseline else "")
+    ]
+    for name, result in results.items():
+        line = (
+            f"{name:<24}{result['p50_ms']:>10.3f}{result['p90_ms']:>10.3f}{result['p99_ms']:>10.3f}"
+            f"{result['queries']:>9}"
+        )
+        expected = (baseline or {}).get(name)
+        if expected:
+            change = (result["p50_ms"] / expected["p50_ms"] - 1) * 100
+            line += f"{change:>+12.1f}%"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def load_baseline(path):
+    """Return the results stored in a baseline file, as saved by `save_baseline`."""
+    with open(path) as file:
+        return json.load(file)["results"]
+
+
+def save_baseline(path, results, parameters):
+    """Store the results, with the parameters they were measured with, in a baseline file."""
+    with open(path, "w") as file:
+        json.dump(
+            {"parameters": parameters, "results": results},
+            file,
+            indent=2,
+            sort_keys=True,
+        )
+        file.write("\n")
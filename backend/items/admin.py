@@ -1,4 +1,6 @@
 from django.contrib import admin
+from django.db import transaction
+from django.db.models import F
 from django.urls import reverse
 from django.utils.html import format_html
 
@@ -57,13 +59,13 @@ class ProjectAdmin(admin.ModelAdmin):
     )
     inlines = [ItemTypeInline, ItemStatusInline, ItemLocationInline]
 
+    @admin.display(description="Descendants count", ordering="num_descendants")
     def descendants_count(self, obj):
         """Return an html a tag linking to an Item page filter view for all items belonging to a project."""
         item_list_url = reverse("admin:items_item_changelist")
         filtered_item_list_url = f"{item_list_url}?project__id={obj.id}"
-        num_descendants = obj.get_num_descendants()
         return format_html(
-            '<a href="{}">{}</a>', filtered_item_list_url, num_descendants
+            '<a href="{}">{}</a>', filtered_item_list_url, obj.num_descendants
         )
 
 
@@ -162,6 +164,26 @@ class ItemAdmin(admin.ModelAdmin):
             )
         return format_html(" / ".join(ancestor_links))
 
+    def delete_queryset(self, request, queryset):
+        """Delete the selected items (and, by cascade, their descendants), then rebuild the counters of their projects.
+
+        `QuerySet.delete` deletes the items without `Item.delete`, so the counters of the projects (locked first, so
+        that no item writes change them meanwhile) are rebuilt and their `tree_version`s bumped in the same transaction.
+        """
+        with transaction.atomic():
+            projects = list(
+                Project.objects.select_for_update()
+                .filter(id__in=queryset.values("project_id"))
+                .order_by("id")
+                .only(*Project.MAINTAINED_FIELDS)
+            )
+            super().delete_queryset(request, queryset)
+            for project in projects:
+                project.rebuild_counters()
+            Project.objects.filter(id__in=[project.id for project in projects]).update(
+                tree_version=F("tree_version") + 1
+            )
+
     def get_readonly_fields(self, request, obj=None):
         # Project can be set on creation, but is readonly once set
         if obj:
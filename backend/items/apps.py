@@ -6,4 +6,5 @@ class ItemsConfig(AppConfig):
     name = "items"
 
     def ready(self):
+        import items.metrics
         import items.signals
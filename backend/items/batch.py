@@ -0,0 +1,416 @@
+"""Create, update and delete many `Item`s (or create many `Project`s) in one transaction.
+
+Saving items one at a time costs several queries each for validation, the materialized paths, the closure table and
+the stored counters. An `ItemBatch` instead locks the affected projects and loads their attribute sets and items once,
+validates every row in memory (see `items.validation`), then writes with bulk queries and recomputes the paths and
+counters of those projects from the loaded items. Similarly a `ProjectBatch` inserts its projects and their default
+attributes with one query per model.
+
+Batches are all or nothing: if any row is invalid nothing is written and the errors of every invalid row are returned.
+"""
+
+from collections import defaultdict
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+from items.mixins import CounterMixin
+from items.models import (
+    Item,
+    ItemClosure,
+    ItemLocation,
+    ItemStatus,
+    ItemType,
+    Project,
+)
+from items.response_cache import invalidate_responses
+from items.tree import (
+    build_closure,
+    build_counts,
+    build_paths,
+    get_tree_strategy,
+    split_path,
+)
+from items.validation import (
+    ItemValidationContext,
+    invalidate_validation_context,
+    validate_item,
+)
+
+# The most rows that can be written in one batch
+MAX_BATCH_SIZE = 1000
+
+# The input fields that hold the id of a related object
+RELATED_FIELDS = ("project", "parent", "item_type", "item_status", "item_location")
+
+# The columns loaded for every item of the affected projects
+TREE_FIELDS = (
+    "project",
+    "parent",
+    "item_type",
+    "item_status",
+    "path",
+    "depth",
+    "item_type_order",
+    *CounterMixin.COUNTER_FIELDS,
+)
+
+
+def _parse_id(value):
+    """Return an id from a GraphQL `ID` input, raising a `ValidationError` if it is not one."""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValidationError(_(f"{value!r} is not a valid id."))
+
+
+class Batch:
+    """The base for writing a batch of rows, collecting the errors of any invalid rows.
+
+    Attributes:
+        errors (list): The `(index, id, messages)` of each invalid row.
+    """
+
+    def __init__(self):
+        self.errors = []
+
+    def _check_size(self, rows):
+        if len(rows) > MAX_BATCH_SIZE:
+            raise ValidationError(
+                _(f"A batch can contain at most {MAX_BATCH_SIZE} rows.")
+            )
+
+    def _add_error(self, index, id, error):
+        self.errors.append((index, id, error.messages))
+
+
+class ProjectBatch(Batch):
+    """Validates and creates a batch of `Project`s along with their default item attributes."""
+
+    def create(self, inputs):
+        """Create a project from each `CreateProjectInput`, returning the created projects (none if any were invalid)."""
+        self._check_size(inputs)
+        projects = []
+        for index, input in enumerate(inputs):
+            project = Project(**input)
+            try:
+                project.clean_fields()
+                project.clean()
+            except ValidationError as e:
+                self._add_error(index, None, e)
+            projects.append(project)
+        if self.errors:
+            return []
+
+        with transaction.atomic():
+            Project.objects.bulk_create(projects, batch_size=1000)
+            for model in (ItemType, ItemStatus, ItemLocation):
+                model.create_default_options(projects)
+        invalidate_responses(Project)
+        return projects
+
+
+class ItemBatch(Batch):
+    """Validates and writes a batch of `Item` changes, collecting the errors of any invalid rows."""
+
+    def __init__(self):
+        super().__init__()
+        self.projects = {}  # {project_id: Project, ...}
+        self.contexts = {}  # {project_id: ItemValidationContext, ...}
+
+    def _load_projects(self, project_ids):
+        """Lock some projects and load their attribute sets and items."""
+        self.projects = {
+            project.id: project
+            for project in Project.objects.select_for_update()
+            .filter(id__in=project_ids)
+            .order_by("id")
+            .only(*Project.MAINTAINED_FIELDS)
+        }
+        item_types = defaultdict(dict)
+        for item_type in ItemType.objects.filter(project_id__in=self.projects):
+            item_types[item_type.project_id][item_type.id] = item_type
+        item_status_ids = defaultdict(set)
+        for project_id, id in ItemStatus.objects.filter(
+            project_id__in=self.projects
+        ).values_list("project_id", "id"):
+            item_status_ids[project_id].add(id)
+        item_location_ids = defaultdict(set)
+        for project_id, id in ItemLocation.objects.filter(
+            project_id__in=self.projects
+        ).values_list("project_id", "id"):
+            item_location_ids[project_id].add(id)
+        items = defaultdict(dict)
+        for item in (
+            Item.objects.filter(project_id__in=self.projects)
+            .order_by()
+            .only(*TREE_FIELDS)
+        ):
+            items[item.project_id][item.id] = item
+
+        self.contexts = {
+            project_id: ItemValidationContext(
+                item_types[project_id],
+                item_status_ids[project_id],
+                item_location_ids[project_id],
+                items[project_id],
+            )
+            for project_id in self.projects
+        }
+
+    def _apply_input(self, item, input):
+        """Set the fields of an item from a create or update input, returning the names of the fields set."""
+        field_names = []
+        for name, value in input.items():
+            if name in RELATED_FIELDS:
+                setattr(item, f"{name}_id", None if value is None else _parse_id(value))
+            else:
+                setattr(item, name, "" if value is None else value)
+            field_names.append(name)
+        return field_names
+
+    def _validate(self, item):
+        """Validate an item's fields (as `full_clean` would, without querying its relations) and its project's rules."""
+        context = self.contexts.get(item.project_id)
+        if context is None:
+            raise ValidationError(_("Project does not exist."))
+        item.clean_fields(exclude=RELATED_FIELDS)
+        validate_item(item, context)
+
+    def _update_paths(self, project_ids):
+        """Recompute the materialized paths of the loaded items and return those that changed."""
+        changed = []
+        for project_id in project_ids:
+            items = self.contexts[project_id].items
+            paths = build_paths({id: item.parent_id for id, item in items.items()})
+            for id, (path, depth) in paths.items():
+                item = items[id]
+                if (item.path, item.depth) != (path, depth):
+                    item.path, item.depth = path, depth
+                    changed.append(item)
+        return changed
+
+    def _update_counters(self):
+        """Recompute the stored counters of the loaded projects and items, save those that changed and bump the versions."""
+        fields = CounterMixin.COUNTER_FIELDS
+        changed = []
+        for project_id, context in self.contexts.items():
+            expected = build_counts(
+                [
+                    (item.id, item.path, item.item_status_id)
+                    for item in context.items.values()
+                ]
+            )
+            for key, obj in [
+                (None, self.projects[project_id]),
+                *context.items.items(),
+            ]:
+                if tuple(getattr(obj, field) for field in fields) != expected[key]:
+                    for field, value in zip(fields, expected[key]):
+                        setattr(obj, field, value)
+                    changed.append(obj)
+        for project in self.projects.values():
+            project.tree_version += 1
+        Project.objects.bulk_update(
+            self.projects.values(), Project.MAINTAINED_FIELDS, batch_size=1000
+        )
+        Item.objects.bulk_update(
+            [obj for obj in changed if isinstance(obj, Item)],
+            fields,
+            batch_size=1000,
+        )
+
+    def _invalidate_contexts(self):
+        """Remove the cached validation contexts of the loaded projects and any cached responses, as bulk writes do not send
+        signals."""
+        for project_id in self.projects:
+            invalidate_validation_context(project_id)
+        invalidate_responses(Item)
+
+    def create(self, inputs):
+        """Create an item from each `CreateItemInput`, returning the created items (none if any were invalid)."""
+        self._check_size(inputs)
+        project_ids = set()
+        for input in inputs:
+            try:
+                project_ids.add(_parse_id(input.get("project")))
+            except ValidationError:
+                pass  # Reported when the row is validated
+
+        with transaction.atomic():
+            self._load_projects(project_ids)
+            items = []
+            for index, input in enumerate(inputs):
+                item = Item()
+                try:
+                    self._apply_input(item, input)
+                    self._validate(item)
+                except ValidationError as e:
+                    self._add_error(index, None, e)
+                    continue
+                items.append(item)
+            if self.errors:
+                return []
+
+            for item in items:
+                context = self.contexts[item.project_id]
+                if item.parent_id:
+                    parent = context.items[item.parent_id]
+                    item.path = f"{parent.path}{parent.id}/"
+                    item.depth = parent.depth + 1
+                item.item_type_order = context.item_types[item.item_type_id].order
+            Item.objects.bulk_create(items, batch_size=1000)
+
+            for item in items:
+                item._original_project_id = item.project_id
+                item._original_parent_id = item.parent_id
+                item._original_item_status_id = item.item_status_id
+                item._original_item_type_id = item.item_type_id
+                self.contexts[item.project_id].items[item.id] = item
+            if get_tree_strategy() == "closure":
+                ItemClosure.objects.bulk_create(
+                    (
+                        ItemClosure(
+                            ancestor_id=ancestor_id,
+                            descendant_id=descendant_id,
+                            depth=depth,
+                        )
+                        for item in items
+                        for ancestor_id, descendant_id, depth in build_closure(
+                            item.id, item.path
+                        )
+                    ),
+                    batch_size=1000,
+                )
+            self._update_counters()
+            self._invalidate_contexts()
+        return items
+
+    def update(self, rows):
+        """Apply each `(id, UpdateItemInput)` row, returning the updated items (none if any were invalid)."""
+        self._check_size(rows)
+        ids = []
+        for index, (id, _input) in enumerate(rows):
+            try:
+                ids.append(_parse_id(id))
+            except ValidationError as e:
+                self._add_error(index, id, e)
+        if self.errors:
+            return []
+
+        with transaction.atomic():
+            self._load_projects(
+                set(
+                    Item.objects.filter(id__in=ids).values_list("project_id", flat=True)
+                )
+            )
+            # Load the updated items in full and use them in place of the loaded items, so that every row is
+            # validated against the batch's changes to the others
+            items = Item.objects.in_bulk(ids)
+            for item in items.values():
+                self.contexts[item.project_id].items[item.id] = item
+
+            field_names = {"updated_at", "item_type_order"}
+            parents_changed = set()
+            for index, (id, input) in enumerate(rows):
+                item = items.get(ids[index])
+                if item is None:
+                    self._add_error(
+                        index, id, ValidationError(_("Item does not exist."))
+                    )
+                    continue
+                try:
+                    field_names.update(self._apply_input(item, input))
+                except ValidationError as e:
+                    self._add_error(index, id, e)
+                if item.parent_id != item._original_parent_id:
+                    parents_changed.add(item.project_id)
+
+            invalid = {index for index, _id, _messages in self.errors}
+            for index, id in enumerate(ids):
+                item = items.get(id)
+                if item is not None and index not in invalid:
+                    try:
+                        self._validate(item)
+                    except ValidationError as e:
+                        self._add_error(index, rows[index][0], e)
+            if self.errors:
+                self.errors.sort(key=lambda error: error[0])
+                return []
+
+            now = timezone.now()
+            for item in items.values():
+                item.updated_at = now
+                item.item_type_order = (
+                    self.contexts[item.project_id].item_types[item.item_type_id].order
+                )
+            moved = self._update_paths(parents_changed)
+            if parents_changed:
+                field_names.update(("path", "depth"))
+            Item.objects.bulk_update(items.values(), field_names, batch_size=1000)
+            Item.objects.bulk_update(
+                [item for item in moved if item.id not in items],
+                ["path", "depth"],
+                batch_size=1000,
+            )
+
+            if get_tree_strategy() == "closure":
+                # Relink each moved subtree, shallowest first, so that the new parent of each has already been relinked
+                # and no longer lies inside the subtree of any root still to be moved
+                for item in sorted(
+                    (
+                        item
+                        for item in items.values()
+                        if item.parent_id != item._original_parent_id
+                    ),
+                    key=lambda item: (item.depth, item.id),
+                ):
+                    ItemClosure.objects.move_subtree(item)
+            self._update_counters()
+            self._invalidate_contexts()
+
+            for item in items.values():
+                item._original_parent_id = item.parent_id
+                item._original_item_status_id = item.item_status_id
+                item._original_item_type_id = item.item_type_id
+        return [items[id] for id in ids]
+
+    def delete(self, ids):
+        """Delete the items (and their descendants) with some ids, returning the ids (none if any were invalid)."""
+        self._check_size(ids)
+        parsed_ids = []
+        for index, id in enumerate(ids):
+            try:
+                parsed_ids.append(_parse_id(id))
+            except ValidationError as e:
+                self._add_error(index, id, e)
+        if self.errors:
+            return []
+
+        with transaction.atomic():
+            project_ids = dict(
+                Item.objects.filter(id__in=parsed_ids).values_list("id", "project_id")
+            )
+            for index, id in enumerate(parsed_ids):
+                if id not in project_ids:
+                    self._add_error(
+                        index, ids[index], ValidationError(_("Item does not exist."))
+                    )
+            if self.errors:
+                return []
+
+            self._load_projects(set(project_ids.values()))
+            deleted_ids = set(parsed_ids)
+            for context in self.contexts.values():
+                for item in list(context.items.values()):
+                    if item.id in deleted_ids or deleted_ids.intersection(
+                        split_path(item.path)
+                    ):
+                        deleted_ids.add(item.id)
+                        del context.items[item.id]
+            Item.objects.filter(id__in=deleted_ids).delete()
+            self._update_counters()
+            self._invalidate_contexts()
+        return parsed_ids
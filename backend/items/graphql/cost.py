@@ -0,0 +1,296 @@
+"""Limits on the depth and estimated cost of GraphQL operations.
+
+The item fields nest recursively (eg `descendants { descendants { ... } }`), so a short query can ask for every item
+of a project once per item, and again per item at the next level. Two limits guard against that:
+
+- `QueryDepthRule` is a validation rule that rejects documents whose fields nest deeper than `GRAPHQL_MAX_DEPTH`. It
+  only depends on the document, so its result is cached with the document (see `items.graphql.documents`).
+- `estimate_cost` estimates the number of objects an operation resolves from the sizes of its list fields, using the
+  stored counters of the projects and items (see `get_row_counts`) and the page sizes requested from connections. The
+  lists below a root field that targets one project (by its id or an item filter) are bounded by that project's
+  counters, and any others by the largest counters of all projects. As the estimate depends on the variables and on
+  the current counts it is made for every request, which is rejected if the estimate is over `GRAPHQL_MAX_COST`. The
+  estimate is returned in the response's `extensions.cost`.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max, Sum
+from graphql import (
+    FieldNode,
+    FragmentSpreadNode,
+    GraphQLError,
+    OperationDefinitionNode,
+    ValidationRule,
+    get_named_type,
+    is_composite_type,
+    is_list_type,
+    is_non_null_type,
+    value_from_ast,
+)
+
+from items.graphql.pagination import MAX_PAGE_SIZE
+
+# The default limits
+DEFAULT_MAX_DEPTH = 10
+DEFAULT_MAX_COST = 50000
+
+# The number of rows assumed for a list without a stored count, such as a project's attributes
+DEFAULT_LIST_SIZE = 10
+
+# The stored count that bounds the size of each list field, by its parent type and name
+LIST_SIZES = {
+    ("Query", "projects"): "projects",
+    ("Query", "items"): "items",
+    ("ProjectType", "children"): "project_children",
+    ("ProjectType", "descendants"): "project_descendants",
+    ("ProjectType", "items"): "project_descendants",
+    ("ItemType", "children"): "item_children",
+    ("ItemType", "descendants"): "item_descendants",
+    ("ItemType", "siblings"): "siblings",
+    ("ItemType", "ancestors"): "ancestors",
+    ("ProjectTreeType", "roots"): "project_children",
+    ("ProjectTreeType", "nodes"): "project_descendants",
+    ("TreeNodeType", "children"): "item_children",
+}
+
+
+# The argument holding the id of the project a root field targets, by its parent type and name, as a path into its
+# arguments
+PROJECT_ARGUMENTS = {
+    ("Query", "project"): ("id",),
+    ("Query", "projectTree"): ("id",),
+    ("Query", "items"): ("filters", "project"),
+    ("Query", "itemsConnection"): ("filters", "project"),
+}
+
+
+def get_row_counts(project_id=None):
+    """Return the largest numbers of rows the list fields can return, aggregated from the stored counters of one
+    project, or of all projects if no project is given.
+
+    The counts are cached for `GRAPHQL_COST_COUNTS_TIMEOUT` seconds, as estimates do not need to be exact.
+    """
+    from items.models import Item, Project
+
+    key = "graphql-cost:row-counts" + ("" if project_id is None else f":{project_id}")
+    counts = cache.get(key)
+    if counts is None:
+        if project_id is None:
+            counts = Project.objects.aggregate(
+                projects=Count("id"),
+                items=Sum("num_descendants"),
+                project_children=Max("num_children"),
+                project_descendants=Max("num_descendants"),
+            )
+            counts.update(
+                Item.objects.aggregate(
+                    item_children=Max("num_children"),
+                    item_descendants=Max("num_descendants"),
+                    ancestors=Max("depth"),
+                )
+            )
+        else:
+            project = (
+                Project.objects.filter(id=project_id)
+                .values("num_children", "num_descendants")
+                .annotate(
+                    item_children=Max("items__num_children"),
+                    item_descendants=Max("items__num_descendants"),
+                    ancestors=Max("items__depth"),
+                )
+                .order_by("id")
+                .first()
+            ) or {"num_children": 0, "num_descendants": 0}
+            counts = {
+                "projects": 1,
+                "items": project.pop("num_descendants"),
+                "project_children": project.pop("num_children"),
+                **project,
+            }
+            counts["project_descendants"] = counts["items"]
+        counts = {name: count or 0 for name, count in counts.items()}
+        counts["siblings"] = max(counts["project_children"], counts["item_children"])
+        cache.set(
+            key,
+            counts,
+            timeout=getattr(settings, "GRAPHQL_COST_COUNTS_TIMEOUT", 60),
+        )
+    return counts
+
+
+def _fragment_selections(selection, fragments):
+    """Return the selections of a fragment spread or inline fragment."""
+    if isinstance(selection, FragmentSpreadNode):
+        fragment = fragments.get(selection.name.value)
+        return fragment.selection_set.selections if fragment else []
+    return selection.selection_set.selections
+
+
+class QueryDepthRule(ValidationRule):
+    """Reports an error for each operation whose fields nest deeper than `GRAPHQL_MAX_DEPTH`."""
+
+    def enter_operation_definition(self, node, *args):
+        max_depth = getattr(settings, "GRAPHQL_MAX_DEPTH", DEFAULT_MAX_DEPTH)
+        fragments = {
+            fragment.name.value: fragment
+            for fragment in self.context.document.definitions
+            if not isinstance(fragment, OperationDefinitionNode)
+        }
+        depth = self._depth(node.selection_set.selections, fragments, set())
+        if depth > max_depth:
+            name = f"'{node.name.value}'" if node.name else "Operation"
+            self.report_error(
+                GraphQLError(
+                    f"{name} has a depth of {depth}, which exceeds the maximum of {max_depth}.",
+                    node,
+                )
+            )
+
+    def _depth(self, selections, fragments, visited):
+        depth = 0
+        for selection in selections:
+            if isinstance(selection, FieldNode):
+                if selection.selection_set:
+                    depth = max(
+                        depth,
+                        1
+                        + self._depth(
+                            selection.selection_set.selections, fragments, visited
+                        ),
+                    )
+                continue
+            if isinstance(selection, FragmentSpreadNode):
+                if selection.name.value in visited:
+                    continue  # Cycles are reported by another rule
+                visited = visited | {selection.name.value}
+            depth = max(
+                depth,
+                self._depth(
+                    _fragment_selections(selection, fragments), fragments, visited
+                ),
+            )
+        return depth
+
+
+class CostEstimator:
+    """Estimates the number of objects an operation resolves, assuming every list returns its most rows.
+
+    `get_row_counts` is called with the id of the project each root field targets (or None) to bound its lists.
+    """
+
+    def __init__(self, schema, document, variables, get_row_counts):
+        self.schema = schema
+        self.variables = variables or {}
+        self.get_row_counts = get_row_counts
+        self.row_counts = None
+        self.fragments = {
+            definition.name.value: definition
+            for definition in document.definitions
+            if not isinstance(definition, OperationDefinitionNode)
+        }
+
+    def estimate(self, operation):
+        """Return the estimated cost of an operation."""
+        root_type = self.schema.get_root_type(operation.operation)
+        return self._selections_cost(
+            root_type, operation.selection_set.selections, 1, set()
+        )
+
+    def _selections_cost(self, parent_type, selections, num_parents, visited):
+        cost = 0
+        for selection in selections:
+            if isinstance(selection, FieldNode):
+                cost += self._field_cost(parent_type, selection, num_parents, visited)
+                continue
+            if isinstance(selection, FragmentSpreadNode):
+                if selection.name.value in visited:
+                    continue
+                visited = visited | {selection.name.value}
+                fragment = self.fragments.get(selection.name.value)
+                type_condition = fragment and fragment.type_condition
+            else:
+                type_condition = selection.type_condition
+            fragment_type = (
+                self.schema.get_type(type_condition.name.value)
+                if type_condition
+                else parent_type
+            )
+            cost += self._selections_cost(
+                fragment_type,
+                _fragment_selections(selection, self.fragments),
+                num_parents,
+                visited,
+            )
+        return cost
+
+    def _field_cost(self, parent_type, node, num_parents, visited):
+        field = getattr(parent_type, "fields", {}).get(node.name.value)
+        if field is None or not is_composite_type(get_named_type(field.type)):
+            return 0  # Scalars and introspection
+        if parent_type in (
+            self.schema.query_type,
+            self.schema.mutation_type,
+            self.schema.subscription_type,
+        ):
+            self.row_counts = self.get_row_counts(
+                self._project_id(parent_type, node, field)
+            )
+        num_objects = num_parents * self._list_size(parent_type, node, field)
+        return num_objects + self._selections_cost(
+            get_named_type(field.type),
+            node.selection_set.selections if node.selection_set else [],
+            num_objects,
+            visited,
+        )
+
+    def _arguments(self, node, field):
+        """Return the values of a field's arguments, by name."""
+        return {
+            argument.name.value: value_from_ast(
+                argument.value, field.args[argument.name.value].type, self.variables
+            )
+            for argument in node.arguments
+            if argument.name.value in field.args
+        }
+
+    def _project_id(self, parent_type, node, field):
+        """Return the id of the project a root field targets, or None if it does not target one."""
+        path = PROJECT_ARGUMENTS.get((parent_type.name, node.name.value))
+        if path is None:
+            return None
+        value = self._arguments(node, field)
+        for name in path:
+            value = value.get(name) if isinstance(value, dict) else None
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return None
+
+    def _list_size(self, parent_type, node, field):
+        """Return the most rows a field can return for one parent object."""
+        arguments = self._arguments(node, field)
+        if "first" in field.args:  # A connection
+            page_size = arguments.get("first") or arguments.get("last")
+            if not isinstance(page_size, int):
+                return MAX_PAGE_SIZE
+            return min(max(page_size, 0), MAX_PAGE_SIZE)
+
+        field_type = field.type
+        if is_non_null_type(field_type):
+            field_type = field_type.of_type
+        if not is_list_type(field_type):
+            return 1
+        if node.name.value == "edges" and parent_type.name.endswith("Connection"):
+            return 1  # Already counted by the connection field
+        count = LIST_SIZES.get((parent_type.name, node.name.value))
+        if count is None:
+            return DEFAULT_LIST_SIZE
+        return self.row_counts[count]
+
+
+def estimate_cost(schema, document, operation, variables):
+    """Return the estimated cost of an operation (see `CostEstimator`)."""
+    return CostEstimator(schema, document, variables, get_row_counts).estimate(
+        operation
+    )
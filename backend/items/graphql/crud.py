@@ -1,3 +1,12 @@
+import time
+from contextlib import contextmanager
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+
+from items.metrics import crud_operation_duration, crud_operations
+
+
 class BaseCRUD:
 
     def __init__(self, model):
@@ -15,10 +24,56 @@ class BaseCRUD:
                 parsed[attr] = value
         return parsed
 
+    def _get_violated_constraint(self, error):
+        """Return the model constraint that caused an `IntegrityError`, or None if it was not one of them."""
+        message = str(error)
+        opts = self.model._meta
+        for constraint in opts.constraints:
+            # Postgres names the constraint, SQLite lists its columns instead
+            columns = ", ".join(
+                f"{opts.db_table}.{opts.get_field(name).column}"
+                for name in constraint.fields
+            )
+            if f'"{constraint.name}"' in message or message.endswith(
+                f"failed: {columns}"
+            ):
+                return constraint
+        return None
+
+    @contextmanager
+    def _translate_integrity_errors(self):
+        """Run a write in a savepoint, raising a `ValidationError` if it violates one of the model's constraints."""
+        try:
+            with transaction.atomic():
+                yield
+        except IntegrityError as e:
+            constraint = self._get_violated_constraint(e)
+            if constraint is None:
+                raise
+            raise ValidationError(constraint.violation_error_message) from e
+
+    @contextmanager
+    def _record(self, operation):
+        """Record the duration of a write and whether it succeeded in the metrics (see `items.metrics`)."""
+        model = self.model.__name__
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            crud_operations.inc(model=model, operation=operation, result="error")
+            raise
+        finally:
+            crud_operation_duration.observe(
+                time.perf_counter() - start, model=model, operation=operation
+            )
+        crud_operations.inc(model=model, operation=operation, result="success")
+
     def create(self, input):
         """Create and object and return it."""
-        input = self._parse_input_for_related_fields(input)
-        return self.model.objects.create(**input)
+        with self._record("create"):
+            input = self._parse_input_for_related_fields(input)
+            with self._translate_integrity_errors():
+                return self.model.objects.create(**input)
 
     def read_one(self, id):
         """Return one object by its id."""
@@ -30,16 +85,20 @@ class BaseCRUD:
 
     def update(self, id, input):
         """Update the fields of an object by its id and return it, including object relations."""
-        input = self._parse_input_for_related_fields(input)
-        instance = self.model.objects.get(pk=id)
-        for attr, value in input.items():
-            setattr(instance, attr, value)
-        instance.full_clean()
-        instance.save(update_fields=input.keys())
-        return instance
+        with self._record("update"):
+            input = self._parse_input_for_related_fields(input)
+            instance = self.model.objects.get(pk=id)
+            for attr, value in input.items():
+                setattr(instance, attr, value)
+            # The constraints are checked by the database when saving rather than queried for here
+            instance.full_clean(validate_constraints=False)
+            with self._translate_integrity_errors():
+                instance.save(update_fields=input.keys())
+            return instance
 
     def delete(self, id):
         """Delete an object by its id and return it."""
-        instance = self.model.objects.get(pk=id)
-        instance.delete()
-        return instance
+        with self._record("delete"):
+            instance = self.model.objects.get(pk=id)
+            instance.delete()
+            return instance
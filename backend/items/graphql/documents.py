@@ -0,0 +1,105 @@
+"""Caches of parsed GraphQL documents and of persisted queries.
+
+Parsing and validating a query costs more CPU than executing many of the small queries the frontend sends, and the
+frontend sends the same few queries over and over. Each distinct query string is therefore parsed and validated once
+per process and the resulting document kept in a least recently used `DocumentCache` of `GRAPHQL_DOCUMENT_CACHE_SIZE`
+entries (invalid queries are not cached).
+
+Clients may also send the SHA-256 hash of a query instead of the query itself, following the automatic persisted
+queries protocol: a hash that has not been seen yet is answered with a `PersistedQueryNotFound` error, the client
+then sends the query with its hash and the query is stored by its hash in the `GRAPHQL_PERSISTED_QUERY_CACHE` cache.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict, namedtuple
+
+from django.conf import settings
+from django.core.cache import caches
+from graphene_django.settings import graphene_settings
+from graphql import GraphQLError, parse, print_ast, validate
+
+# The default number of documents kept by the cache
+DEFAULT_CACHE_SIZE = 256
+
+# A parsed and validated document, with its query printed in a normalized form (eg to key cached responses by)
+ValidatedDocument = namedtuple("ValidatedDocument", ["document", "normalized_query"])
+
+
+class DocumentCache:
+    """A least recently used cache of `ValidatedDocument`s by schema, validation rules and query string."""
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def max_size(self):
+        return getattr(settings, "GRAPHQL_DOCUMENT_CACHE_SIZE", DEFAULT_CACHE_SIZE)
+
+    def get(self, schema, query, validation_rules=None):
+        """Return a `ValidatedDocument` for a query and a list of any errors, parsing and validating it if needed."""
+        key = (schema, tuple(validation_rules or ()), query)
+        with self._lock:
+            document = self._entries.get(key)
+            if document is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return document, []
+            self.misses += 1
+
+        try:
+            document = parse(query)
+        except GraphQLError as e:
+            return None, [e]
+        errors = validate(
+            schema, document, validation_rules, graphene_settings.MAX_VALIDATION_ERRORS
+        )
+        if errors:
+            return None, errors
+
+        document = ValidatedDocument(document, print_ast(document))
+        with self._lock:
+            self._entries[key] = document
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return document, []
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Return the cache's counters and size."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+            }
+
+
+document_cache = DocumentCache()
+
+
+def get_query_hash(query):
+    """Return the SHA-256 hash that a query is persisted by."""
+    return hashlib.sha256(query.encode()).hexdigest()
+
+
+def _get_persisted_query_cache():
+    return caches[getattr(settings, "GRAPHQL_PERSISTED_QUERY_CACHE", "default")]
+
+
+def get_persisted_query(query_hash):
+    """Return the query persisted by a hash, or None if it has not been persisted."""
+    return _get_persisted_query_cache().get(f"graphql-persisted-query:{query_hash}")
+
+
+def persist_query(query_hash, query):
+    """Persist a query by its hash (which must have been checked against the query)."""
+    _get_persisted_query_cache().add(
+        f"graphql-persisted-query:{query_hash}", query, timeout=None
+    )
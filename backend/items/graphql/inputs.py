@@ -35,6 +35,12 @@ class BaseUpdateItemAttributeInput(graphene.InputObjectType):
     order = graphene.Int()
 
 
+class ItemAttributeKind(graphene.Enum):
+    ITEM_TYPE = "item_type"
+    ITEM_STATUS = "item_status"
+    ITEM_LOCATION = "item_location"
+
+
 class CreateItemTypeInput(BaseCreateItemAttributeInput):
     nestable = graphene.Boolean()
 
@@ -80,3 +86,8 @@ class UpdateItemInput(graphene.InputObjectType):
     changelog = graphene.String()
     requirements = graphene.String()
     outcome = graphene.String()
+
+
+class UpdateItemsInput(graphene.InputObjectType):
+    id = graphene.ID(required=True)
+    input = graphene.Field(UpdateItemInput, required=True)
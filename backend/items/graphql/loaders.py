@@ -0,0 +1,270 @@
+"""Per-request batch loading for the GraphQL relation and count fields.
+
+Resolving a related field or count one object at a time issues one query per object (N+1). Instead every object
+resolved during a request is registered with the request's `Loaders`, and the first time a field is loaded for one
+object its value is loaded for every registered object of the same model in a single query. As the loaded objects are
+registered in turn, each level of a nested query costs a constant number of queries however many objects it returns.
+
+Values that were already loaded with the objects (eg prefetched by the query optimizer) are stored in the attribute
+named by `preloaded_attr` and are used instead of querying.
+"""
+
+import hashlib
+from collections import defaultdict
+
+from django.db.models import CharField, Count, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Cast, Coalesce, Concat
+from graphql.language import OperationType
+
+from items.models import Item, ItemQuerySet, Project
+from items.tree import PATH_SEPARATOR, get_tree_strategy
+
+
+def freeze_filters(filters):
+    """Return a hashable key for a set of `ItemFilterInput` filters, ignoring any that are empty."""
+    return frozenset((name, value) for name, value in filters.items() if value)
+
+
+def preloaded_attr(field_name, filters=None):
+    """Return the name of the attribute that a field's value for a set of filters is preloaded into."""
+    key = sorted(freeze_filters(filters or {}))
+    if not key:
+        return f"_preloaded_{field_name}"
+    return f"_preloaded_{field_name}_{hashlib.md5(repr(key).encode()).hexdigest()[:8]}"
+
+
+def _group_by(objs, attname):
+    """Group a list of objects into a dict of lists by one of their attributes."""
+    groups = defaultdict(list)
+    for obj in objs:
+        groups[getattr(obj, attname)].append(obj)
+    return groups
+
+
+class Loader:
+    """Loads one field for every registered instance of a model the first time it is requested for any of them."""
+
+    def __init__(self, loaders, model, field_name, filters):
+        self.loaders = loaders
+        self.model = model
+        self.batch_load_fn = BATCH_LOAD_FNS[model][field_name]
+        self.preloaded_attr = preloaded_attr(field_name, filters)
+        self.filters = filters
+        self.cache = {}
+
+    def load(self, instance):
+        """Return the value for an instance, batch loading it with every other pending instance if needed."""
+        if instance.pk not in self.cache and hasattr(instance, self.preloaded_attr):
+            self.cache[instance.pk] = self._use_preloaded(instance)
+        if instance.pk not in self.cache:
+            self.loaders.register([instance])
+            pending = []
+            for pk, obj in list(self.loaders.seen[self.model].items()):
+                if pk in self.cache:
+                    continue
+                if hasattr(obj, self.preloaded_attr):
+                    self.cache[pk] = self._use_preloaded(obj)
+                else:
+                    pending.append(obj)
+            if pending:
+                self.cache.update(
+                    self.batch_load_fn(self.loaders, pending, **self.filters)
+                )
+        return self.cache[instance.pk]
+
+    def _use_preloaded(self, instance):
+        """Return the value preloaded onto an instance, registering any objects it contains."""
+        value = getattr(instance, self.preloaded_attr)
+        if isinstance(value, list):
+            self.loaders.register(value)
+        return value
+
+
+class Loaders:
+    """The registry of objects seen and the loaders used while resolving one GraphQL operation."""
+
+    def __init__(self):
+        self.seen = defaultdict(dict)  # {model: {pk: obj, ...}, ...}
+        self._loaders = {}
+
+    def register(self, objs):
+        """Register resolved objects so that their fields are batch loaded together, and return them."""
+        for obj in objs:
+            if obj is not None:
+                self.seen[type(obj)].setdefault(obj.pk, obj)
+        return objs
+
+    def load(self, field_name, instance, filters=None):
+        """Return the value of a field for an instance, batch loading it for all registered instances."""
+        filters = dict(freeze_filters(filters or {}))
+        model = type(instance)
+        key = (model, field_name, freeze_filters(filters))
+        if key not in self._loaders:
+            self._loaders[key] = Loader(self, model, field_name, filters)
+        return self._loaders[key].load(instance)
+
+    def load_count(self, field_name, instance, filters=None):
+        """Return a count for an instance, from its stored counters if they can answer the filters."""
+        count = instance.get_stored_count(field_name, **(filters or {}))
+        if count is not None:
+            return count
+        return self.load(field_name, instance, filters)
+
+
+def get_loaders(info):
+    """Return the `Loaders` for the operation being resolved, creating them on first use.
+
+    Loaders are attached to the request (`info.context`) and kept separately for each root field of a mutation, so that
+    values loaded before one mutation's changes are not reused after them.
+    """
+    context = info.context
+    if context is None:
+        return Loaders()  # No request to store them on, so nothing can be batched
+
+    key = "query"
+    if info.operation.operation == OperationType.MUTATION:
+        key = info.path.as_list()[0]
+
+    if not hasattr(context, "loaders"):
+        context.loaders = {}
+    if key not in context.loaders:
+        context.loaders[key] = Loaders()
+    return context.loaders[key]
+
+
+## Batch load functions, each returning {instance.pk: value, ...} for a list of instances
+
+
+def _load_foreign_key(field_name):
+    """Create a batch load function for a forward foreign key, eg `Item.item_type`."""
+
+    def batch_load(loaders, instances):
+        field = instances[0]._meta.get_field(field_name)
+        related = {}
+        # Reuse any related objects that are already cached on the instances (eg by `select_related`)
+        for instance in instances:
+            if field.is_cached(instance):
+                obj = field.get_cached_value(instance)
+                if obj is not None:
+                    related[obj.pk] = obj
+        ids = {getattr(instance, field.attname) for instance in instances}
+        missing_ids = ids - related.keys() - {None}
+        if missing_ids:
+            related.update(field.related_model.objects.in_bulk(missing_ids))
+        loaders.register(related.values())
+        return {
+            instance.pk: related.get(getattr(instance, field.attname))
+            for instance in instances
+        }
+
+    return batch_load
+
+
+def _load_project_children(loaders, projects, **filters):
+    children = Item.objects.filter(project__in=projects, parent=None).filter_items(
+        **filters
+    )
+    groups = _group_by(loaders.register(list(children)), "project_id")
+    return {project.pk: groups.get(project.pk, []) for project in projects}
+
+
+def _load_project_descendants(loaders, projects, **filters):
+    descendants = Item.objects.filter(project__in=projects).filter_items(**filters)
+    groups = _group_by(loaders.register(list(descendants)), "project_id")
+    return {project.pk: groups.get(project.pk, []) for project in projects}
+
+
+def _count_by(qs, field_name):
+    """Return a `{value: count, ...}` lookup for one grouped aggregate query."""
+    return dict(
+        qs.order_by()
+        .values(field_name)
+        .annotate(num=Count("id"))
+        .values_list(field_name, "num")
+    )
+
+
+def _load_project_num_children(loaders, projects, **filters):
+    counts = _count_by(
+        Item.objects.filter(project__in=projects, parent=None).filter_items(**filters),
+        "project_id",
+    )
+    return {project.pk: counts.get(project.pk, 0) for project in projects}
+
+
+def _load_project_num_descendants(loaders, projects, **filters):
+    counts = _count_by(
+        Item.objects.filter(project__in=projects).filter_items(**filters),
+        "project_id",
+    )
+    return {project.pk: counts.get(project.pk, 0) for project in projects}
+
+
+def _load_item_children(loaders, items, **filters):
+    children = Item.objects.filter(parent__in=items).filter_items(**filters)
+    groups = _group_by(loaders.register(list(children)), "parent_id")
+    return {item.pk: groups.get(item.pk, []) for item in items}
+
+
+def _load_item_num_children(loaders, items, **filters):
+    counts = _count_by(
+        Item.objects.filter(parent__in=items).filter_items(**filters), "parent_id"
+    )
+    return {item.pk: counts.get(item.pk, 0) for item in items}
+
+
+def count_item_descendants(**filters):
+    """Return the expression counting an item's descendants matching some filters."""
+    if get_tree_strategy() == "closure":
+        return Count(
+            "descendant_links",
+            filter=Q(descendant_links__depth__gt=0)
+            & ItemQuerySet.get_filter_q("descendant_links__descendant__", **filters),
+            distinct=True,
+        )
+    # Every strategy keeps the materialized paths up to date, so count the rows under the item's subtree path
+    subtree_path = Concat(
+        OuterRef("path"),
+        Cast(OuterRef("pk"), CharField()),
+        Value(PATH_SEPARATOR),
+        output_field=CharField(),
+    )
+    descendants = (
+        Item.objects.filter(path__startswith=subtree_path)
+        .filter_items(**filters)
+        .order_by()
+        .values("project")
+        .annotate(num=Count("pk"))
+        .values("num")
+    )
+    return Coalesce(Subquery(descendants), 0)
+
+
+def _load_item_num_descendants(loaders, items, **filters):
+    # Only called for filters that the stored counters cannot answer (see `Loaders.load_count`), so count them in SQL
+    return dict(
+        Item.objects.filter(pk__in=[item.pk for item in items])
+        .order_by()
+        .annotate(num=count_item_descendants(**filters))
+        .values_list("pk", "num")
+    )
+
+
+BATCH_LOAD_FNS = {
+    Project: {
+        "children": _load_project_children,
+        "descendants": _load_project_descendants,
+        "num_children": _load_project_num_children,
+        "num_descendants": _load_project_num_descendants,
+    },
+    Item: {
+        "project": _load_foreign_key("project"),
+        "parent": _load_foreign_key("parent"),
+        "item_type": _load_foreign_key("item_type"),
+        "item_status": _load_foreign_key("item_status"),
+        "item_location": _load_foreign_key("item_location"),
+        "children": _load_item_children,
+        "num_children": _load_item_num_children,
+        "num_descendants": _load_item_num_descendants,
+    },
+}
@@ -1,5 +1,6 @@
 import graphene
 
+from items.batch import ItemBatch, ProjectBatch
 from items.graphql.crud import BaseCRUD
 from items.graphql.inputs import (
     CreateItemInput,
@@ -7,13 +8,15 @@ from items.graphql.inputs import (
     CreateItemStatusInput,
     CreateItemTypeInput,
     CreateProjectInput,
+    ItemAttributeKind,
     UpdateItemInput,
     UpdateItemLocationInput,
+    UpdateItemsInput,
     UpdateItemStatusInput,
     UpdateItemTypeInput,
     UpdateProjectInput,
 )
-from items.graphql.types import ItemLocationType, ItemStatusType
+from items.graphql.types import BatchError, ItemLocationType, ItemStatusType
 from items.graphql.types import ItemType as ItemGraphQLType
 from items.graphql.types import ItemTypeType, ProjectType
 from items.models import Item, ItemLocation, ItemStatus, ItemType, Project
@@ -171,6 +174,28 @@ class DeleteItemLocation(graphene.Mutation):
         return DeleteItemLocation(success=True, item_location=item_location)
 
 
+class ReorderItemAttributes(graphene.Mutation):
+    class Arguments:
+        project = graphene.ID(required=True)
+        kind = ItemAttributeKind(required=True)
+        ids = graphene.List(graphene.NonNull(graphene.ID), required=True)
+
+    success = graphene.Boolean()
+    project = graphene.Field(lambda: ProjectType)
+
+    MODELS = {
+        ItemAttributeKind.ITEM_TYPE.value: ItemType,
+        ItemAttributeKind.ITEM_STATUS.value: ItemStatus,
+        ItemAttributeKind.ITEM_LOCATION.value: ItemLocation,
+    }
+
+    @classmethod
+    def mutate(cls, root, info, project, kind, ids):
+        project = Project.objects.get(pk=project)
+        cls.MODELS[kind.value].reorder(project.id, [int(id) for id in ids])
+        return ReorderItemAttributes(success=True, project=project)
+
+
 class CreateItem(graphene.Mutation):
     class Arguments:
         input = CreateItemInput(required=True)
@@ -196,6 +221,21 @@ class UpdateItem(graphene.Mutation):
         return UpdateItem(item=item)
 
 
+class MoveSubtree(graphene.Mutation):
+    class Arguments:
+        item_id = graphene.ID(required=True)
+        new_parent_id = graphene.ID()
+
+    item = graphene.Field(lambda: ItemGraphQLType)
+
+    @classmethod
+    def mutate(cls, root, info, item_id, new_parent_id=None):
+        item = Item.objects.get(pk=item_id)
+        parent = None if new_parent_id is None else Item.objects.get(pk=new_parent_id)
+        item.move_to(parent)
+        return MoveSubtree(item=item)
+
+
 class DeleteItem(graphene.Mutation):
     class Arguments:
         id = graphene.ID(required=True)
@@ -209,6 +249,82 @@ class DeleteItem(graphene.Mutation):
         return DeleteItem(success=True, item=item)
 
 
+def batch_errors(batch):
+    """Return the errors collected by a `Batch` as `BatchError`s."""
+    return [
+        BatchError(index=index, id=id, messages=messages)
+        for index, id, messages in batch.errors
+    ]
+
+
+class CreateProjects(graphene.Mutation):
+    class Arguments:
+        inputs = graphene.List(graphene.NonNull(CreateProjectInput), required=True)
+
+    success = graphene.Boolean()
+    projects = graphene.List(lambda: ProjectType)
+    errors = graphene.List(BatchError)
+
+    @classmethod
+    def mutate(cls, root, info, inputs):
+        batch = ProjectBatch()
+        projects = batch.create(inputs)
+        return CreateProjects(
+            success=not batch.errors, projects=projects, errors=batch_errors(batch)
+        )
+
+
+class CreateItems(graphene.Mutation):
+    class Arguments:
+        inputs = graphene.List(graphene.NonNull(CreateItemInput), required=True)
+
+    success = graphene.Boolean()
+    items = graphene.List(lambda: ItemGraphQLType)
+    errors = graphene.List(BatchError)
+
+    @classmethod
+    def mutate(cls, root, info, inputs):
+        batch = ItemBatch()
+        items = batch.create(inputs)
+        return CreateItems(
+            success=not batch.errors, items=items, errors=batch_errors(batch)
+        )
+
+
+class UpdateItems(graphene.Mutation):
+    class Arguments:
+        inputs = graphene.List(graphene.NonNull(UpdateItemsInput), required=True)
+
+    success = graphene.Boolean()
+    items = graphene.List(lambda: ItemGraphQLType)
+    errors = graphene.List(BatchError)
+
+    @classmethod
+    def mutate(cls, root, info, inputs):
+        batch = ItemBatch()
+        items = batch.update([(row.id, row.input) for row in inputs])
+        return UpdateItems(
+            success=not batch.errors, items=items, errors=batch_errors(batch)
+        )
+
+
+class DeleteItems(graphene.Mutation):
+    class Arguments:
+        ids = graphene.List(graphene.NonNull(graphene.ID), required=True)
+
+    success = graphene.Boolean()
+    ids = graphene.List(graphene.ID)
+    errors = graphene.List(BatchError)
+
+    @classmethod
+    def mutate(cls, root, info, ids):
+        batch = ItemBatch()
+        deleted_ids = batch.delete(ids)
+        return DeleteItems(
+            success=not batch.errors, ids=deleted_ids, errors=batch_errors(batch)
+        )
+
+
 class Mutation(graphene.ObjectType):
     create_project = CreateProject.Field()
     update_project = UpdateProject.Field()
@@ -222,6 +338,12 @@ class Mutation(graphene.ObjectType):
     create_item_location = CreateItemLocation.Field()
     update_item_location = UpdateItemLocation.Field()
     delete_item_location = DeleteItemLocation.Field()
+    reorder_item_attributes = ReorderItemAttributes.Field()
     create_item = CreateItem.Field()
     update_item = UpdateItem.Field()
     delete_item = DeleteItem.Field()
+    move_subtree = MoveSubtree.Field()
+    create_projects = CreateProjects.Field()
+    create_items = CreateItems.Field()
+    update_items = UpdateItems.Field()
+    delete_items = DeleteItems.Field()
@@ -0,0 +1,112 @@
+"""Detection of N+1 queries in GraphQL requests.
+
+A field that makes a query for each object of a list it is nested in (eg the item type of each child, if it is not
+prefetched) makes the same shape of query again and again, once per object. `find_repeated_queries` fingerprints the
+SELECT queries recorded by a request's `Tracer` (see `items.graphql.tracing`) by their SQL with any literal values and
+`IN` lists collapsed, and reports each fingerprint that one field (whose path is taken without list indices, eg
+`projects.children.itemType`) made while being resolved for at least `GRAPHQL_NPLUSONE_THRESHOLD` objects. A field that
+is only resolved once (eg a mutation looking up an item and then its parent) is not reported however many queries of
+the same shape it makes.
+
+`GRAPHQL_NPLUSONE_DETECTION` selects what the endpoint does with repeated queries:
+
+- "raise" checks every request and raises `NPlusOneError` naming the field, so tests fail on a new N+1 query.
+- "log" checks a `GRAPHQL_NPLUSONE_SAMPLE_RATE` fraction of requests, logs a warning for each repeated query with the
+  number of times it was made and counts them in the `graphql_repeated_queries_total` metric.
+- None disables detection.
+"""
+
+import logging
+import random
+import re
+from collections import Counter, defaultdict, namedtuple
+
+from django.conf import settings
+
+from items.metrics import graphql_repeated_queries
+
+logger = logging.getLogger(__name__)
+
+# The default number of objects one field can make the same shape of query for before it is reported
+DEFAULT_THRESHOLD = 2
+
+# A shape of query made `count` times while resolving the field at `path`
+RepeatedQuery = namedtuple("RepeatedQuery", ["path", "fingerprint", "count"])
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_VALUE = re.compile(r"\b\d+(?:\.\d+)?\b|%s")
+_IN_LIST = re.compile(r"\bIN \((?:[^()]*)\)", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+
+class NPlusOneError(Exception):
+    """Raised for a request that made the same shape of query repeatedly for one field."""
+
+    def __init__(self, repeated_queries):
+        self.repeated_queries = repeated_queries
+        super().__init__(
+            "\n".join(
+                f"N+1 queries: {query.count} queries resolving {query.path}: {query.fingerprint}"
+                for query in repeated_queries
+            )
+        )
+
+
+def get_fingerprint(sql):
+    """Return the shape of a query, its SQL with literals and parameters replaced by `?` and `IN` lists by `IN (...)`."""
+    sql = _STRING.sub("?", sql)
+    sql = _IN_LIST.sub("IN (...)", sql)
+    sql = _VALUE.sub("?", sql)
+    return _WHITESPACE.sub(" ", sql).strip()
+
+
+def get_field_path(trace):
+    """Return the path of a traced field without its list indices."""
+    return ".".join(str(key) for key in trace.path if not isinstance(key, int))
+
+
+def find_repeated_queries(tracer, threshold=None):
+    """Return the `RepeatedQuery`s of the SELECT queries recorded by a `Tracer` that a field made while being resolved
+    for at least `threshold` objects, most repeated first."""
+    if threshold is None:
+        threshold = getattr(settings, "GRAPHQL_NPLUSONE_THRESHOLD", DEFAULT_THRESHOLD)
+    counts, resolutions = Counter(), defaultdict(set)
+    for trace, sql in tracer.queries:
+        if trace is None or sql.lstrip()[:6].upper() != "SELECT":
+            continue
+        key = (get_field_path(trace), get_fingerprint(sql))
+        counts[key] += 1
+        resolutions[key].add(tuple(trace.path))
+    return [
+        RepeatedQuery(path, fingerprint, count)
+        for (path, fingerprint), count in counts.most_common()
+        if len(resolutions[path, fingerprint]) >= threshold
+    ]
+
+
+def detection_requested():
+    """Return whether the queries of a request should be checked, sampling requests in the "log" mode."""
+    detection = getattr(settings, "GRAPHQL_NPLUSONE_DETECTION", None)
+    if detection == "raise":
+        return True
+    if detection == "log":
+        return random.random() < getattr(settings, "GRAPHQL_NPLUSONE_SAMPLE_RATE", 0)
+    return False
+
+
+def check_repeated_queries(tracer, operation_name=None):
+    """Check the queries recorded by a `Tracer`, raising or logging any repeated queries as configured."""
+    repeated_queries = find_repeated_queries(tracer)
+    if not repeated_queries:
+        return
+    if getattr(settings, "GRAPHQL_NPLUSONE_DETECTION", None) == "raise":
+        raise NPlusOneError(repeated_queries)
+    for query in repeated_queries:
+        graphql_repeated_queries.inc(query.count, path=query.path)
+        logger.warning(
+            "N+1 queries in %s: %d queries resolving %s: %s",
+            operation_name or "an anonymous operation",
+            query.count,
+            query.path,
+            query.fingerprint,
+        )
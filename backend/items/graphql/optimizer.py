@@ -0,0 +1,224 @@
+"""Plan `select_related`, `prefetch_related` and `only` for a QuerySet from the fields a GraphQL query selects.
+
+The selection set of the field being resolved (including any fragments) is walked alongside the models: selected
+foreign keys are joined with `select_related`, selected child lists are fetched with `Prefetch` objects, selected counts
+are annotated (both into the attributes the loaders check first, see `preloaded_attr`) and columns that are not
+selected are deferred with `only`. Anything the plan cannot cover is left to the per-request loaders.
+"""
+
+from collections import namedtuple
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Count, Prefetch, Q
+from graphene.utils.str_converters import to_snake_case
+from graphql import (
+    FieldNode,
+    FragmentSpreadNode,
+    InlineFragmentNode,
+    get_named_type,
+)
+from graphql.execution.values import get_argument_values
+
+from items.graphql.loaders import (
+    count_item_descendants,
+    freeze_filters,
+    preloaded_attr,
+)
+from items.models import Item, ItemQuerySet, Project
+
+Selection = namedtuple("Selection", ["name", "filters", "field_nodes", "graphql_type"])
+
+# Columns that are always loaded because the resolvers read them even when they are not selected
+ALWAYS_LOADED = {Item: ("path", "depth")}
+
+# Fields that are resolved by (and so loaded as) another field
+FIELD_ALIASES = {Project: {"items": "descendants", "num_items": "num_descendants"}}
+
+# The connection fields whose `totalCount` is the count field, as {model: {field_name: count_field_name, ...}, ...}
+CONNECTION_COUNTS = {
+    Project: {"descendants_connection": "num_descendants"},
+    Item: {"children_connection": "num_children"},
+}
+
+# The list fields that can be prefetched, as {model: {field_name: (lookup, get_queryset), ...}, ...}
+PREFETCHABLE = {
+    Project: {
+        "children": ("items", lambda: Item.objects.filter(parent=None)),
+        "descendants": ("items", lambda: Item.objects.all()),
+    },
+    Item: {
+        "children": ("children", lambda: Item.objects.all()),
+    },
+}
+
+
+# The count fields that are read from the stored counters when they can answer the filters and are otherwise
+# annotated, as {model: {field_name: get_expression(**filters), ...}, ...}. Counts use `distinct` as several may join
+# different relations into the same query.
+ANNOTATABLE = {
+    Project: {
+        "num_children": lambda **filters: Count(
+            "items",
+            filter=Q(items__parent=None)
+            & ItemQuerySet.get_filter_q("items__", **filters),
+            distinct=True,
+        ),
+        "num_descendants": lambda **filters: Count(
+            "items",
+            filter=ItemQuerySet.get_filter_q("items__", **filters),
+            distinct=True,
+        ),
+    },
+    Item: {
+        "num_children": lambda **filters: Count(
+            "children",
+            filter=ItemQuerySet.get_filter_q("children__", **filters),
+            distinct=True,
+        ),
+        "num_descendants": count_item_descendants,
+    },
+}
+
+
+def _collect_field_nodes(info, selection_set, field_nodes):
+    """Collect the field nodes of a selection set by field name, expanding fragments."""
+    for selection in selection_set.selections:
+        if isinstance(selection, FieldNode):
+            field_nodes.setdefault(selection.name.value, []).append(selection)
+        elif isinstance(selection, InlineFragmentNode):
+            _collect_field_nodes(info, selection.selection_set, field_nodes)
+        elif isinstance(selection, FragmentSpreadNode):
+            fragment = info.fragments[selection.name.value]
+            _collect_field_nodes(info, fragment.selection_set, field_nodes)
+    return field_nodes
+
+
+def get_selections(info, field_nodes, graphql_type):
+    """Return the `Selection`s made below some field nodes, merging repeated fields with the same filters."""
+    collected = {}
+    for node in field_nodes:
+        if node.selection_set:
+            _collect_field_nodes(info, node.selection_set, collected)
+
+    selections = {}
+    for name, nodes in collected.items():
+        field_def = graphql_type.fields.get(name)
+        if field_def is None:
+            continue  # eg __typename
+        for node in nodes:
+            args = get_argument_values(field_def, node, info.variable_values)
+            filters = dict(freeze_filters(args.get("filters") or {}))
+            key = (name, freeze_filters(filters))
+            if key not in selections:
+                selections[key] = Selection(
+                    to_snake_case(name), filters, [], get_named_type(field_def.type)
+                )
+            selections[key].field_nodes.append(node)
+    return list(selections.values())
+
+
+class QueryPlan:
+    """The `only`, `select_related`, `prefetch_related` and `annotate` arguments for one QuerySet."""
+
+    def __init__(self):
+        self.only = set()
+        self.select_related = set()
+        self.prefetch_related = {}  # {to_attr: Prefetch, ...}
+        self.annotations = {}
+
+    def plan_model(self, info, model, selections, prefix=""):
+        """Add the plan for the selections made on one model, which is joined to the QuerySet at `prefix`."""
+        self.only.add(f"{prefix}{model._meta.pk.name}")
+        for field in model._meta.concrete_fields:
+            if field.many_to_one:
+                self.only.add(f"{prefix}{field.name}")
+        for name in ALWAYS_LOADED.get(model, ()):
+            self.only.add(f"{prefix}{name}")
+
+        for selection in selections:
+            name = FIELD_ALIASES.get(model, {}).get(selection.name, selection.name)
+            try:
+                field = model._meta.get_field(name)
+            except FieldDoesNotExist:
+                field = None
+
+            if name in ANNOTATABLE.get(model, {}):
+                stored_field = model.get_stored_count_field(name, **selection.filters)
+                if stored_field is not None:
+                    self.only.add(f"{prefix}{stored_field}")
+                elif not prefix:
+                    self.annotations[preloaded_attr(name, selection.filters)] = (
+                        ANNOTATABLE[model][name](**selection.filters)
+                    )
+            elif name in CONNECTION_COUNTS.get(model, {}):
+                # Load the stored counter in case the total count is selected
+                stored_field = model.get_stored_count_field(
+                    CONNECTION_COUNTS[model][name], **selection.filters
+                )
+                if stored_field is not None:
+                    self.only.add(f"{prefix}{stored_field}")
+            elif field is not None and field.concrete and not field.is_relation:
+                self.only.add(f"{prefix}{field.name}")
+            elif field is not None and field.many_to_one:
+                self.select_related.add(f"{prefix}{field.name}")
+                self.plan_model(
+                    info,
+                    field.related_model,
+                    get_selections(info, selection.field_nodes, selection.graphql_type),
+                    prefix=f"{prefix}{field.name}__",
+                )
+            elif prefix:
+                continue  # Prefetches and annotations can only follow the top level objects
+            elif name in PREFETCHABLE.get(model, {}):
+                to_attr = preloaded_attr(name, selection.filters)
+                if to_attr in self.prefetch_related:
+                    continue  # eg both `descendants` and its alias `items`
+                lookup, get_queryset = PREFETCHABLE[model][name]
+                queryset = optimize_queryset(
+                    info,
+                    get_queryset().filter_items(**selection.filters),
+                    selection.field_nodes,
+                    selection.graphql_type,
+                )
+                self.prefetch_related[to_attr] = Prefetch(
+                    lookup, queryset=queryset, to_attr=to_attr
+                )
+
+    def apply(self, qs):
+        """Return the QuerySet with the plan applied."""
+        if self.select_related:
+            qs = qs.select_related(*sorted(self.select_related))
+        if self.prefetch_related:
+            qs = qs.prefetch_related(*self.prefetch_related.values())
+        if self.annotations:
+            qs = qs.annotate(**self.annotations)
+        return qs.only(*sorted(self.only))
+
+
+def optimize_queryset(info, qs, field_nodes=None, graphql_type=None):
+    """Return a QuerySet optimized to load the fields selected below the field being resolved (or some field nodes)."""
+    if field_nodes is None:
+        field_nodes = info.field_nodes
+        graphql_type = get_named_type(info.return_type)
+    plan = QueryPlan()
+    plan.plan_model(info, qs.model, get_selections(info, field_nodes, graphql_type))
+    return plan.apply(qs)
+
+
+def optimize_connection_queryset(info, qs):
+    """Return a QuerySet optimized to load the fields selected on the nodes of the connection being resolved."""
+    connection_selections = get_selections(
+        info, info.field_nodes, get_named_type(info.return_type)
+    )
+    node_field_nodes = []
+    node_type = None
+    for edges in connection_selections:
+        if edges.name != "edges":
+            continue
+        for node in get_selections(info, edges.field_nodes, edges.graphql_type):
+            if node.name == "node":
+                node_field_nodes.extend(node.field_nodes)
+                node_type = node.graphql_type
+    if node_type is None:
+        return qs.only("pk")  # eg only the totalCount or pageInfo are selected
+    return optimize_queryset(info, qs, node_field_nodes, node_type)
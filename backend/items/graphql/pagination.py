@@ -0,0 +1,163 @@
+"""Relay style connections paginated with keyset cursors.
+
+A cursor encodes the values of the model's `Meta.ordering` fields (plus the id to break ties) for one row, so the next
+page is the rows ordered after those values rather than an offset that has to be counted through (and that shifts as
+rows are added or removed). Counting every row for `totalCount` is only done when that field is selected.
+"""
+
+import base64
+import datetime
+import json
+
+import graphene
+from django.db.models import F, Q
+from graphql import GraphQLError
+
+from items.graphql.loaders import get_loaders
+from items.graphql.optimizer import optimize_connection_queryset
+
+# The number of rows returned when neither `first` nor `last` is given, and the most that can be requested
+MAX_PAGE_SIZE = 100
+
+
+def connection_field(connection_type, **kwargs):
+    """Return a field for a connection type with the pagination arguments (and any others)."""
+    return graphene.Field(
+        connection_type,
+        first=graphene.Int(),
+        after=graphene.String(),
+        last=graphene.Int(),
+        before=graphene.String(),
+        **kwargs,
+    )
+
+
+def get_ordering(model):
+    """Return the ordering used for keyset pagination: the model's `Meta.ordering` with the id as a tie breaker."""
+    ordering = list(model._meta.ordering)
+    if not {"pk", "id", "-pk", "-id"} & set(ordering):
+        ordering.append("id")
+    return ordering
+
+
+def encode_cursor(values):
+    """Return an opaque cursor for a row's ordering values."""
+    values = [
+        value.isoformat() if isinstance(value, datetime.datetime) else value
+        for value in values
+    ]
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def decode_cursor(cursor, ordering):
+    """Return the ordering values encoded in a cursor, raising a `GraphQLError` if it is not valid for the ordering."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except ValueError:
+        raise GraphQLError(f"Invalid cursor {cursor!r}.")
+    if not isinstance(values, list) or len(values) != len(ordering):
+        raise GraphQLError(f"Invalid cursor {cursor!r}.")
+    return values
+
+
+def keyset_q(ordering, values, forward=True):
+    """Return the `Q` matching the rows ordered after (or, if not `forward`, before) a row with some ordering values.
+
+    For an ordering of (a, b, id) the rows after (1, 2, 3) are those with a > 1, or a = 1 and b > 2, or a = 1, b = 2
+    and id > 3 (with the comparisons flipped for descending fields).
+    """
+    q = Q()
+    for i, name in enumerate(ordering):
+        descending = name.startswith("-")
+        lookup = "lt" if descending == forward else "gt"
+        condition = Q(**{f"{name.lstrip('-')}__{lookup}": values[i]})
+        for previous_name, previous_value in zip(ordering[:i], values[:i]):
+            condition &= Q(**{previous_name.lstrip("-"): previous_value})
+        q |= condition
+    return q
+
+
+def paginate(
+    info,
+    connection_type,
+    qs,
+    first=None,
+    after=None,
+    last=None,
+    before=None,
+    get_total_count=None,
+):
+    """Return one page of a QuerySet as an instance of a connection type.
+
+    `get_total_count` returns the number of rows in the whole (unpaginated) QuerySet and is only called if the
+    `totalCount` field is selected, defaulting to counting the QuerySet.
+    """
+    if first is not None and last is not None:
+        raise GraphQLError("Pass either first or last, not both.")
+    page_size = last if last is not None else first
+    if page_size is None:
+        page_size = MAX_PAGE_SIZE
+    if not 0 <= page_size <= MAX_PAGE_SIZE:
+        raise GraphQLError(
+            f"first and last must be between 0 and {MAX_PAGE_SIZE}, not {page_size}."
+        )
+
+    total_qs = qs
+    ordering = get_ordering(qs.model)
+    qs = qs.annotate(
+        **{f"_cursor_{i}": F(name.lstrip("-")) for i, name in enumerate(ordering)}
+    ).order_by(*ordering)
+    if after is not None:
+        qs = qs.filter(keyset_q(ordering, decode_cursor(after, ordering)))
+    if before is not None:
+        qs = qs.filter(
+            keyset_q(ordering, decode_cursor(before, ordering), forward=False)
+        )
+    qs = optimize_connection_queryset(info, qs)
+
+    # Fetch one extra row to find out if there is another page
+    if last is not None:
+        rows = list(qs.reverse()[: page_size + 1])
+        has_previous_page = len(rows) > page_size
+        rows = rows[:page_size][::-1]
+        has_next_page = before is not None
+    else:
+        rows = list(qs[: page_size + 1])
+        has_next_page = len(rows) > page_size
+        rows = rows[:page_size]
+        has_previous_page = after is not None
+
+    get_loaders(info).register(rows)
+    edges = [
+        connection_type.Edge(
+            node=row,
+            cursor=encode_cursor(
+                [getattr(row, f"_cursor_{i}") for i in range(len(ordering))]
+            ),
+        )
+        for row in rows
+    ]
+    connection = connection_type(
+        edges=edges,
+        page_info=graphene.relay.PageInfo(
+            has_next_page=has_next_page,
+            has_previous_page=has_previous_page,
+            start_cursor=edges[0].cursor if edges else None,
+            end_cursor=edges[-1].cursor if edges else None,
+        ),
+    )
+    connection.get_total_count = get_total_count or total_qs.count
+    return connection
+
+
+class CountableConnection(graphene.relay.Connection):
+    """A connection with a `totalCount` of all the rows that can be paginated through."""
+
+    class Meta:
+        abstract = True
+
+    total_count = graphene.Int()
+
+    def resolve_total_count(self, info):
+        """Resolve the number of rows in all pages, only counting them when selected."""
+        return self.get_total_count()
@@ -2,8 +2,18 @@ import graphene
 
 from items.graphql.crud import BaseCRUD
 from items.graphql.inputs import ItemFilterInput, ProjectFilterInput
-from items.graphql.types import ItemType, ProjectType
+from items.graphql.loaders import get_loaders
+from items.graphql.optimizer import optimize_queryset
+from items.graphql.pagination import connection_field, paginate
+from items.graphql.types import (
+    ItemConnection,
+    ItemType,
+    ProjectConnection,
+    ProjectTreeType,
+    ProjectType,
+)
 from items.models import Item, Project
+from items.tree import flatten_tree
 
 
 class Query(graphene.ObjectType):
@@ -11,24 +21,59 @@ class Query(graphene.ObjectType):
     projects = graphene.List(
         lambda: ProjectType, filters=graphene.Argument(ProjectFilterInput)
     )
+    projects_connection = connection_field(
+        lambda: ProjectConnection, filters=graphene.Argument(ProjectFilterInput)
+    )
     project = graphene.Field(lambda: ProjectType, id=graphene.ID())
+    project_tree = graphene.Field(
+        lambda: ProjectTreeType,
+        id=graphene.ID(required=True),
+        max_depth=graphene.Int(),
+        filters=graphene.Argument(ItemFilterInput),
+    )
     items = graphene.List(lambda: ItemType, filters=graphene.Argument(ItemFilterInput))
+    items_connection = connection_field(
+        lambda: ItemConnection, filters=graphene.Argument(ItemFilterInput)
+    )
     item = graphene.Field(lambda: ItemType, id=graphene.ID())
 
     def resolve_projects(self, info, filters=None):
         """Resolve all `Project`s that match the filter."""
         filters = filters or {}
-        return BaseCRUD(Project).read_all().filter_projects(**filters)
+        projects = BaseCRUD(Project).read_all().filter_projects(**filters)
+        return get_loaders(info).register(list(optimize_queryset(info, projects)))
+
+    def resolve_projects_connection(self, info, filters=None, **kwargs):
+        """Resolve a page of the `Project`s that match the filter."""
+        filters = filters or {}
+        projects = BaseCRUD(Project).read_all().filter_projects(**filters)
+        return paginate(info, ProjectConnection, projects, **kwargs)
 
     def resolve_project(self, info, id):
         """Resolve a `Project` by its id."""
-        return BaseCRUD(Project).read_one(id)
+        project = optimize_queryset(info, BaseCRUD(Project).read_all()).get(id=id)
+        return get_loaders(info).register([project])[0]
+
+    def resolve_project_tree(self, info, id, max_depth=None, filters=None):
+        """Resolve the tree of a `Project`'s `Item`s that match the filter, loaded in a single query."""
+        filters = filters or {}
+        roots = BaseCRUD(Project).read_one(id).get_tree(max_depth, **filters)
+        get_loaders(info).register([node.item for node in flatten_tree(roots)])
+        return ProjectTreeType(roots=roots)
 
     def resolve_items(self, info, filters=None):
         """Resolve all `Item`s that match the filter."""
         filters = filters or {}
-        return BaseCRUD(Item).read_all().filter_items(**filters)
+        items = BaseCRUD(Item).read_all().filter_items(**filters)
+        return get_loaders(info).register(list(optimize_queryset(info, items)))
+
+    def resolve_items_connection(self, info, filters=None, **kwargs):
+        """Resolve a page of the `Item`s that match the filter."""
+        filters = filters or {}
+        items = BaseCRUD(Item).read_all().filter_items(**filters)
+        return paginate(info, ItemConnection, items, **kwargs)
 
     def resolve_item(self, info, id):
         """Resolve an `Item` by its id."""
-        return BaseCRUD(Item).read_one(id)
+        item = optimize_queryset(info, BaseCRUD(Item).read_all()).get(id=id)
+        return get_loaders(info).register([item])[0]
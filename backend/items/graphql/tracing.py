@@ -0,0 +1,277 @@
+"""Per-field timing and SQL instrumentation of GraphQL requests.
+
+While the endpoint executes an operation (see `items.graphql.views`) a `Tracer` records how long each field's resolver
+took and how many SQL queries (and how long in them) it issued, via `TracingMiddleware` and a database execute
+wrapper. Resolvers that return a `QuerySet` have it evaluated by the middleware, so its query is counted against the
+field rather than whichever field happens to be resolving when it is iterated.
+
+Only some requests are traced, so the others run without the middleware or the execute wrapper: those with the
+`X-GraphQL-Tracing` header (if `GRAPHQL_TRACING` is enabled, as it is in debug mode), which get their timings in the
+response's `extensions.tracing`, a `GRAPHQL_TRACING_SAMPLE_RATE` fraction of the others (all of them in debug mode), and
+those checked for N+1 queries (see `items.graphql.nplusone`). The timings of every traced request are added to the
+rolling `resolver_stats`, whose percentiles are reported as metrics (see `items.metrics`).
+"""
+
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import QuerySet
+
+from backend.metrics import MetricFamily, Sample
+
+# The default number of the most recent timings of each field that percentiles are calculated from
+DEFAULT_WINDOW_SIZE = 1000
+
+# The percentiles reported for each field
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+class FieldTrace:
+    """The timing of one field resolved for one object."""
+
+    __slots__ = (
+        "path",
+        "parent_type",
+        "field_name",
+        "duration",
+        "sql_count",
+        "sql_duration",
+    )
+
+    def __init__(self, path, parent_type, field_name):
+        self.path = path
+        self.parent_type = parent_type
+        self.field_name = field_name
+        self.duration = 0.0
+        self.sql_count = 0
+        self.sql_duration = 0.0
+
+    def as_dict(self):
+        return {
+            "path": self.path,
+            "parentType": self.parent_type,
+            "fieldName": self.field_name,
+            "durationMs": round(self.duration * 1000, 3),
+            "sqlCount": self.sql_count,
+            "sqlDurationMs": round(self.sql_duration * 1000, 3),
+        }
+
+
+class Tracer:
+    """Records the `FieldTrace`s and SQL queries of one request.
+
+    Used as a database execute wrapper, counting each query against the field being resolved (if any). If
+    `record_queries` is set the SQL of each query is kept in `queries`, with the field it was made for (or None), for
+    `items.graphql.nplusone` to check.
+    """
+
+    def __init__(self, record_queries=False):
+        self.fields = []
+        self.queries = [] if record_queries else None
+        self._resolving = []
+        self.duration = 0.0
+        self.sql_count = 0
+        self.sql_duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.sql_count += 1
+            self.sql_duration += duration
+            if self.queries is not None:
+                self.queries.append(
+                    (self._resolving[-1] if self._resolving else None, sql)
+                )
+            if self._resolving:
+                self._resolving[-1].sql_count += 1
+                self._resolving[-1].sql_duration += duration
+
+    def resolve(self, next, root, info, **args):
+        """Resolve a field, recording its timing."""
+        trace = FieldTrace(info.path.as_list(), info.parent_type.name, info.field_name)
+        self._resolving.append(trace)
+        start = time.perf_counter()
+        try:
+            result = next(root, info, **args)
+            if isinstance(result, QuerySet):
+                result = list(result)
+            return result
+        finally:
+            trace.duration = time.perf_counter() - start
+            self._resolving.pop()
+            self.fields.append(trace)
+
+    def as_dict(self):
+        return {
+            "durationMs": round(self.duration * 1000, 3),
+            "sqlCount": self.sql_count,
+            "sqlDurationMs": round(self.sql_duration * 1000, 3),
+            "resolvers": [trace.as_dict() for trace in self.fields],
+        }
+
+
+class TracingMiddleware:
+    """Graphene middleware that records the timing of each field with the request's `Tracer`, if it has one.
+
+    Only installed by the endpoint for requests that are traced (see `GraphQLView.get_middleware`).
+    """
+
+    def resolve(self, next, root, info, **args):
+        tracer = getattr(info.context, "graphql_tracer", None)
+        if tracer is None:
+            return next(root, info, **args)
+        return tracer.resolve(next, root, info, **args)
+
+
+class FieldStats:
+    """The totals and most recent durations of one field, across requests."""
+
+    def __init__(self, window_size):
+        self.durations = deque(maxlen=window_size)
+        self.count = 0
+        self.duration = 0.0
+        self.sql_count = 0
+        self.sql_duration = 0.0
+
+    def quantiles(self):
+        """Return the durations at each of the `QUANTILES` of the most recent durations."""
+        durations = sorted(self.durations)
+        if not durations:
+            return {}
+        return {
+            quantile: durations[min(int(quantile * len(durations)), len(durations) - 1)]
+            for quantile in QUANTILES
+        }
+
+
+class ResolverStats:
+    """Rolling timings of each field (by parent type and field name), added to by every traced request."""
+
+    def __init__(self):
+        self._fields = {}
+        self._lock = threading.Lock()
+
+    @property
+    def window_size(self):
+        return getattr(settings, "GRAPHQL_TRACING_WINDOW_SIZE", DEFAULT_WINDOW_SIZE)
+
+    def add(self, tracer):
+        """Add the timings of a request's fields."""
+        with self._lock:
+            for trace in tracer.fields:
+                key = (trace.parent_type, trace.field_name)
+                stats = self._fields.get(key)
+                if stats is None:
+                    stats = self._fields[key] = FieldStats(self.window_size)
+                stats.durations.append(trace.duration)
+                stats.count += 1
+                stats.duration += trace.duration
+                stats.sql_count += trace.sql_count
+                stats.sql_duration += trace.sql_duration
+
+    def snapshot(self):
+        """Return a list of `(parent_type, field_name, FieldStats)`s, copied so they can be read without the lock."""
+        with self._lock:
+            snapshot = []
+            for (parent_type, field_name), stats in sorted(self._fields.items()):
+                copy = FieldStats(stats.durations.maxlen)
+                copy.durations.extend(stats.durations)
+                copy.count, copy.duration = stats.count, stats.duration
+                copy.sql_count, copy.sql_duration = stats.sql_count, stats.sql_duration
+                snapshot.append((parent_type, field_name, copy))
+            return snapshot
+
+    def clear(self):
+        with self._lock:
+            self._fields.clear()
+
+
+resolver_stats = ResolverStats()
+
+
+@contextmanager
+def trace_request(request, record_queries=False):
+    """Trace the execution of a request's operation, adding its timings to `resolver_stats` when it finishes."""
+    tracer = request.graphql_tracer = Tracer(record_queries)
+    start = time.perf_counter()
+    try:
+        with connection.execute_wrapper(tracer):
+            yield tracer
+    finally:
+        tracer.duration = time.perf_counter() - start
+        del request.graphql_tracer
+        resolver_stats.add(tracer)
+
+
+def tracing_requested(request):
+    """Return whether a request asked for its tracing to be returned in the response."""
+    return bool(
+        getattr(settings, "GRAPHQL_TRACING", settings.DEBUG)
+        and request.headers.get("X-GraphQL-Tracing")
+    )
+
+
+def tracing_enabled(request):
+    """Return whether a request should be traced, if it asked for its tracing or is sampled for `resolver_stats`."""
+    return tracing_requested(request) or random.random() < getattr(
+        settings, "GRAPHQL_TRACING_SAMPLE_RATE", float(settings.DEBUG)
+    )
+
+
+def collect_resolver_metrics():
+    """Report the rolling resolver timings as metrics (see `backend.metrics`)."""
+    durations, sql_counts, sql_durations = [], [], []
+    for parent_type, field_name, stats in resolver_stats.snapshot():
+        labels = {"parent_type": parent_type, "field_name": field_name}
+        for quantile, duration in stats.quantiles().items():
+            durations.append(
+                Sample(
+                    "graphql_resolver_duration_seconds",
+                    {**labels, "quantile": str(quantile)},
+                    duration,
+                )
+            )
+        durations.append(
+            Sample("graphql_resolver_duration_seconds_sum", labels, stats.duration)
+        )
+        durations.append(
+            Sample("graphql_resolver_duration_seconds_count", labels, stats.count)
+        )
+        sql_counts.append(
+            Sample("graphql_resolver_sql_queries_total", labels, stats.sql_count)
+        )
+        sql_durations.append(
+            Sample(
+                "graphql_resolver_sql_duration_seconds_total",
+                labels,
+                stats.sql_duration,
+            )
+        )
+    return [
+        MetricFamily(
+            "graphql_resolver_duration_seconds",
+            "summary",
+            "The time taken to resolve each field.",
+            durations,
+        ),
+        MetricFamily(
+            "graphql_resolver_sql_queries_total",
+            "counter",
+            "The number of SQL queries made while resolving each field.",
+            sql_counts,
+        ),
+        MetricFamily(
+            "graphql_resolver_sql_duration_seconds_total",
+            "counter",
+            "The time spent in SQL queries while resolving each field.",
+            sql_durations,
+        ),
+    ]
@@ -2,7 +2,10 @@ import graphene
 from graphene_django.types import DjangoObjectType
 
 from items.graphql.inputs import ItemFilterInput
+from items.graphql.loaders import get_loaders
+from items.graphql.pagination import CountableConnection, connection_field, paginate
 from items.models import Item, ItemLocation, ItemStatus, ItemType, Project
+from items.tree import flatten_tree
 
 
 class ProjectType(DjangoObjectType):
@@ -18,6 +21,9 @@ class ProjectType(DjangoObjectType):
     num_descendants = graphene.Int(filters=graphene.Argument(ItemFilterInput))
     items = descendants  # alias
     num_items = num_descendants  # alias
+    descendants_connection = connection_field(
+        lambda: ItemConnection, filters=graphene.Argument(ItemFilterInput)
+    )
     children = graphene.List(
         lambda: ItemType, filters=graphene.Argument(ItemFilterInput)
     )
@@ -53,26 +59,35 @@ class ProjectType(DjangoObjectType):
 
     def resolve_descendants(self, info, filters=None):
         """Resolve all `Item`s matching the filter that are descendants of (assigned to) the current `Project`."""
-        filters = filters or {}
-        return self.get_descendants(**filters)
+        return get_loaders(info).load("descendants", self, filters)
 
     def resolve_num_descendants(self, info, filters=None):
         """Resolve the number of `Item`s matching the filter that are descendants of (assigned to) this `Project`."""
-        filters = filters or {}
-        return self.get_num_descendants(**filters)
+        return get_loaders(info).load_count("num_descendants", self, filters)
 
-    resolve_get_items = resolve_descendants  # alias
-    resolve_get_num_items = resolve_num_descendants  # alias
+    resolve_items = resolve_descendants  # alias
+    resolve_num_items = resolve_num_descendants  # alias
+
+    def resolve_descendants_connection(self, info, filters=None, **kwargs):
+        """Resolve a page of the `Item`s matching the filter that are descendants of (assigned to) this `Project`."""
+        filters = filters or {}
+        return paginate(
+            info,
+            ItemConnection,
+            self.get_descendants(**filters),
+            get_total_count=lambda: get_loaders(info).load_count(
+                "num_descendants", self, filters
+            ),
+            **kwargs,
+        )
 
     def resolve_children(self, info, filters=None):
         """Resolve the `Item`s matching the filter that are direct children (do not have a parent `Item`) of this `Project`."""
-        filters = filters or {}
-        return self.get_children(**filters)
+        return get_loaders(info).load("children", self, filters)
 
     def resolve_num_children(self, info, filters=None):
         """Resolve the number of `Item`s matching the filter that are direct children (do not have a parent `Item`) of this `Project`."""
-        filters = filters or {}
-        return self.get_num_children(**filters)
+        return get_loaders(info).load_count("num_children", self, filters)
 
 
 class ItemTypeType(DjangoObjectType):
@@ -111,39 +126,116 @@ class ItemType(DjangoObjectType):
         lambda: ItemType, filters=graphene.Argument(ItemFilterInput)
     )
     num_children = graphene.Int(filters=graphene.Argument(ItemFilterInput))
+    children_connection = connection_field(
+        lambda: ItemConnection, filters=graphene.Argument(ItemFilterInput)
+    )
 
     class Meta:
         model = Item
         fields = "__all__"
 
+    def resolve_project(self, info):
+        """Resolve the `Project` this `Item` belongs to."""
+        return get_loaders(info).load("project", self)
+
+    def resolve_parent(self, info):
+        """Resolve the `Item` this `Item` is nested below."""
+        return get_loaders(info).load("parent", self)
+
+    def resolve_item_type(self, info):
+        """Resolve the `ItemType` attribute of this `Item`."""
+        return get_loaders(info).load("item_type", self)
+
+    def resolve_item_status(self, info):
+        """Resolve the `ItemStatus` attribute of this `Item`."""
+        return get_loaders(info).load("item_status", self)
+
+    def resolve_item_location(self, info):
+        """Resolve the `ItemLocation` attribute of this `Item`."""
+        return get_loaders(info).load("item_location", self)
+
     def resolve_ancestors(self, info):
         """Resolve all `Item`s that are ancestors of this `Item, ordered from root to this item's parent."""
-        return self.get_ancestors()
+        return get_loaders(info).register(list(self.get_ancestors()))
 
     def resolve_num_ancestors(self, info):
         """Resolve the number of `Item`s that are ancestors of this `Item`."""
-        return self.get_ancestors()
+        return self.get_num_ancestors()
 
     def resolve_siblings(self, info):
         """Resolve all the `Item`s that are siblings of this `Item`."""
-        return self.get_siblings()
+        return get_loaders(info).register(list(self.get_siblings()))
 
     def resolve_descendants(self, info, filters=None):
         """Resolve all `Item`s matching the filter that are descendants of this `Item."""
         filters = filters or {}
-        return self.get_descendants(**filters)
+        return get_loaders(info).register(list(self.get_descendants(**filters)))
 
     def resolve_num_descendants(self, info, filters=None):
         """Resolve the number of `Item`s matching the filter that are descendants of this `Item`."""
-        filters = filters or {}
-        return self.get_num_descendants(**filters)
+        return get_loaders(info).load_count("num_descendants", self, filters)
 
     def resolve_children(self, info, filters=None):
         """Resolve the `Item`s matching the filter that are direct children of this `Item`."""
-        filters = filters or {}
-        return self.get_children(**filters)
+        return get_loaders(info).load("children", self, filters)
 
     def resolve_num_children(self, info, filters=None):
         """Resolve the number of `Item`s matching the filter that are direct children of this `Item`."""
+        return get_loaders(info).load_count("num_children", self, filters)
+
+    def resolve_children_connection(self, info, filters=None, **kwargs):
+        """Resolve a page of the `Item`s matching the filter that are direct children of this `Item`."""
         filters = filters or {}
-        return self.get_num_children(**filters)
+        return paginate(
+            info,
+            ItemConnection,
+            self.get_children(**filters),
+            get_total_count=lambda: get_loaders(info).load_count(
+                "num_children", self, filters
+            ),
+            **kwargs,
+        )
+
+
+class TreeNodeType(graphene.ObjectType):
+    """An `Item` in a project tree, with the id of its parent and its depth in the tree and its nested children."""
+
+    id = graphene.ID()
+    parent_id = graphene.ID()
+    depth = graphene.Int()
+    item = graphene.Field(lambda: ItemType)
+    children = graphene.List(lambda: TreeNodeType)
+
+    def resolve_id(self, info):
+        return self.item.id
+
+
+class ProjectTreeType(graphene.ObjectType):
+    """The `Item`s of a project as a tree, either nested from the roots or as a flat depth first list of nodes."""
+
+    roots = graphene.List(TreeNodeType)
+    nodes = graphene.List(TreeNodeType)
+
+    def resolve_roots(self, info):
+        return self.roots
+
+    def resolve_nodes(self, info):
+        return flatten_tree(self.roots)
+
+
+class ProjectConnection(CountableConnection):
+    class Meta:
+        node = ProjectType
+
+
+class ItemConnection(CountableConnection):
+    class Meta:
+        node = ItemType
+
+
+class BatchError(graphene.ObjectType):
+    """The errors that made one row of a batch mutation invalid, with the id of the row if it had one."""
+
+    index = graphene.Int()
+    id = graphene.ID()
+    messages = graphene.List(graphene.String)
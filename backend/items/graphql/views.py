@@ -0,0 +1,276 @@
+import json
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.http import HttpResponseBadRequest, HttpResponseNotAllowed
+from graphene_django.constants import MUTATION_ERRORS_FLAG
+from graphene_django.settings import graphene_settings
+from graphene_django.views import GraphQLView as BaseGraphQLView
+from graphene_django.views import HttpError
+from graphql import (
+    ExecutionResult,
+    GraphQLError,
+    OperationType,
+    TypeInfo,
+    TypeInfoVisitor,
+    Visitor,
+    execute,
+    get_operation_ast,
+    specified_rules,
+    visit,
+)
+
+from items.graphql.cost import DEFAULT_MAX_COST, QueryDepthRule, estimate_cost
+from items.graphql.documents import (
+    document_cache,
+    get_persisted_query,
+    get_query_hash,
+    persist_query,
+)
+from items.graphql.nplusone import check_repeated_queries, detection_requested
+from items.graphql.tracing import (
+    TracingMiddleware,
+    trace_request,
+    tracing_enabled,
+    tracing_requested,
+)
+from items.metrics import cache_requests, graphql_operation_errors, graphql_operations
+from items.response_cache import (
+    ALL_TAGS,
+    get_cached_response,
+    get_response_cache,
+    get_response_key,
+    get_tag_versions,
+    set_cached_response,
+)
+
+
+def get_response_tags(schema, document):
+    """Return the tags (model labels) of the models whose fields a document selects.
+
+    Connections are tagged with the model of their nodes. Fields of any other object type without a model (eg the
+    project tree) may read any model, so are tagged with every model.
+    """
+    type_info = TypeInfo(schema)
+    tags = set()
+
+    class CollectTags(Visitor):
+        def enter_field(self, node, *args):
+            parent_type = type_info.get_parent_type()
+            graphene_type = getattr(parent_type, "graphene_type", None)
+            if graphene_type is None or parent_type is schema.query_type:
+                return  # Introspection or a root field
+            meta = graphene_type._meta
+            model = getattr(meta, "model", None)
+            if model is None and getattr(meta, "node", None) is not None:
+                model = meta.node._meta.model
+            if model is None:
+                tags.update(ALL_TAGS)
+            else:
+                tags.add(model._meta.label_lower)
+
+    visit(document, TypeInfoVisitor(type_info, CollectTags()))
+    return sorted(tags)
+
+
+class GraphQLView(BaseGraphQLView):
+    """The GraphQL endpoint, with persisted queries, cached documents, depth and cost limits and (if
+    `GRAPHQL_RESPONSE_CACHE` is set) cached responses to queries."""
+
+    validation_rules = (*specified_rules, QueryDepthRule)
+
+    def dispatch(self, request, *args, **kwargs):
+        self.extensions = {}  # Returned in the response's "extensions"
+        return super().dispatch(request, *args, **kwargs)
+
+    def json_encode(self, request, d, pretty=False):
+        if self.extensions:
+            d = {**d, "extensions": self.extensions}
+        return super().json_encode(request, d, pretty)
+
+    def get_graphql_params(self, request, data):
+        """Return the request's query, variables, operation name and id, looking up the query of a persisted query."""
+        query, variables, operation_name, id = super().get_graphql_params(request, data)
+        extensions = request.GET.get("extensions") or data.get("extensions")
+        if extensions and isinstance(extensions, str):
+            try:
+                extensions = json.loads(extensions)
+            except ValueError:
+                raise HttpError(HttpResponseBadRequest("Extensions are invalid JSON."))
+        persisted_query = (extensions or {}).get("persistedQuery")
+        if persisted_query:
+            query = self.get_persisted_query(query, persisted_query.get("sha256Hash"))
+        return query, variables, operation_name, id
+
+    def get_persisted_query(self, query, query_hash):
+        """Return the query persisted by a hash, or persist the query by its hash if it was sent with one."""
+        if not query:
+            query = get_persisted_query(query_hash)
+            cache_requests.inc(
+                cache="persisted_query", result="miss" if query is None else "hit"
+            )
+            if query is None:
+                raise HttpError(HttpResponseBadRequest(), "PersistedQueryNotFound")
+        elif get_query_hash(query) != query_hash:
+            raise HttpError(
+                HttpResponseBadRequest(), "The provided hash does not match the query."
+            )
+        else:
+            persist_query(query_hash, query)
+        return query
+
+    def execute_graphql_request(
+        self, request, data, query, variables, operation_name, show_graphiql=False
+    ):
+        """Execute a query as `GraphQLView` does, but with its parsed and validated document cached by query string."""
+        if not query:
+            if show_graphiql:
+                return None
+            raise HttpError(HttpResponseBadRequest("Must provide query string."))
+
+        document, errors = document_cache.get(
+            self.schema.graphql_schema, query, self.validation_rules
+        )
+        if errors:
+            return ExecutionResult(data=None, errors=errors)
+
+        operation = get_operation_ast(document.document, operation_name)
+        if (
+            request.method.lower() == "get"
+            and operation is not None
+            and operation.operation != OperationType.QUERY
+        ):
+            if show_graphiql:
+                return None
+            raise HttpError(
+                HttpResponseNotAllowed(
+                    ["POST"],
+                    f"Can only perform a {operation.operation.value} operation from a POST request.",
+                )
+            )
+
+        result = self.execute_operation(
+            request, document, variables, operation_name, operation
+        )
+        labels = {
+            "operation_type": operation.operation.value if operation else "unknown",
+            "operation_name": operation_name
+            or (operation and operation.name and operation.name.value)
+            or "anonymous",
+        }
+        graphql_operations.inc(**labels)
+        if result.errors:
+            graphql_operation_errors.inc(**labels)
+        return result
+
+    def execute_operation(
+        self, request, document, variables, operation_name, operation
+    ):
+        """Execute the operation of a validated document if it is within the cost limit, using any cached response."""
+        if operation is not None:
+            max_cost = getattr(settings, "GRAPHQL_MAX_COST", DEFAULT_MAX_COST)
+            cost = estimate_cost(
+                self.schema.graphql_schema, document.document, operation, variables
+            )
+            self.extensions["cost"] = {"estimated": cost, "maximum": max_cost}
+            if cost > max_cost:
+                return ExecutionResult(
+                    errors=[
+                        GraphQLError(
+                            f"The estimated cost of {cost} exceeds the maximum of {max_cost}.",
+                            operation,
+                        )
+                    ]
+                )
+
+        cache = get_response_cache()
+        if (
+            cache is None
+            or operation is None
+            or operation.operation != OperationType.QUERY
+        ):
+            return self.execute_document(
+                request, document.document, variables, operation_name, operation
+            )
+
+        key = get_response_key(document.normalized_query, variables, operation_name)
+        cached = get_cached_response(cache, key)
+        cache_requests.inc(
+            cache="graphql_response", result="miss" if cached is None else "hit"
+        )
+        if cached is not None:
+            return ExecutionResult(data=cached)
+
+        # Read the versions before executing, so any write made meanwhile invalidates the response
+        versions = get_tag_versions(
+            cache, get_response_tags(self.schema.graphql_schema, document.document)
+        )
+        result = self.execute_document(
+            request, document.document, variables, operation_name, operation
+        )
+        if not result.errors:
+            set_cached_response(cache, key, versions, result.data)
+        return result
+
+    def get_middleware(self, request):
+        """Return the configured middleware, with `TracingMiddleware` added if the request is being traced."""
+        middleware = super().get_middleware(request)
+        if getattr(request, "graphql_tracer", None) is None:
+            return middleware
+        return [*(middleware or []), TracingMiddleware()]
+
+    def execute_document(self, request, document, variables, operation_name, operation):
+        """Execute a validated document, tracing the timings of its fields (see `items.graphql.tracing`) and checking
+        for N+1 queries (see `items.graphql.nplusone`) if the request is traced or sampled for either.
+        """
+        detect_repeated_queries = detection_requested()
+        if not (detect_repeated_queries or tracing_enabled(request)):
+            return self._execute_document(
+                request, document, variables, operation_name, operation
+            )
+        with trace_request(request, record_queries=detect_repeated_queries) as tracer:
+            result = self._execute_document(
+                request, document, variables, operation_name, operation
+            )
+        if detect_repeated_queries:
+            check_repeated_queries(tracer, operation_name)
+        if tracing_requested(request):
+            self.extensions["tracing"] = tracer.as_dict()
+        return result
+
+    def _execute_document(
+        self, request, document, variables, operation_name, operation
+    ):
+        """Execute a validated document, running mutations atomically if `ATOMIC_MUTATIONS` is set."""
+        try:
+            execute_options = {
+                "root_value": self.get_root_value(request),
+                "context_value": self.get_context(request),
+                "variable_values": variables,
+                "operation_name": operation_name,
+                "middleware": self.get_middleware(request),
+            }
+            if self.execution_context_class:
+                execute_options["execution_context_class"] = (
+                    self.execution_context_class
+                )
+
+            if (
+                operation is not None
+                and operation.operation == OperationType.MUTATION
+                and (
+                    graphene_settings.ATOMIC_MUTATIONS is True
+                    or connection.settings_dict.get("ATOMIC_MUTATIONS", False) is True
+                )
+            ):
+                with transaction.atomic():
+                    result = execute(
+                        self.schema.graphql_schema, document, **execute_options
+                    )
+                    if getattr(request, MUTATION_ERRORS_FLAG, False) is True:
+                        transaction.set_rollback(True)
+                return result
+
+            return execute(self.schema.graphql_schema, document, **execute_options)
+        except Exception as e:
+            return ExecutionResult(errors=[e])
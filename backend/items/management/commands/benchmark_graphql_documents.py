@@ -0,0 +1,83 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from items.graphql.documents import DocumentCache, get_query_hash
+from items.graphql.schema import schema
+
+# The queries sent by the frontend's dashboard and item detail pages
+QUERIES = {
+    "dashboard": """
+        query GetProjects {
+          projects {
+            id
+            name
+            children {
+              id
+              title
+            }
+          }
+        }
+    """,
+    "item detail": """
+        query GetItem($id: ID!) {
+          item(id: $id) {
+            id
+            itemType { id name }
+            itemStatus { id name }
+            title
+            changelog
+            requirements
+            outcome
+            project { id name }
+            parent { id itemType { id name } itemStatus { id name } title numChildren }
+            children { id itemType { id name } itemStatus { id name } title numChildren }
+          }
+        }
+    """,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Time parsing and validating the frontend's queries on every request against using cached documents, and "
+        "compare the size of each request with and without persisted queries."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--iterations",
+            type=int,
+            default=1000,
+            help="The number of requests to time for each query (default 1000).",
+        )
+
+    def handle(self, *args, **options):
+        iterations = options["iterations"]
+        graphql_schema = schema.graphql_schema
+        for name, query in QUERIES.items():
+            uncached = self.time_requests(
+                iterations, lambda: DocumentCache().get(graphql_schema, query)
+            )
+            documents = DocumentCache()
+            documents.get(graphql_schema, query)
+            cached = self.time_requests(
+                iterations, lambda: documents.get(graphql_schema, query)
+            )
+            persisted_size = len(
+                f'{{"extensions":{{"persistedQuery":{{"version":1,"sha256Hash":"{get_query_hash(query)}"}}}}}}'
+            )
+            self.stdout.write(
+                f"{name}: {uncached * 1000:.3f}ms of CPU per request parsing and validating, "
+                f"{cached * 1000:.3f}ms with a cached document (saving {(uncached - cached) * 1000:.3f}ms); "
+                f"{len(query)} bytes of query or {persisted_size} bytes as a persisted query."
+            )
+
+    def time_requests(self, iterations, get_document):
+        """Return the mean CPU time taken to get a document."""
+        start = time.process_time()
+        for _ in range(iterations):
+            document, errors = get_document()
+            if errors:
+                raise errors[0]
+        return (time.process_time() - start) / iterations
@@ -0,0 +1,90 @@
+import time
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from items.models import Item, ItemClosure, Project
+from items.tree import get_tree_strategy
+
+
+class Command(BaseCommand):
+    help = (
+        "Time moving a large subtree with the moveSubtree logic, in a generated project that is rolled back "
+        "afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--size",
+            type=int,
+            default=10000,
+            help="The number of items in the moved subtree (default 10000).",
+        )
+        parser.add_argument(
+            "--breadth",
+            type=int,
+            default=10,
+            help="The number of children of each item in the moved subtree (default 10).",
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            project = Project.objects.create(name="benchmark_move_subtree")
+            moved, target = self.generate_items(
+                project, options["size"], options["breadth"]
+            )
+
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                moved.move_to(target)
+                duration = time.perf_counter() - start
+
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Moved a subtree of {options['size']} item(s) using the {get_tree_strategy()} strategy in "
+                    f"{duration * 1000:.1f}ms with {len(queries)} queries."
+                )
+            )
+            transaction.set_rollback(True)
+
+    def generate_items(self, project, size, breadth):
+        """Create a root item with a subtree of `size` items (including itself) and a second root to move it below."""
+        item_type = project.get_default_item_type()  # Nestable
+        attributes = {
+            "project": project,
+            "item_type": item_type,
+            "item_status": project.get_default_item_status(),
+            "item_location": project.get_default_item_location(),
+            "item_type_order": item_type.order,
+        }
+        moved, target = Item.objects.bulk_create(
+            [Item(title="moved", **attributes), Item(title="target", **attributes)]
+        )
+
+        # Insert the subtree one level at a time so each level knows the ids in its paths
+        level, num_items = [moved], 1
+        while num_items < size:
+            children = []
+            for parent in level:
+                for _ in range(min(breadth, size - num_items - len(children))):
+                    children.append(
+                        Item(
+                            title=f"item {num_items + len(children)}",
+                            parent=parent,
+                            path=parent._get_subtree_path(),
+                            depth=parent.depth + 1,
+                            **attributes,
+                        )
+                    )
+            level = Item.objects.bulk_create(children, batch_size=1000)
+            num_items += len(level)
+
+        call_command(
+            "recount", project=[project.id], stdout=StringIO(), stderr=StringIO()
+        )
+        if get_tree_strategy() == "closure":
+            ItemClosure.objects.rebuild(project.id)
+        return Item.objects.get(id=moved.id), Item.objects.get(id=target.id)
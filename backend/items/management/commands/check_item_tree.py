@@ -0,0 +1,104 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from items.models import Item, ItemClosure, Project
+from items.response_cache import invalidate_responses
+from items.tree import build_closure, build_paths, get_tree_strategy
+
+
+class Command(BaseCommand):
+    help = (
+        "Check that the stored materialized paths (and closure table rows, if that strategy is selected) of items "
+        "match their parent relationships."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--project",
+            type=int,
+            action="append",
+            help="Only check the items of this project id (can be repeated).",
+        )
+        parser.add_argument(
+            "--fix",
+            action="store_true",
+            help="Rewrite any inconsistent paths and closure rows instead of failing.",
+        )
+
+    def handle(self, *args, **options):
+        projects = Project.objects.order_by("id")
+        if options["project"]:
+            projects = projects.filter(id__in=options["project"])
+
+        num_inconsistent = 0
+        for project_id in projects.values_list("id", flat=True):
+            num_inconsistent += self.check_project(project_id, options["fix"])
+
+        if num_inconsistent and not options["fix"]:
+            raise CommandError(
+                f"Found {num_inconsistent} inconsistent item(s), run again with --fix to repair them."
+            )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Checked {projects.count()} project(s), "
+                f"{'fixed' if options['fix'] else 'found'} {num_inconsistent} inconsistent item(s)."
+            )
+        )
+
+    def check_project(self, project_id, fix):
+        """Compare the stored and expected paths for all items in a project and return the number that differ."""
+        rows = (
+            Item.objects.filter(project_id=project_id)
+            .order_by()
+            .values_list("id", "parent_id", "path", "depth")
+        )
+        stored = {item_id: (path, depth) for item_id, _, path, depth in rows}
+        try:
+            expected = build_paths(
+                {item_id: parent_id for item_id, parent_id, _, _ in rows}
+            )
+        except ValueError as e:
+            raise CommandError(f"Project {project_id}: {e}")
+
+        inconsistent = [
+            Item(id=item_id, path=path, depth=depth)
+            for item_id, (path, depth) in expected.items()
+            if stored[item_id] != (path, depth)
+        ]
+        for item in inconsistent:
+            self.stderr.write(
+                f"Project {project_id}: item {item.id} has path {stored[item.id][0]!r} "
+                f"(depth {stored[item.id][1]}), expected {item.path!r} (depth {item.depth})"
+            )
+
+        if fix and inconsistent:
+            Item.objects.bulk_update(inconsistent, ["path", "depth"], batch_size=1000)
+            invalidate_responses(Item)
+
+        num_inconsistent = len(inconsistent)
+        if get_tree_strategy() == "closure":
+            num_inconsistent += self.check_project_closure(project_id, expected, fix)
+        return num_inconsistent
+
+    def check_project_closure(self, project_id, expected, fix):
+        """Compare the stored and expected closure rows for all items in a project and return the number that differ."""
+        stored_rows = set(
+            ItemClosure.objects.filter(descendant__project_id=project_id).values_list(
+                "ancestor_id", "descendant_id", "depth"
+            )
+        )
+        expected_rows = {
+            row
+            for item_id, (path, _) in expected.items()
+            for row in build_closure(item_id, path)
+        }
+        inconsistent_ids = {
+            descendant_id for _, descendant_id, _ in stored_rows ^ expected_rows
+        }
+        for item_id in sorted(inconsistent_ids):
+            self.stderr.write(
+                f"Project {project_id}: item {item_id} has inconsistent closure rows"
+            )
+
+        if fix and inconsistent_ids:
+            ItemClosure.objects.rebuild(project_id)
+        return len(inconsistent_ids)
@@ -0,0 +1,116 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from items.models import Item, ItemClosure, Project
+from items.response_cache import invalidate_responses
+from items.tree import get_tree_strategy
+
+
+def generate_project(name, breadth, depth, max_items=None):
+    """Create a project whose items form a tree `depth` levels deep with `breadth` children below each item (and
+    `breadth` root items), stopping at `max_items` items, and return it.
+
+    Items are bulk inserted one level at a time, so each level knows the ids in its paths, and their statuses cycle
+    through the project's statuses. The counters (and closure table, if selected) are rebuilt afterwards.
+    """
+    project = Project.objects.create(name=name)
+    item_type = project.get_default_item_type()  # Nestable
+    statuses = list(project.get_item_statuses())
+    attributes = {
+        "project": project,
+        "item_type": item_type,
+        "item_location": project.get_default_item_location(),
+        "item_type_order": item_type.order,
+    }
+
+    level, num_items = [None], 0
+    for _ in range(depth):
+        items = []
+        for parent in level:
+            for _ in range(breadth):
+                if max_items is not None and num_items + len(items) >= max_items:
+                    break
+                index = num_items + len(items)
+                items.append(
+                    Item(
+                        title=f"item {index}",
+                        changelog=f"changelog of item {index}",
+                        parent=parent,
+                        path=parent._get_subtree_path() if parent else "",
+                        depth=parent.depth + 1 if parent else 0,
+                        item_status=statuses[index % len(statuses)],
+                        **attributes,
+                    )
+                )
+        if not items:
+            break
+        level = Item.objects.bulk_create(items, batch_size=1000)
+        num_items += len(level)
+
+    call_command("recount", project=[project.id], stdout=StringIO(), stderr=StringIO())
+    if get_tree_strategy() == "closure":
+        ItemClosure.objects.rebuild(project.id)
+    project.refresh_from_db()
+    return project
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate projects with a synthetic item hierarchy of a configurable breadth, depth and size, eg to benchmark "
+        "or load test against."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--projects",
+            type=int,
+            default=1,
+            help="The number of projects to generate (default 1).",
+        )
+        parser.add_argument(
+            "--breadth",
+            type=int,
+            default=10,
+            help="The number of root items of each project and children of each item (default 10).",
+        )
+        parser.add_argument(
+            "--depth",
+            type=int,
+            default=3,
+            help="The number of levels of items in each project (default 3).",
+        )
+        parser.add_argument(
+            "--items",
+            type=int,
+            help="The most items to generate in each project (default breadth + breadth^2 + ... + breadth^depth).",
+        )
+        parser.add_argument(
+            "--name",
+            default="generated",
+            help='The name of the projects, followed by their number (default "generated").',
+        )
+
+    def handle(self, *args, **options):
+        if options["breadth"] < 1 or options["depth"] < 1:
+            raise CommandError("The breadth and depth must be at least 1.")
+
+        num_items = 0
+        for i in range(options["projects"]):
+            with transaction.atomic():
+                project = generate_project(
+                    f"{options['name']} {i + 1}",
+                    options["breadth"],
+                    options["depth"],
+                    options["items"],
+                )
+            num_items += project.num_descendants
+        invalidate_responses(Project, Item)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Generated {options['projects']} project(s) with {num_items} item(s)."
+            )
+        )
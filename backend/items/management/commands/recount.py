@@ -0,0 +1,64 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from items.mixins import CounterMixin
+from items.models import Item, Project
+from items.response_cache import invalidate_responses
+
+
+class Command(BaseCommand):
+    help = "Rebuild the stored child and descendant counters of projects and items from the item hierarchy."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--project",
+            type=int,
+            action="append",
+            help="Only recount this project id (can be repeated).",
+        )
+        parser.add_argument(
+            "--verify",
+            action="store_true",
+            help="Only report counters that have drifted (failing if any have) instead of rebuilding them.",
+        )
+
+    def handle(self, *args, **options):
+        projects = Project.objects.order_by("id")
+        if options["project"]:
+            projects = projects.filter(id__in=options["project"])
+
+        num_drifted = 0
+        for project_id in projects.values_list("id", flat=True):
+            num_drifted += self.recount_project(project_id, options["verify"])
+
+        if num_drifted and options["verify"]:
+            raise CommandError(
+                f"Found {num_drifted} drifted counter(s), run again without --verify to rebuild them."
+            )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Checked {projects.count()} project(s), "
+                f"{'found' if options['verify'] else 'rebuilt'} {num_drifted} drifted counter(s)."
+            )
+        )
+
+    def recount_project(self, project_id, verify):
+        """Compare the stored and expected counters of a project and its items and return the number that differ."""
+        fields = CounterMixin.COUNTER_FIELDS
+        with transaction.atomic():
+            # Lock the project so that no item writes change the counters while they are rebuilt
+            project = (
+                Project.objects.select_for_update().only(*fields).get(id=project_id)
+            )
+            drifted = project.find_drifted_counters()
+            for obj, expected in drifted:
+                stored = tuple(getattr(obj, field) for field in fields)
+                self.stderr.write(
+                    f"Project {project_id}: {'project' if obj is project else f'item {obj.id}'} has counters "
+                    f"{stored}, expected {expected}"
+                )
+
+            if drifted and not verify:
+                project.rebuild_counters(drifted)
+                invalidate_responses(Item)
+        return len(drifted)
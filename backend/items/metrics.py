@@ -0,0 +1,82 @@
+"""The metrics of the items app, registered with the process's metrics registry (see `backend.metrics`)."""
+
+from backend.metrics import MetricFamily, Sample, registry
+from items.graphql.documents import document_cache
+from items.graphql.tracing import collect_resolver_metrics
+from items.tree_index import tree_index_cache
+
+graphql_operations = registry.counter(
+    "graphql_operations_total",
+    "The number of GraphQL operations executed (or served from the response cache).",
+    ["operation_type", "operation_name"],
+)
+graphql_operation_errors = registry.counter(
+    "graphql_operation_errors_total",
+    "The number of GraphQL operations whose response had errors.",
+    ["operation_type", "operation_name"],
+)
+graphql_repeated_queries = registry.counter(
+    "graphql_repeated_queries_total",
+    "The number of repeated (N+1) queries found in sampled requests, by the path of the field that made them.",
+    ["path"],
+)
+crud_operations = registry.counter(
+    "crud_operations_total",
+    "The number of objects created, updated and deleted through the CRUD layer, by whether they succeeded.",
+    ["model", "operation", "result"],
+)
+crud_operation_duration = registry.histogram(
+    "crud_operation_duration_seconds",
+    "The time taken to create, update or delete an object through the CRUD layer.",
+    ["model", "operation"],
+)
+
+# The requests made of the caches that are counted as they happen, the in-process caches count their own
+cache_requests = registry.counter(
+    "cache_requests_total",
+    "The number of lookups in each cache, by whether they were a hit or a miss.",
+    ["cache", "result"],
+)
+
+
+def collect_cache_metrics():
+    """Report the hits and misses of the in-process caches, and the hit ratio of every cache."""
+    samples = []
+    for name, cache in (
+        ("graphql_document", document_cache),
+        ("tree_index", tree_index_cache),
+    ):
+        stats = cache.stats()
+        for result, key in (("hit", "hits"), ("miss", "misses")):
+            samples.append(
+                Sample(
+                    "cache_requests_total",
+                    {"cache": name, "result": result},
+                    stats[key],
+                )
+            )
+
+    totals = {}  # {cache: (hits, requests), ...}
+    for sample in [*cache_requests.collect()[0].samples, *samples]:
+        hits, requests = totals.get(sample.labels["cache"], (0, 0))
+        if sample.labels["result"] == "hit":
+            hits += sample.value
+        totals[sample.labels["cache"]] = (hits, requests + sample.value)
+    return [
+        # Merged with the samples of `cache_requests`
+        MetricFamily("cache_requests_total", "counter", cache_requests.help, samples),
+        MetricFamily(
+            "cache_hit_ratio",
+            "gauge",
+            "The proportion of the lookups in each cache that were hits.",
+            [
+                Sample("cache_hit_ratio", {"cache": cache}, hits / requests)
+                for cache, (hits, requests) in sorted(totals.items())
+                if requests
+            ],
+        ),
+    ]
+
+
+registry.add_collector(collect_cache_metrics)
+registry.add_collector(collect_resolver_metrics)
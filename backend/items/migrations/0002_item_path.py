@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-16 20:40
+
+from django.db import migrations, models
+
+
+def backfill_item_paths(apps, schema_editor):
+    """Set the materialized path and depth of all existing items from their parent relationships."""
+    Item = apps.get_model("items", "Item")
+    parent_lookup = dict(Item.objects.order_by().values_list("id", "parent_id"))
+
+    paths = {}
+    for item_id in parent_lookup:
+        chain = []
+        current_id = item_id
+        while current_id is not None and current_id not in paths:
+            chain.append(current_id)
+            current_id = parent_lookup.get(current_id)
+        for chain_id in reversed(chain):
+            parent_id = parent_lookup.get(chain_id)
+            if parent_id is None:
+                paths[chain_id] = ("", 0)
+            else:
+                parent_path, parent_depth = paths[parent_id]
+                paths[chain_id] = (f"{parent_path}{parent_id}/", parent_depth + 1)
+
+    items = [
+        Item(id=item_id, path=path, depth=depth)
+        for item_id, (path, depth) in paths.items()
+        if depth
+    ]
+    Item.objects.bulk_update(items, ["path", "depth"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("items", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="item",
+            options={"ordering": ["item_type__order", "created_at"]},
+        ),
+        migrations.AddField(
+            model_name="item",
+            name="depth",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="item",
+            name="path",
+            field=models.TextField(
+                blank=True, db_index=True, default="", editable=False
+            ),
+        ),
+        migrations.RunPython(backfill_item_paths, migrations.RunPython.noop),
+    ]
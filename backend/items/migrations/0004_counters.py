@@ -0,0 +1,82 @@
+# Generated by Django 5.2.18 on 2026-10-16 20:52
+
+from collections import Counter, defaultdict
+
+from django.db import migrations, models
+
+
+def backfill_counters(apps, schema_editor):
+    """Set the stored counters of all existing projects and items from the stored materialized paths."""
+    Project = apps.get_model("items", "Project")
+    Item = apps.get_model("items", "Item")
+
+    num_children = Counter()
+    num_descendants = Counter()
+    by_status = defaultdict(Counter)
+    for project_id, path, item_status_id in (
+        Item.objects.order_by()
+        .values_list("project_id", "path", "item_status_id")
+        .iterator()
+    ):
+        ancestor_keys = [("project", project_id)] + [
+            ("item", int(id)) for id in path.split("/") if id
+        ]
+        num_children[ancestor_keys[-1]] += 1
+        for key in ancestor_keys:
+            num_descendants[key] += 1
+            by_status[key][str(item_status_id)] += 1
+
+    fields = ["num_children", "num_descendants", "num_descendants_by_status"]
+    for model, kind in ((Project, "project"), (Item, "item")):
+        objs = [
+            model(
+                id=id,
+                num_children=num_children[(kind, id)],
+                num_descendants=num,
+                num_descendants_by_status=dict(sorted(by_status[(kind, id)].items())),
+            )
+            for (key_kind, id), num in num_descendants.items()
+            if key_kind == kind
+        ]
+        model.objects.bulk_update(objs, fields, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("items", "0003_item_closure"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="item",
+            name="num_children",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="item",
+            name="num_descendants",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="item",
+            name="num_descendants_by_status",
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name="project",
+            name="num_children",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="project",
+            name="num_descendants",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="project",
+            name="num_descendants_by_status",
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,74 @@
+# Generated by Django 5.2.18 on 2026-10-16 20:58
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_item_type_order(apps, schema_editor):
+    """Copy the order of each item's type onto the item."""
+    Item = apps.get_model("items", "Item")
+    ItemType = apps.get_model("items", "ItemType")
+    Item.objects.update(
+        item_type_order=Subquery(
+            ItemType.objects.filter(id=OuterRef("item_type_id")).values("order")[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("items", "0004_counters"),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="item",
+            options={"ordering": ["item_type_order", "created_at"]},
+        ),
+        migrations.AddField(
+            model_name="item",
+            name="item_type_order",
+            field=models.SmallIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_item_type_order, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="item",
+            index=models.Index(
+                fields=["project", "parent", "item_type_order", "created_at"],
+                name="item_project_parent_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="item",
+            index=models.Index(
+                fields=["project", "item_status"], name="item_project_status_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="item",
+            index=models.Index(
+                fields=["project", "item_location"], name="item_project_location_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="item",
+            index=models.Index(
+                fields=["project", "created_at"], name="item_project_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="item",
+            index=models.Index(
+                fields=["project", "item_type_order", "created_at", "id"],
+                name="item_project_order_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="item",
+            index=models.Index(
+                fields=["parent", "item_type_order", "created_at", "id"],
+                name="item_parent_order_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,88 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("items", "0005_item_indexes"),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name="itemlocation",
+            constraint=models.UniqueConstraint(
+                fields=("project", "name"),
+                name="items_itemlocation_unique_name",
+                violation_error_message="Names must be unique within each project.",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="itemlocation",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("default", True)),
+                fields=("project",),
+                name="items_itemlocation_unique_default",
+                violation_error_message="There can only be one default within each project.",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="itemlocation",
+            constraint=models.UniqueConstraint(
+                fields=("project", "order"),
+                name="items_itemlocation_unique_order",
+                violation_error_message="Orders must be unique within each project.",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="itemstatus",
+            constraint=models.UniqueConstraint(
+                fields=("project", "name"),
+                name="items_itemstatus_unique_name",
+                violation_error_message="Names must be unique within each project.",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="itemstatus",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("default", True)),
+                fields=("project",),
+                name="items_itemstatus_unique_default",
+                violation_error_message="There can only be one default within each project.",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="itemstatus",
+            constraint=models.UniqueConstraint(
+                fields=("project", "order"),
+                name="items_itemstatus_unique_order",
+                violation_error_message="Orders must be unique within each project.",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="itemtype",
+            constraint=models.UniqueConstraint(
+                fields=("project", "name"),
+                name="items_itemtype_unique_name",
+                violation_error_message="Names must be unique within each project.",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="itemtype",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("default", True)),
+                fields=("project",),
+                name="items_itemtype_unique_default",
+                violation_error_message="There can only be one default within each project.",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="itemtype",
+            constraint=models.UniqueConstraint(
+                fields=("project", "order"),
+                name="items_itemtype_unique_order",
+                violation_error_message="Orders must be unique within each project.",
+            ),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("items", "0006_attribute_constraints"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="project",
+            name="tree_version",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
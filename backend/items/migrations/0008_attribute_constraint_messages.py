@@ -0,0 +1,97 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("items", "0007_project_tree_version"),
+    ]
+
+    operations = [
+        migrations.AlterConstraint(
+            model_name="itemlocation",
+            name="items_itemlocation_unique_name",
+            constraint=models.UniqueConstraint(
+                fields=("project", "name"),
+                name="items_itemlocation_unique_name",
+                violation_error_message="ItemLocation names must be unique within each project.",
+            ),
+        ),
+        migrations.AlterConstraint(
+            model_name="itemlocation",
+            name="items_itemlocation_unique_default",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("default", True)),
+                fields=("project",),
+                name="items_itemlocation_unique_default",
+                violation_error_message="There can only be one default ItemLocation within each project.",
+            ),
+        ),
+        migrations.AlterConstraint(
+            model_name="itemlocation",
+            name="items_itemlocation_unique_order",
+            constraint=models.UniqueConstraint(
+                fields=("project", "order"),
+                name="items_itemlocation_unique_order",
+                violation_error_message="ItemLocation order must be unique within each project.",
+            ),
+        ),
+        migrations.AlterConstraint(
+            model_name="itemstatus",
+            name="items_itemstatus_unique_name",
+            constraint=models.UniqueConstraint(
+                fields=("project", "name"),
+                name="items_itemstatus_unique_name",
+                violation_error_message="ItemStatus names must be unique within each project.",
+            ),
+        ),
+        migrations.AlterConstraint(
+            model_name="itemstatus",
+            name="items_itemstatus_unique_default",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("default", True)),
+                fields=("project",),
+                name="items_itemstatus_unique_default",
+                violation_error_message="There can only be one default ItemStatus within each project.",
+            ),
+        ),
+        migrations.AlterConstraint(
+            model_name="itemstatus",
+            name="items_itemstatus_unique_order",
+            constraint=models.UniqueConstraint(
+                fields=("project", "order"),
+                name="items_itemstatus_unique_order",
+                violation_error_message="ItemStatus order must be unique within each project.",
+            ),
+        ),
+        migrations.AlterConstraint(
+            model_name="itemtype",
+            name="items_itemtype_unique_name",
+            constraint=models.UniqueConstraint(
+                fields=("project", "name"),
+                name="items_itemtype_unique_name",
+                violation_error_message="ItemType names must be unique within each project.",
+            ),
+        ),
+        migrations.AlterConstraint(
+            model_name="itemtype",
+            name="items_itemtype_unique_default",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("default", True)),
+                fields=("project",),
+                name="items_itemtype_unique_default",
+                violation_error_message="There can only be one default ItemType within each project.",
+            ),
+        ),
+        migrations.AlterConstraint(
+            model_name="itemtype",
+            name="items_itemtype_unique_order",
+            constraint=models.UniqueConstraint(
+                fields=("project", "order"),
+                name="items_itemtype_unique_order",
+                violation_error_message="ItemType order must be unique within each project.",
+            ),
+        ),
+    ]
@@ -15,3 +15,63 @@ class AuditMixin(models.Model):
 
     class Meta:
         abstract = True
+
+
+class CounterMixin(models.Model):
+    """An abstract mixin model for the stored counts of the items nested below an object.
+
+    The counts are maintained as items are created, moved, restatused and deleted (see `Item.save` and `Item.delete`)
+    and can be rebuilt with the `recount` management command.
+
+    Attributes:
+        num_children (int): The number of items nested directly below the object.
+        num_descendants (int): The number of items nested (at any level) below the object.
+        num_descendants_by_status (dict): The number of descendants with each status, keyed by `ItemStatus` id.
+    """
+
+    num_children = models.PositiveIntegerField(default=0, editable=False)
+    num_descendants = models.PositiveIntegerField(default=0, editable=False)
+    num_descendants_by_status = models.JSONField(
+        default=dict, blank=True, editable=False
+    )
+
+    class Meta:
+        abstract = True
+
+    COUNTER_FIELDS = ("num_children", "num_descendants", "num_descendants_by_status")
+
+    # The fields that are only written as changes to the stored values, never by a plain save
+    MAINTAINED_FIELDS = COUNTER_FIELDS
+
+    @staticmethod
+    def get_stored_count_field(field_name, **filters):
+        """Return the stored field that can answer a count with some filters, or None if it must be counted."""
+        filters = {name: value for name, value in filters.items() if value}
+        if not filters:
+            return field_name
+        if field_name == "num_descendants" and filters.keys() == {"item_status"}:
+            return "num_descendants_by_status"
+        return None
+
+    def get_saved_field_names(self):
+        """Return the names of the fields written by a plain save, all but the primary key and the maintained fields."""
+        return [
+            field.name
+            for field in self._meta.concrete_fields
+            if not field.primary_key and field.name not in self.MAINTAINED_FIELDS
+        ]
+
+    def save(self, *args, **kwargs):
+        """Saves the object without its maintained fields, which are only written as changes to the stored values."""
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = self.get_saved_field_names()
+        super().save(*args, **kwargs)
+
+    def get_stored_count(self, field_name, **filters):
+        """Return a count from the stored counters, or None if it cannot be answered with those filters."""
+        stored_field = self.get_stored_count_field(field_name, **filters)
+        if stored_field == "num_descendants_by_status":
+            return self.num_descendants_by_status.get(str(filters["item_status"]), 0)
+        if stored_field is not None:
+            return getattr(self, stored_field)
+        return None
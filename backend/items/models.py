@@ -1,8 +1,31 @@
+from collections import Counter, defaultdict
+
 from django.core.exceptions import ValidationError
-from django.db import models
+from django.db import connections, models, transaction
+from django.db.models import F, Q, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Concat, Substr
+from django.utils.text import format_lazy
 from django.utils.translation import gettext_lazy as _
 
-from items.mixins import AuditMixin
+from items.mixins import AuditMixin, CounterMixin
+from items.response_cache import invalidate_responses
+from items.tree import (
+    PATH_SEPARATOR,
+    build_closure,
+    build_counts,
+    build_tree,
+    get_tree_strategy,
+    join_path,
+    split_path,
+)
+from items.tree_index import get_tree_index
+from items.validation import (
+    get_validation_context,
+    invalidate_validation_context,
+    validate_item,
+    validate_subtree,
+)
 
 
 class ProjectQuerySet(models.QuerySet):
@@ -14,36 +37,123 @@ class ProjectQuerySet(models.QuerySet):
 
 
 class ItemQuerySet(models.QuerySet):
-    def filter_items(self, **filters):
-        qs = self
+    @staticmethod
+    def get_filter_q(prefix="", **filters):
+        """Return the `Q` matching the same items as `filter_items`, for items reached through the lookup `prefix`."""
+        q = Q()
         if filters.get("title_contains"):
-            qs = qs.filter(title__icontains=filters["title_contains"])
+            q &= Q(**{f"{prefix}title__icontains": filters["title_contains"]})
         if filters.get("changelog_contains"):
-            qs = qs.filter(changelog__icontains=filters["changelog_contains"])
+            q &= Q(**{f"{prefix}changelog__icontains": filters["changelog_contains"]})
         if filters.get("project"):
-            qs = qs.filter(project=filters["project"])
+            q &= Q(**{f"{prefix}project": filters["project"]})
         if filters.get("item_type"):
-            qs = qs.filter(item_type=filters["item_type"])
+            q &= Q(**{f"{prefix}item_type": filters["item_type"]})
         if filters.get("item_status"):
-            qs = qs.filter(item_status=filters["item_status"])
+            q &= Q(**{f"{prefix}item_status": filters["item_status"]})
         if filters.get("item_location"):
-            qs = qs.filter(item_location=filters["item_location"])
-        return qs
+            q &= Q(**{f"{prefix}item_location": filters["item_location"]})
+        return q
+
+    def filter_items(self, **filters):
+        return self.filter(self.get_filter_q(**filters))
+
+    # Database backends that can run `WITH RECURSIVE` queries, others walk the hierarchy in Python instead
+    RECURSIVE_CTE_VENDORS = ("postgresql", "sqlite")
+
+    def descendants_of(self, item):
+        """Filter to the `Item`s that are descendants of an item, using the configured tree strategy."""
+        strategy = get_tree_strategy()
+        if strategy == "closure":
+            return self.filter(
+                ancestor_links__ancestor=item, ancestor_links__depth__gt=0
+            )
+        if strategy == "cte":
+            if self._supports_recursive_cte():
+                return self.filter(id__in=self._recursive_descendant_ids(item.id))
+            return self.filter(id__in=self._walk_descendant_ids(item))
+        return self.filter(path__startswith=item._get_subtree_path())
+
+    def ancestors_of(self, item):
+        """Filter to the `Item`s that are ancestors of an item, ordered from the root to the item's parent."""
+        if not item.parent_id:
+            return self.none()
+        if get_tree_strategy() == "cte":
+            if self._supports_recursive_cte():
+                ancestor_ids = self._recursive_ancestor_ids(item.parent_id)
+            else:
+                ancestor_ids = self._walk_ancestor_ids(item)
+        else:
+            ancestor_ids = item._find_ancestors()
+        return self.filter(id__in=ancestor_ids).order_by("depth")
+
+    def _supports_recursive_cte(self):
+        return connections[self.db].vendor in self.RECURSIVE_CTE_VENDORS
+
+    def _quoted_names(self):
+        """Return the quoted table, id and parent id column names for building raw SQL."""
+        quote_name = connections[self.db].ops.quote_name
+        opts = self.model._meta
+        return (
+            quote_name(opts.db_table),
+            quote_name(opts.get_field("id").column),
+            quote_name(opts.get_field("parent").column),
+        )
+
+    def _recursive_descendant_ids(self, item_id):
+        """Return a `WITH RECURSIVE` subquery selecting the ids of all descendants of an item."""
+        table, id, parent_id = self._quoted_names()
+        return RawSQL(
+            f"WITH RECURSIVE descendants (id) AS ("
+            f"SELECT {id} FROM {table} WHERE {parent_id} = %s "
+            f"UNION "
+            f"SELECT child.{id} FROM {table} child JOIN descendants ON child.{parent_id} = descendants.id"
+            f") SELECT id FROM descendants",
+            [item_id],
+        )
+
+    def _recursive_ancestor_ids(self, parent_id):
+        """Return a `WITH RECURSIVE` subquery selecting the ids of an item's parent and all its ancestors."""
+        table, id, parent_id_column = self._quoted_names()
+        return RawSQL(
+            f"WITH RECURSIVE ancestors (id, parent_id) AS ("
+            f"SELECT {id}, {parent_id_column} FROM {table} WHERE {id} = %s "
+            f"UNION "
+            f"SELECT parent.{id}, parent.{parent_id_column} FROM {table} parent "
+            f"JOIN ancestors ON parent.{id} = ancestors.parent_id"
+            f") SELECT id FROM ancestors",
+            [parent_id],
+        )
+
+    def _walk_descendant_ids(self, item):
+        """Return the ids of all descendants of an item by walking its project's cached `TreeIndex` in Python."""
+        return get_tree_index(item.project_id).descendant_ids(item.id)
+
+    def _walk_ancestor_ids(self, item):
+        """Return the ids of all ancestors of an item by walking its project's cached `TreeIndex` in Python."""
+        index = get_tree_index(item.project_id)
+        # Walk from the (possibly unsaved) parent rather than the stored parent of the item
+        return [item.parent_id, *index.ancestor_ids(item.parent_id)]
 
 
-class Project(AuditMixin):
+class Project(CounterMixin, AuditMixin):
     """The model representing a project in the hierarchical system.
 
-    Inherits from `AuditMixin`.
+    Inherits from `CounterMixin` (counting its root items as children) and `AuditMixin`.
 
     Attributes:
         name (str): The name of the project.
+        tree_version (int): A stamp bumped by every write that changes the project's item hierarchy (see
+            `items.tree_index`).
     """
 
     name = models.CharField(max_length=100)
+    tree_version = models.PositiveIntegerField(default=0, editable=False)
 
     objects = ProjectQuerySet.as_manager()
 
+    MAINTAINED_FIELDS = (*CounterMixin.COUNTER_FIELDS, "tree_version")
+
     class Meta:
         ordering = ["name"]  # order queries alphanumerically (numbers then A-Z)
 
@@ -90,6 +200,50 @@ class Project(AuditMixin):
         """Return the number of `Item`s matching the filter that are direct children (do not have a parent `Item`) of this `Project`."""
         return self.get_children(**filters).count()
 
+    def get_tree(self, max_depth=None, **filters):
+        """Return the root `TreeNode`s of a tree of the `Item`s matching the filter, loaded in a single query.
+
+        Only items nested at most `max_depth` levels below the project are included (all of them if None).
+        """
+        items = self.get_descendants(**filters)
+        if max_depth is not None:
+            items = items.filter(depth__lte=max_depth)
+        return build_tree(list(items))
+
+    def find_drifted_counters(self):
+        """Return a list of `(obj, expected)` for this `Project` and each of its `Item`s whose stored counters differ
+        from the `expected` counters counted from the item hierarchy, loaded in a single query.
+        """
+        fields = CounterMixin.COUNTER_FIELDS
+        items = list(
+            Item.objects.filter(project_id=self.id)
+            .order_by("id")
+            .only("path", "item_status", *fields)
+        )
+        expected = build_counts(
+            [(item.id, item.path, item.item_status_id) for item in items]
+        )
+        return [
+            (obj, expected[key])
+            for obj, key in [(self, None), *((item, item.id) for item in items)]
+            if tuple(getattr(obj, field) for field in fields) != expected[key]
+        ]
+
+    def rebuild_counters(self, drifted=None):
+        """Store the expected counters of this `Project` and its `Item`s (as found by `find_drifted_counters`) and
+        return the ones that had drifted. The project should be locked by the caller."""
+        if drifted is None:
+            drifted = self.find_drifted_counters()
+        for obj, expected in drifted:
+            for field, value in zip(CounterMixin.COUNTER_FIELDS, expected):
+                setattr(obj, field, value)
+        for model in (Project, Item):
+            model.objects.bulk_update(
+                [obj for obj, _ in drifted if isinstance(obj, model)],
+                CounterMixin.COUNTER_FIELDS,
+            )
+        return drifted
+
     def clean(self):
         """Validate the model data before saving."""
         super().clean()
@@ -105,6 +259,47 @@ class Project(AuditMixin):
         super().save(*args, **kwargs)
 
 
+def get_attribute_messages(class_name):
+    """Return the error messages of the unique names, default and orders of a set of attributes, by rule."""
+    return {
+        "name": format_lazy(
+            _("{} names must be unique within each project."), class_name
+        ),
+        "default": format_lazy(
+            _("There can only be one default {} within each project."), class_name
+        ),
+        "order": format_lazy(
+            _("{} order must be unique within each project."), class_name
+        ),
+    }
+
+
+def get_attribute_constraints(class_name):
+    """Return the constraints of a set of attributes, with the same messages as `BaseItemAttribute.validate_set`.
+
+    Enforced by the database so that concurrent writes cannot break them, see `BaseCRUD` for the error messages.
+    """
+    messages = get_attribute_messages(class_name)
+    return [
+        models.UniqueConstraint(
+            fields=["project", "name"],
+            name="%(app_label)s_%(class)s_unique_name",
+            violation_error_message=messages["name"],
+        ),
+        models.UniqueConstraint(
+            fields=["project"],
+            condition=Q(default=True),
+            name="%(app_label)s_%(class)s_unique_default",
+            violation_error_message=messages["default"],
+        ),
+        models.UniqueConstraint(
+            fields=["project", "order"],
+            name="%(app_label)s_%(class)s_unique_order",
+            violation_error_message=messages["order"],
+        ),
+    ]
+
+
 class BaseItemAttribute(models.Model):
     """An abstract model containing the common elements of the attributes an `Item` can have.
 
@@ -138,50 +333,110 @@ class BaseItemAttribute(models.Model):
         if not self.name:
             raise ValidationError(f"{self.__class__.__name__} name cannot be blank.")
 
-        if (
-            type(self)
-            .objects.filter(project=self.project, name=self.name)
-            .exclude(id=self.id)
-            .exists()
-        ):
-            raise ValidationError(
-                _(
-                    f"{self.__class__.__name__} names must be unique within each project."
-                )
-            )
-
-        if self.default:
-            if (
-                type(self)
-                .objects.filter(project=self.project, default=True)
-                .exclude(id=self.id)
-                .exists()
-            ):
-                raise ValidationError(
-                    _(
-                        f"There can only be one default {self.__class__.__name__} within each project."
-                    )
-                )
+        # Unique names, orders and defaults are enforced by the database constraints
 
         # TODO: should we enforce that there is a default?
 
-        if (
-            type(self)
-            .objects.filter(project=self.project, order=self.order)
-            .exclude(id=self.id)
-            .exists()
-        ):
-            raise ValidationError(
-                _(
-                    f"{self.__class__.__name__} order must be unique within each project."
-                )
-            )
-
     def save(self, *args, **kwargs):
         """Calls the `clean` method before saving the item."""
         self.clean()
         super().save(*args, **kwargs)
 
+    def delete(self, *args, **kwargs):
+        """Deletes the attribute (and, by cascade, the items that have it with all their descendants).
+
+        The cascade deletes the items without `Item.delete`, so if any were deleted the counters of the project are
+        rebuilt and its `tree_version` bumped in the same transaction.
+        """
+        with transaction.atomic():
+            # Lock the project so that no item writes change the counters while they are rebuilt
+            project = (
+                Project.objects.select_for_update()
+                .only(*Project.MAINTAINED_FIELDS)
+                .get(id=self.project_id)
+            )
+            result = super().delete(*args, **kwargs)
+            if result[1].get(Item._meta.label):
+                project.rebuild_counters()
+                Project.objects.filter(id=project.id).update(
+                    tree_version=F("tree_version") + 1
+                )
+        return result
+
+    @classmethod
+    def reorder(cls, project_id, ids):
+        """Set the order of all of a `Project`'s attributes of this type from a list of their ids.
+
+        The changed attributes are first moved below the existing orders, as the unique order constraint is checked
+        row by row, then given their new orders, in two updates. Returns the attributes in their new order.
+        """
+        with transaction.atomic():
+            attributes = (
+                cls.objects.select_for_update().filter(project_id=project_id).in_bulk()
+            )
+            if sorted(attributes) != sorted(ids):
+                raise ValidationError(
+                    _(
+                        f"The new order must include every {cls.__name__} in the project exactly once."
+                    )
+                )
+            new_orders = {id: order for order, id in enumerate(ids, start=1)}
+            changed = [
+                attributes[id] for id in ids if attributes[id].order != new_orders[id]
+            ]
+            if changed:
+                lowest = min(min(a.order for a in attributes.values()), 1)
+                for offset, attribute in enumerate(changed, start=1):
+                    attribute.order = lowest - offset
+                cls.objects.bulk_update(changed, ["order"])
+                for attribute in changed:
+                    attribute.order = new_orders[attribute.id]
+                cls.objects.bulk_update(changed, ["order"])
+                cls._after_reorder(changed)
+        invalidate_validation_context(project_id)
+        invalidate_responses(cls)
+        return [attributes[id] for id in ids]
+
+    @classmethod
+    def _after_reorder(cls, changed):
+        """Update any data derived from the order of some reordered attributes."""
+
+    @classmethod
+    def validate_set(cls, attributes):
+        """Validate a new set of attributes for one project in memory, raising the same errors as `clean`."""
+        messages = get_attribute_messages(cls.__name__)
+        names, orders, num_defaults = set(), set(), 0
+        for attribute in attributes:
+            attribute.name = attribute.name.strip()  # Strip whitespace
+
+            if not attribute.name:
+                raise ValidationError(f"{cls.__name__} name cannot be blank.")
+
+            if attribute.name in names:
+                raise ValidationError(messages["name"])
+
+            num_defaults += attribute.default
+            if num_defaults > 1:
+                raise ValidationError(messages["default"])
+
+            if attribute.order in orders:
+                raise ValidationError(messages["order"])
+
+            names.add(attribute.name)
+            orders.add(attribute.order)
+
+    @classmethod
+    def create_default_options(cls, projects):
+        """Create the default attributes for some new `Project`s in one query, validated in memory."""
+        attributes = []
+        for project in projects:
+            options = [
+                cls(project=project, **option) for option in cls.default_options()
+            ]
+            cls.validate_set(options)
+            attributes.extend(options)
+        return cls.objects.bulk_create(attributes, batch_size=1000)
+
 
 class ItemType(BaseItemAttribute):
     """A model representing the type attribute of items in the hierarchical system.
@@ -196,6 +451,29 @@ class ItemType(BaseItemAttribute):
 
     nestable = models.BooleanField(default=False)
 
+    class Meta(BaseItemAttribute.Meta):
+        constraints = get_attribute_constraints("ItemType")
+
+    def save(self, *args, **kwargs):
+        """Calls the `clean` method before saving, and copies the order to the items of this type."""
+        super().save(*args, **kwargs)
+        self.items.exclude(item_type_order=self.order).update(
+            item_type_order=self.order
+        )
+
+    @classmethod
+    def _after_reorder(cls, changed):
+        """Copy the new orders to the items of the reordered types, in one update."""
+        Item.objects.filter(item_type__in=changed).update(
+            item_type_order=models.Case(
+                *(
+                    models.When(item_type_id=item_type.id, then=item_type.order)
+                    for item_type in changed
+                ),
+                output_field=models.SmallIntegerField(),
+            )
+        )
+
     @staticmethod
     def default_options():
         """Return a list of default item type attributes for when creating a new project."""
@@ -215,6 +493,9 @@ class ItemStatus(BaseItemAttribute):
     Inherits from `BaseItemAttribute`.
     """
 
+    class Meta(BaseItemAttribute.Meta):
+        constraints = get_attribute_constraints("ItemStatus")
+
     @staticmethod
     def default_options():
         """Return a list of default item status attributes for when creating a new project."""
@@ -233,6 +514,9 @@ class ItemLocation(BaseItemAttribute):
     Inherits from `BaseItemAttribute`.
     """
 
+    class Meta(BaseItemAttribute.Meta):
+        constraints = get_attribute_constraints("ItemLocation")
+
     @staticmethod
     def default_options():
         """Return a list of default item location attributes for when creating a new project."""
@@ -243,12 +527,12 @@ class ItemLocation(BaseItemAttribute):
         ]
 
 
-class Item(AuditMixin):
+class Item(CounterMixin, AuditMixin):
     """A model representing an item in the hierarchical system.
 
     Items belong to a project and may have hierarchical relationships with other items.
 
-    Inherits from `AuditMixin`.
+    Inherits from `CounterMixin` and `AuditMixin`.
 
     Attributes:
         project (Project): The project that this item belongs to.
@@ -260,6 +544,9 @@ class Item(AuditMixin):
         changelog (str, optional): A summary of what has been done.
         requirements (str, optional): A description of what needs to be done.
         outcome (str, optional): A description of what was done.
+        path (str): The ids of all ancestors ordered from the root, eg "1/5/" (maintained on save).
+        depth (int): The number of ancestors (maintained on save).
+        item_type_order (int): A copy of `item_type.order` so items can be sorted without a join (maintained on save).
     """
 
     project = models.ForeignKey(Project, related_name="items", on_delete=models.CASCADE)
@@ -279,57 +566,82 @@ class Item(AuditMixin):
     changelog = models.CharField(max_length=100, blank=True)
     requirements = models.TextField(blank=True)
     outcome = models.TextField(blank=True)
+    path = models.TextField(blank=True, default="", editable=False, db_index=True)
+    depth = models.PositiveIntegerField(default=0, editable=False)
+    item_type_order = models.SmallIntegerField(default=0, editable=False)
 
     objects = ItemQuerySet.as_manager()
 
+    # The path and depth are only written when the item is reparented (see `save`), so that a stale instance never
+    # writes back the path it was loaded with after one of its ancestors has moved
+    MAINTAINED_FIELDS = (*CounterMixin.COUNTER_FIELDS, "path", "depth")
+
     class Meta:
         ordering = [
-            "item_type__order",
+            "item_type_order",
             "created_at",
         ]  # order queries by ItemType.order then by Item.created_at (order then oldest)
+        indexes = [
+            # Filters used by `filter_items` and the hierarchy getters, the parent index also serves ordered roots
+            models.Index(
+                fields=["project", "parent", "item_type_order", "created_at"],
+                name="item_project_parent_idx",
+            ),
+            models.Index(
+                fields=["project", "item_status"], name="item_project_status_idx"
+            ),
+            models.Index(
+                fields=["project", "item_location"], name="item_project_location_idx"
+            ),
+            models.Index(
+                fields=["project", "created_at"], name="item_project_created_idx"
+            ),
+            # Ordered (and keyset paginated) lists of a project's descendants and an item's children
+            models.Index(
+                fields=["project", "item_type_order", "created_at", "id"],
+                name="item_project_order_idx",
+            ),
+            models.Index(
+                fields=["parent", "item_type_order", "created_at", "id"],
+                name="item_parent_order_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"Item: {self.title} ({self.item_type.name} in {self.project.name})"
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self._original_project = getattr(self, "project", None)
+        # Read the raw column values so that initialising an instance never triggers a query
+        self._original_project_id = self.__dict__.get("project_id")
+        self._original_parent_id = self.__dict__.get("parent_id")
+        self._original_item_status_id = self.__dict__.get("item_status_id")
+        self._original_item_type_id = self.__dict__.get("item_type_id")
+
+    def _get_subtree_path(self):
+        """Return the path prefix shared by all descendants of this `Item`."""
+        return f"{self.path}{self.id}{PATH_SEPARATOR}"
 
     def _find_ancestors(self):
         """Create a list of ids of all `Item`s that are ancestors of this `Item, ordered from root to this item's parent."""
-        # Get all items in the current items project, but only the id and parent_id fields
-        items = Item.objects.filter(project_id=self.project_id).values_list(
-            "id", "parent_id"
-        )
-
-        # Build a child->parent relationship lookup in the format {item_id: parent_id, ...}
-        parent_lookup = {item_id: parent_id for item_id, parent_id in items}
-
-        ancestor_ids = []
-        visited_ids = {self.id}
-        current_id = self.parent_id
+        if not self.parent_id:
+            return []
 
-        # Follow the parent fields upwards for each ancestor until there is no parent
-        while current_id:
+        # The stored path is only up to date if the parent has not changed since this item was loaded
+        if self._state.adding or self.parent_id != self._original_parent_id:
+            ancestor_ids = split_path(self.parent.path) + [self.parent_id]
+        else:
+            ancestor_ids = split_path(self.path)
 
-            # Check for circular references (id already in the ancestors list)
-            if current_id in visited_ids:
-                raise ValidationError(_("An item cannot be its own ancestor."))
-
-            ancestor_ids.append(current_id)
-            visited_ids.add(current_id)
-
-            # Move to the next ancestor using the lookup dictionary (use item_id to get parent_id)
-            current_id = parent_lookup.get(current_id)
-
-        ancestor_ids.reverse()
+        # Check for circular references (this item is already in the ancestors list)
+        if self.id is not None and self.id in ancestor_ids:
+            raise ValidationError(_("An item cannot be its own ancestor."))
 
         return ancestor_ids
 
     def get_ancestors(self):
         """Returns a QuerySet of all `Item`s that are ancestors of this `Item, ordered from root to this item's parent."""
-        ancestor_ids = self._find_ancestors()
-        return Item.objects.filter(id__in=ancestor_ids)
+        return Item.objects.ancestors_of(self)
 
     def get_num_ancestors(self):
         """Returns the number of `Item`s that are ancestors of this `Item`."""
@@ -342,34 +654,9 @@ class Item(AuditMixin):
             return self.parent.children.exclude(id=self.id)
         return Item.objects.none()
 
-    def _find_all_descendants(self):
-        """Create a list of ids of all `Item`s that are descendants of this `Item."""
-        # Fetch only the necessary fields for traversing the ancestry (id, parent_id) for all items in the current project
-        items = Item.objects.filter(project_id=self.project_id).values_list(
-            "id", "parent_id"
-        )
-
-        # Build a parent->children relationship lookup dictionary in the format {parent_id: [child_id, ...], ...}
-        child_lookup = {}
-        for item_id, parent_id in items:
-            child_lookup.setdefault(parent_id, []).append(item_id)
-
-        descendants_ids = []
-        parent_ids_to_process = [self.id]
-
-        # Traverse the hierarchy starting from this item's ID
-        while parent_ids_to_process:
-            parent_id = parent_ids_to_process.pop(0)  # First-in-first-out
-            children_ids = child_lookup.get(parent_id, [])
-            descendants_ids.extend(children_ids)
-            parent_ids_to_process.extend(children_ids)
-
-        return descendants_ids
-
     def get_descendants(self, **filters):
         """Returns a QuerySet of all `Item`s matching the filter that are descendants of this `Item."""
-        descendants_ids = self._find_all_descendants()
-        return Item.objects.filter(id__in=descendants_ids).filter_items(**filters)
+        return Item.objects.descendants_of(self).filter_items(**filters)
 
     def get_num_descendants(self, **filters):
         """Returns the number of `Item`s matching the filter that are descendants of this `Item`."""
@@ -384,70 +671,299 @@ class Item(AuditMixin):
         return self.get_children(**filters).count()
 
     def clean(self):
-        """Validate the model data before saving."""
+        """Validate the model data before saving, against the cached validation context of its project."""
         super().clean()
 
-        self.title = self.title.strip()  # Strip whitespace
-        self.changelog = self.changelog.strip()  # Strip whitespace
+        if self.project_id is None:
+            raise ValidationError(_("An item must belong to a project."))
 
-        if not self.title:
-            raise ValidationError(
-                _(f"{self.__class__.__name__} title cannot be empty.")
-            )
+        validate_item(self, get_validation_context(self.project_id))
 
-        if self._original_project and self.project != self._original_project:
-            raise ValidationError(_("An item cannot change project once created."))
+    def _update_path(self):
+        """Set the materialized path and depth from the current parent."""
+        ancestor_ids = self._find_ancestors()
+        self.path = join_path(ancestor_ids)
+        self.depth = len(ancestor_ids)
 
-        if self.item_type not in self.project.itemtype_set.all():
-            raise ValidationError(
-                _(
-                    "Item type attribute selection must belong to the same project as the item."
-                )
+    def _get_subtree_status_counts(self):
+        """Return a Counter of the stored statuses of this `Item` and all its descendants, in a single query."""
+        subtree = Item.objects.filter(
+            Q(id=self.id) | Q(path__startswith=self._get_subtree_path())
+        )
+        return Counter(
+            dict(
+                subtree.order_by()
+                .values("item_status_id")
+                .annotate(num=models.Count("id"))
+                .values_list("item_status_id", "num")
             )
+        )
 
-        if self.item_status not in self.project.itemstatus_set.all():
-            raise ValidationError(
-                _(
-                    "Item status attribute selection must belong to the same project as the item."
+    def _move_descendant_paths(self, previous_subtree_path, depth_change):
+        """Rewrite the paths of all descendants after this `Item` has been reparented, in a single query."""
+        Item.objects.filter(path__startswith=previous_subtree_path).update(
+            path=Concat(
+                Value(self._get_subtree_path()),
+                Substr("path", len(previous_subtree_path) + 1),
+            ),
+            depth=F("depth") + depth_change,
+        )
+
+    def save(self, *args, **kwargs):
+        """Calls the `clean` method and maintains the materialized path and counters before saving the item."""
+        self.clean()
+
+        update_fields = kwargs.get("update_fields")
+
+        def saving(*field_names):
+            return update_fields is None or bool(set(field_names) & set(update_fields))
+
+        if saving("item_type", "item_type_id"):
+            self.item_type_order = (
+                get_validation_context(self.project_id)
+                .item_types[self.item_type_id]
+                .order
+            )
+            if update_fields is not None:
+                update_fields = kwargs["update_fields"] = {
+                    *update_fields,
+                    "item_type_order",
+                }
+
+        adding = self._state.adding
+        parent_changed = (
+            not adding
+            and self.parent_id != self._original_parent_id
+            and saving("parent", "parent_id")
+        )
+        status_changed = (
+            not adding
+            and self.item_status_id != self._original_item_status_id
+            and saving("item_status", "item_status_id")
+        )
+        if not (adding or parent_changed or status_changed):
+            super().save(*args, **kwargs)
+            if saving("item_type", "item_type_id"):
+                self._original_item_type_id = self.item_type_id
+            return
+
+        with transaction.atomic():
+            counter_changes = CounterChanges(self.project_id)
+            if adding:
+                statuses = Counter({self.item_status_id: 1})
+            else:
+                # Uncount the subtree from where it was, with the previous status of this item
+                statuses = self._get_subtree_status_counts()
+                counter_changes.add_subtree(self.path, statuses, sign=-1)
+                statuses[self._original_item_status_id] -= 1
+                statuses[self.item_status_id] += 1
+
+            if adding or parent_changed:
+                previous_subtree_path = None if adding else self._get_subtree_path()
+                previous_depth = self.depth
+                self._update_path()
+                if parent_changed:
+                    kwargs["update_fields"] = {
+                        *(
+                            self.get_saved_field_names()
+                            if update_fields is None
+                            else update_fields
+                        ),
+                        "path",
+                        "depth",
+                    }
+
+            super().save(*args, **kwargs)
+
+            if parent_changed:
+                self._move_descendant_paths(
+                    previous_subtree_path, self.depth - previous_depth
                 )
+            if (adding or parent_changed) and get_tree_strategy() == "closure":
+                if parent_changed:
+                    ItemClosure.objects.move_subtree(self)
+                else:
+                    ItemClosure.objects.add_item(self)
+
+            counter_changes.add_subtree(self.path, statuses)
+            counter_changes.apply()
+
+        self._original_parent_id = self.parent_id
+        self._original_item_status_id = self.item_status_id
+        self._original_item_type_id = self.item_type_id
+
+    def move_to(self, parent):
+        """Move this `Item` and all its descendants below another `Item` (or to the root of the project if None).
+
+        The whole subtree is validated in memory against a freshly loaded validation context, then the paths, closure
+        rows and counters are rewritten with set-based queries (see `save`).
+        """
+        with transaction.atomic():
+            # Lock the project so that no other writes change the hierarchy while the subtree is validated
+            list(
+                Project.objects.select_for_update()
+                .filter(id=self.project_id)
+                .only("id")
             )
+            invalidate_validation_context(self.project_id)
+            self.parent = parent
+            validate_subtree(self, get_validation_context(self.project_id))
+            self.save(update_fields=["parent"])
+
+    def delete(self, *args, **kwargs):
+        """Deletes the item (and, by cascade, its descendants) and uncounts them from the counters of its ancestors."""
+        with transaction.atomic():
+            counter_changes = CounterChanges(self.project_id)
+            counter_changes.add_subtree(
+                self.path, self._get_subtree_status_counts(), sign=-1
+            )
+            result = super().delete(*args, **kwargs)
+            counter_changes.apply()
+        return result
+
 
-        if self.item_location not in self.project.itemlocation_set.all():
-            raise ValidationError(
-                _(
-                    "Item location attribute selection must belong to the same project as the item."
+class CounterChanges:
+    """The changes to the stored counters of a `Project` and its `Item`s from one write.
+
+    Changes are collected for the project (under the key None) and each affected item, then applied in one
+    transaction that locks the rows (the project first, then the items by id) so concurrent writes cannot be lost.
+    """
+
+    def __init__(self, project_id):
+        self.project_id = project_id
+        # {item_id or None: [num_children, num_descendants, Counter(num_descendants_by_status)], ...}
+        self.changes = defaultdict(lambda: [0, 0, Counter()])
+
+    def add_subtree(self, path, statuses, sign=1):
+        """Count (or uncount, with a `sign` of -1) a subtree whose root has the materialized `path`.
+
+        `statuses` is a Counter of the number of items in the subtree with each `ItemStatus` id.
+        """
+        ancestor_ids = split_path(path)
+        self.changes[ancestor_ids[-1] if ancestor_ids else None][0] += sign
+        num_items = sum(statuses.values())
+        for key in [None, *ancestor_ids]:
+            change = self.changes[key]
+            change[1] += sign * num_items
+            for item_status_id, num in statuses.items():
+                change[2][str(item_status_id)] += sign * num
+
+    def apply(self):
+        """Apply the collected changes to the stored counters."""
+        with transaction.atomic():
+            objs = list(
+                Project.objects.select_for_update()
+                .filter(id=self.project_id)
+                .only(*Project.MAINTAINED_FIELDS)
+            ) + list(
+                Item.objects.select_for_update()
+                .filter(id__in=[key for key in self.changes if key is not None])
+                .order_by("id")
+                .only(*CounterMixin.COUNTER_FIELDS)
+            )
+            for obj in objs:
+                num_children, num_descendants, by_status = self.changes[
+                    None if isinstance(obj, Project) else obj.id
+                ]
+                obj.num_children += num_children
+                obj.num_descendants += num_descendants
+                counts = Counter(obj.num_descendants_by_status)
+                counts.update(by_status)
+                obj.num_descendants_by_status = {
+                    key: num for key, num in sorted(counts.items()) if num
+                }
+                if isinstance(obj, Project):
+                    obj.tree_version += 1
+            for model, fields in (
+                (Project, Project.MAINTAINED_FIELDS),
+                (Item, CounterMixin.COUNTER_FIELDS),
+            ):
+                model.objects.bulk_update(
+                    [obj for obj in objs if isinstance(obj, model)], fields
                 )
+
+
+class ItemClosureQuerySet(models.QuerySet):
+    def add_item(self, item):
+        """Insert the rows linking a newly created `Item` to itself and all its ancestors."""
+        self.bulk_create(
+            ItemClosure(
+                ancestor_id=ancestor_id, descendant_id=descendant_id, depth=depth
             )
+            for ancestor_id, descendant_id, depth in build_closure(item.id, item.path)
+        )
 
-        if self.parent:
-            if self == self.parent:
-                raise ValidationError(_("An item cannot be its own parent."))
+    def move_subtree(self, item):
+        """Relink a reparented `Item` and all its descendants to their new ancestors using set-based queries."""
+        subtree_ids = self.filter(ancestor=item).values("descendant")
+        self.filter(descendant__in=subtree_ids).exclude(
+            ancestor__in=subtree_ids
+        ).delete()
+
+        if item.parent_id:
+            connection = connections[self.db]
+            opts = self.model._meta
+            table = connection.ops.quote_name(opts.db_table)
+            ancestor, descendant, depth = (
+                connection.ops.quote_name(opts.get_field(name).column)
+                for name in ("ancestor", "descendant", "depth")
+            )
+            # Link every ancestor of the new parent to every item in the subtree
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"INSERT INTO {table} ({ancestor}, {descendant}, {depth}) "
+                    f"SELECT above.{ancestor}, below.{descendant}, above.{depth} + below.{depth} + 1 "
+                    f"FROM {table} above, {table} below "
+                    f"WHERE above.{descendant} = %s AND below.{ancestor} = %s",
+                    [item.parent_id, item.id],
+                )
 
-            if self.parent.project != self.project:
-                raise ValidationError(
-                    _("An item must belong to the same project as its parent.")
+    def rebuild(self, project_id):
+        """Replace all the rows for the `Item`s in a project using their stored materialized paths."""
+        self.filter(descendant__project_id=project_id).delete()
+        paths = Item.objects.filter(project_id=project_id).values_list("id", "path")
+        self.bulk_create(
+            (
+                ItemClosure(
+                    ancestor_id=ancestor_id, descendant_id=descendant_id, depth=depth
                 )
+                for item_id, path in paths
+                for ancestor_id, descendant_id, depth in build_closure(item_id, path)
+            ),
+            batch_size=1000,
+        )
 
-            # Prevent circular references in the hierarchy by raising a ValidationError if self is found in the ancestors list
-            self._find_ancestors()
 
-            if self.item_type == self.parent.item_type:
-                if self.item_type.nestable:
-                    pass  # Allow nesting of two of the same nestable types
-                else:
-                    raise ValidationError(
-                        _(
-                            "An item cannot be the same type as its parent unless they are both of the same nestable type."
-                        )
-                    )
-            elif self.item_type.order <= self.parent.item_type.order:
-                raise ValidationError(
-                    _(
-                        "An item must be 'below' its parent in the hierarchy unless they are of the same nestable type."
-                    )
-                )
+class ItemClosure(models.Model):
+    """A model linking each `Item` to itself and every one of its ancestors, so the hierarchy can be joined against.
 
-    def save(self, *args, **kwargs):
-        """Calls the `clean` method before saving the item."""
-        self.clean()
-        super().save(*args, **kwargs)
+    Only maintained while the `ITEM_TREE_STRATEGY` setting is "closure".
+
+    Attributes:
+        ancestor (Item): The item higher up the hierarchy.
+        descendant (Item): The item nested (at any level) below the ancestor.
+        depth (int): The number of levels between the ancestor and the descendant, 0 for an item linked to itself.
+    """
+
+    ancestor = models.ForeignKey(
+        Item, related_name="descendant_links", on_delete=models.CASCADE
+    )
+    descendant = models.ForeignKey(
+        Item, related_name="ancestor_links", on_delete=models.CASCADE
+    )
+    depth = models.PositiveIntegerField()
+
+    objects = ItemClosureQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["ancestor", "descendant"], name="unique_item_closure"
+            )
+        ]
+        indexes = [
+            models.Index(fields=["descendant", "depth"], name="item_closure_desc_idx")
+        ]
+
+    def __str__(self):
+        return f"ItemClosure: {self.ancestor_id} > {self.descendant_id} ({self.depth})"
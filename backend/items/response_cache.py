@@ -0,0 +1,109 @@
+"""An opt-in cache of GraphQL query responses, stored in one of Django's caches.
+
+Responses are cached by their normalized query, variables and operation name, and tagged with the models they read
+(see `items.graphql.views`). Each tag has a version that is stored in the same cache, and a cached response is only
+used while the versions of its tags still match the versions read before it was executed. Every write to a model bumps
+the versions of the tags that depend on it (see `invalidate_responses`), from the model signals for single objects and
+from the bulk writes (which do not send signals) directly. The versions are bumped again once the write's transaction
+commits, so a response that another request read from the data before it was committed cannot outlive the write.
+
+The cache is disabled unless `GRAPHQL_RESPONSE_CACHE` names a cache in `CACHES`. As the tag versions must be shared by
+every process that writes, a cache shared between processes (eg Redis) is needed when running more than one.
+"""
+
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+KEY_PREFIX = "graphql-response"
+
+# The tags whose responses may change when a model is written, eg writing an item changes its project's counters,
+# reordering item types changes the order of items and deleting a project deletes its attributes and items
+DEPENDENT_TAGS = {
+    "items.project": (
+        "items.project",
+        "items.itemtype",
+        "items.itemstatus",
+        "items.itemlocation",
+        "items.item",
+    ),
+    "items.itemtype": ("items.itemtype", "items.item"),
+    "items.itemstatus": ("items.itemstatus", "items.item"),
+    "items.itemlocation": ("items.itemlocation", "items.item"),
+    "items.item": ("items.item", "items.project"),
+}
+
+# Every tag, for responses whose models are not known
+ALL_TAGS = tuple(DEPENDENT_TAGS)
+
+
+def get_response_cache():
+    """Return the cache that responses are stored in, or None if response caching is disabled."""
+    alias = getattr(settings, "GRAPHQL_RESPONSE_CACHE", None)
+    return caches[alias] if alias else None
+
+
+def _tag_key(tag):
+    return f"{KEY_PREFIX}:tag:{tag}"
+
+
+def get_response_key(query, variables, operation_name):
+    """Return the cache key of a response from its normalized query, its variables and its operation name."""
+    key = json.dumps([query, variables or {}, operation_name], sort_keys=True)
+    return f"{KEY_PREFIX}:{hashlib.sha256(key.encode()).hexdigest()}"
+
+
+def get_tag_versions(cache, tags):
+    """Return the current versions of some tags, starting any that have none (or were evicted) at a new version."""
+    keys = [_tag_key(tag) for tag in tags]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            # Start from the time rather than zero so a restarted tag never matches a version it had before
+            cache.add(key, time.time_ns(), timeout=None)
+            versions[key] = cache.get(key)
+    return versions
+
+
+def get_cached_response(cache, key):
+    """Return the cached data of a response, or None if it is not cached or any of its tags have since changed."""
+    entry = cache.get(key)
+    if entry is None:
+        return None
+    versions, data = entry
+    if cache.get_many(list(versions)) != versions:
+        return None
+    return data
+
+
+def set_cached_response(cache, key, versions, data):
+    """Cache the data of a response with the versions of its tags that were read before it was executed."""
+    timeout = getattr(settings, "GRAPHQL_RESPONSE_CACHE_TIMEOUT", 300)
+    cache.set(key, (versions, data), timeout=timeout)
+
+
+def _bump_tags(cache, tags):
+    for tag in tags:
+        key = _tag_key(tag)
+        try:
+            cache.incr(key)
+        except ValueError:  # Not set (or evicted)
+            cache.set(key, time.time_ns(), timeout=None)
+
+
+def invalidate_responses(*models):
+    """Invalidate every cached response that depends on some written models, now and when the transaction commits."""
+    cache = get_response_cache()
+    if cache is None:
+        return
+    tags = {
+        tag
+        for model in models
+        for tag in DEPENDENT_TAGS.get(model._meta.label_lower, ())
+    }
+    _bump_tags(cache, tags)
+    transaction.on_commit(lambda: _bump_tags(cache, tags))
@@ -1,16 +1,54 @@
-from django.db.models.signals import post_save
+from django.core.signals import request_finished
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
-from .models import ItemLocation, ItemStatus, ItemType, Project
+from .models import Item, ItemLocation, ItemStatus, ItemType, Project
+from .response_cache import invalidate_responses
+from .validation import invalidate_validation_context
 
 
 @receiver(post_save, sender=Project)
 def create_default_item_attributes(sender, instance, created, **kwargs):
     """Create a set of default item options when a new project is created."""
     if created:
-        for item_type in ItemType.default_options():
-            ItemType.objects.create(project=instance, **item_type)
-        for item_status in ItemStatus.default_options():
-            ItemStatus.objects.create(project=instance, **item_status)
-        for item_priority in ItemLocation.default_options():
-            ItemLocation.objects.create(project=instance, **item_priority)
+        for model in (ItemType, ItemStatus, ItemLocation):
+            model.create_default_options([instance])
+
+
+@receiver(post_save, sender=Project)
+@receiver(post_delete, sender=Project)
+def invalidate_project_validation_context(sender, instance, **kwargs):
+    """Remove the cached validation context of a project when it is written."""
+    invalidate_validation_context(instance.id)
+
+
+@receiver(post_save, sender=ItemType)
+@receiver(post_save, sender=ItemStatus)
+@receiver(post_save, sender=ItemLocation)
+@receiver(post_delete, sender=ItemType)
+@receiver(post_delete, sender=ItemStatus)
+@receiver(post_delete, sender=ItemLocation)
+def invalidate_item_validation_context(sender, instance, **kwargs):
+    """Remove the cached validation context of a project when one of its attributes is written."""
+    invalidate_validation_context(instance.project_id)
+
+
+@receiver(post_save, sender=Project)
+@receiver(post_save, sender=ItemType)
+@receiver(post_save, sender=ItemStatus)
+@receiver(post_save, sender=ItemLocation)
+@receiver(post_save, sender=Item)
+@receiver(post_delete, sender=Project)
+@receiver(post_delete, sender=ItemType)
+@receiver(post_delete, sender=ItemStatus)
+@receiver(post_delete, sender=ItemLocation)
+@receiver(post_delete, sender=Item)
+def invalidate_cached_responses(sender, instance, **kwargs):
+    """Invalidate the cached GraphQL responses that depend on a written object's model."""
+    invalidate_responses(sender)
+
+
+@receiver(request_finished)
+def clear_validation_contexts(sender, **kwargs):
+    """Clear the cached validation contexts at the end of every request."""
+    invalidate_validation_context()
@@ -0,0 +1,127 @@
+import pytest
+from django.core.cache import cache
+from django.db.models.signals import post_save
+
+from items.graphql.documents import document_cache
+from items.models import Item, ItemLocation, ItemStatus, ItemType, Project
+from items.signals import create_default_item_attributes
+from items.tree_index import tree_index_cache
+from items.validation import invalidate_validation_context
+
+## Fixtures
+
+
+@pytest.fixture(autouse=True)
+def clear_validation_contexts():
+    """Start every test without any cached item validation contexts."""
+    invalidate_validation_context()
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """Start every test with empty caches, as eg the cached row counts and documents depend on the test's data and
+    settings."""
+    cache.clear()
+    document_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def clear_tree_index_cache():
+    """Start every test with an empty tree index cache, as ids and tree versions are reused between tests."""
+    tree_index_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def detect_n_plus_one_queries(settings):
+    """Fail any test whose GraphQL requests make N+1 queries."""
+    settings.GRAPHQL_NPLUSONE_DETECTION = "raise"
+
+
+@pytest.fixture
+def closure_strategy(settings):
+    """Query (and maintain) the item hierarchy using the closure table."""
+    settings.ITEM_TREE_STRATEGY = "closure"
+
+
+@pytest.fixture(params=["path", "closure", "cte"])
+def tree_strategy(request, settings):
+    """Run a test once with each strategy for querying the item hierarchy."""
+    settings.ITEM_TREE_STRATEGY = request.param
+    return request.param
+
+
+@pytest.fixture
+def clean_project():
+    """Create a project without triggering default item attribute creation."""
+    post_save.disconnect(create_default_item_attributes, sender=Project)
+    project = Project.objects.create(name="project")
+    post_save.connect(create_default_item_attributes, sender=Project)
+    return project
+
+
+@pytest.fixture
+def example_hierarchy(clean_project):
+    """Create an example hierarchy.
+
+    project
+        item_1
+            item_2
+                item_3
+    other_project
+        other_item
+    """
+    project = clean_project
+    # Create some item attributes
+    area = ItemType.objects.create(
+        project=project, name="area", default=False, order=1, nestable=False
+    )
+    task = ItemType.objects.create(
+        project=project, name="task", default=True, order=2, nestable=True
+    )
+    todo = ItemStatus.objects.create(
+        project=project, name="todo", default=True, order=1
+    )
+    done = ItemStatus.objects.create(
+        project=project, name="done", default=False, order=2
+    )
+    backlog = ItemLocation.objects.create(
+        project=project, name="backlog", default=True, order=1
+    )
+    cleared = ItemLocation.objects.create(
+        project=project, name="cleared", default=False, order=2
+    )
+    # Create some items
+    item_1 = Item.objects.create(
+        project=project,
+        item_type=area,
+        item_status=todo,
+        item_location=backlog,
+        title="item_1",
+        changelog="item_1",
+    )
+    item_2 = Item.objects.create(
+        project=project,
+        parent=item_1,
+        item_type=task,
+        item_status=todo,
+        item_location=backlog,
+        title="item_2",
+    )
+    item_3 = Item.objects.create(
+        project=project,
+        parent=item_2,
+        item_type=task,
+        item_status=done,
+        item_location=cleared,
+        title="item_3",
+    )
+    # Create a second project with an item, using default attributes
+    other_project = Project.objects.create(name="other_project")
+    other_item = Item.objects.create(
+        project=other_project,
+        item_type=other_project.get_default_item_type(),
+        item_status=other_project.get_default_item_status(),
+        item_location=other_project.get_default_item_location(),
+        title="other_item",
+    )
+    return project, item_1, item_2, item_3, other_project, other_item
@@ -0,0 +1,36 @@
+import pytest
+from django.contrib.admin.sites import site
+from django.core.management import call_command
+
+from items.models import Item, Project
+from items.tests.test_loaders import create_projects
+from items.tests.test_models import assert_counters
+
+
+@pytest.mark.django_db
+def test_project_admin_descendants_count(rf, django_assert_num_queries):
+    """Verify that the project changelist reads the stored descendant counter of every row without further queries."""
+    create_projects(5, num_items=3)
+    project_admin = site._registry[Project]
+    with django_assert_num_queries(1):
+        projects = list(project_admin.get_queryset(rf.get("/admin/")))
+        links = [project_admin.descendants_count(project) for project in projects]
+    assert len(links) == 5
+    assert all(">4</a>" in link for link in links)
+
+
+@pytest.mark.django_db
+def test_item_admin_delete_queryset(rf, example_hierarchy):
+    """Verify that deleting items from the item changelist rebuilds the counters and bumps the tree version."""
+    project, item_1, item_2, item_3, other_project, other_item = example_hierarchy
+    todo, _ = project.get_item_statuses()
+    tree_version = Project.objects.get(id=project.id).tree_version
+    item_admin = site._registry[Item]
+    item_admin.delete_queryset(
+        rf.post("/admin/"), Item.objects.filter(id__in=[item_2.id, other_item.id])
+    )
+    assert list(Item.objects.filter(project=project)) == [item_1]
+    assert_counters(project, 1, 1, [(todo, 1)])
+    assert_counters(item_1, 0, 0, [])
+    assert Project.objects.get(id=project.id).tree_version == tree_version + 1
+    call_command("recount", "--verify")
@@ -0,0 +1,255 @@
+import pytest
+
+from items.models import Item, ItemClosure, ItemLocation, Project
+from items.tests.test_loaders import execute
+from items.tree import build_closure, build_counts, get_tree_strategy
+
+CREATE_ITEMS = """
+mutation ($inputs: [CreateItemInput!]!) {
+  createItems(inputs: $inputs) { success items { id title } errors { index id messages } }
+}
+"""
+
+UPDATE_ITEMS = """
+mutation ($inputs: [UpdateItemsInput!]!) {
+  updateItems(inputs: $inputs) { success items { id title } errors { index id messages } }
+}
+"""
+
+DELETE_ITEMS = """
+mutation ($ids: [ID!]!) {
+  deleteItems(ids: $ids) { success ids errors { index id messages } }
+}
+"""
+
+
+def create_input(item, **kwargs):
+    """Return a `CreateItemInput` for a new item with the same project and attributes as an item."""
+    return {
+        "project": item.project_id,
+        "itemType": item.item_type_id,
+        "itemStatus": item.item_status_id,
+        "itemLocation": item.item_location_id,
+        "title": "new",
+        **kwargs,
+    }
+
+
+def assert_tree_consistent(project):
+    """Assert that the stored paths, closure rows and counters of a project match its parent relationships."""
+    items = {item.id: item for item in Item.objects.filter(project=project)}
+    for item in items.values():
+        parent = items.get(item.parent_id)
+        expected_path = f"{parent.path}{parent.id}/" if parent else ""
+        assert item.path == expected_path
+        assert item.depth == len(expected_path.split("/")) - 1
+        assert item.item_type_order == item.item_type.order
+    if get_tree_strategy() == "closure":
+        assert set(
+            ItemClosure.objects.filter(descendant__project=project).values_list(
+                "ancestor", "descendant", "depth"
+            )
+        ) == {
+            row for item in items.values() for row in build_closure(item.id, item.path)
+        }
+    counts = build_counts([(i.id, i.path, i.item_status_id) for i in items.values()])
+    project.refresh_from_db()
+    for key, obj in [(None, project), *items.items()]:
+        assert (
+            obj.num_children,
+            obj.num_descendants,
+            obj.num_descendants_by_status,
+        ) == counts[key]
+
+
+@pytest.mark.django_db
+def test_create_items(rf, closure_strategy, example_hierarchy):
+    """Verify that a batch of items is created below existing items with their paths, closure rows and counters."""
+    project, item_1, item_2, item_3, _, _ = example_hierarchy
+    inputs = [
+        create_input(item_3, parent=item_2.id, title=" first "),
+        create_input(item_3, parent=item_3.id, title="second"),
+        create_input(item_1, title="third"),
+    ]
+    data = execute(CREATE_ITEMS, rf, variables={"inputs": inputs})["createItems"]
+    assert data["success"]
+    assert data["errors"] == []
+    assert [item["title"] for item in data["items"]] == ["first", "second", "third"]
+
+    second = Item.objects.get(title="second")
+    assert list(second.get_ancestors()) == [item_1, item_2, item_3]
+    assert ItemClosure.objects.filter(descendant=second).count() == 4
+    assert_tree_consistent(project)
+
+
+@pytest.mark.django_db
+def test_create_items_query_count(rf, example_hierarchy, django_assert_max_num_queries):
+    """Verify that the number of queries does not grow with the number of items created."""
+    _, _, item_2, item_3, _, _ = example_hierarchy
+    inputs = [create_input(item_3, parent=item_2.id, title=f"{i}") for i in range(50)]
+    with django_assert_max_num_queries(12):
+        data = execute(CREATE_ITEMS, rf, variables={"inputs": inputs})
+    assert len(data["createItems"]["items"]) == 50
+
+
+@pytest.mark.django_db
+def test_create_items_errors(rf, example_hierarchy):
+    """Verify that invalid rows are reported by index and that nothing is written if any row is invalid."""
+    project, item_1, item_2, item_3, other_project, other_item = example_hierarchy
+    num_items = Item.objects.count()
+    inputs = [
+        create_input(item_3, parent=item_2.id),
+        create_input(item_3, title=" "),
+        create_input(item_3, parent=other_item.id),
+        create_input(item_1, parent=item_1.id),
+        create_input(item_3, itemType=other_item.item_type_id),
+        create_input(item_3, title="x" * 101),
+    ]
+    data = execute(CREATE_ITEMS, rf, variables={"inputs": inputs})["createItems"]
+    assert not data["success"]
+    assert data["items"] == []
+    assert [error["index"] for error in data["errors"]] == [1, 2, 3, 4, 5]
+    assert data["errors"][1]["messages"] == [
+        "An item must belong to the same project as its parent."
+    ]
+    assert Item.objects.count() == num_items
+
+
+@pytest.mark.django_db
+def test_update_items(rf, closure_strategy, example_hierarchy):
+    """Verify that a batch of updates moves and restatuses items, maintaining the paths, closure rows and counters."""
+    project, item_1, item_2, item_3, _, _ = example_hierarchy
+    inputs = [
+        {"id": item_3.id, "input": {"parent": item_1.id, "title": "moved"}},
+        {"id": item_2.id, "input": {"itemStatus": item_3.item_status_id}},
+    ]
+    data = execute(UPDATE_ITEMS, rf, variables={"inputs": inputs})["updateItems"]
+    assert data["success"]
+    assert [item["title"] for item in data["items"]] == ["moved", "item_2"]
+
+    item_3.refresh_from_db()
+    assert item_3.parent == item_1
+    assert item_3.title == "moved"
+    assert list(item_3.get_ancestors()) == [item_1]
+    assert set(
+        ItemClosure.objects.filter(descendant=item_3).values_list("ancestor", "depth")
+    ) == {(item_3.id, 0), (item_1.id, 1)}
+    assert_tree_consistent(project)
+
+
+@pytest.mark.django_db
+def test_update_items_nested_moves(rf, closure_strategy, example_hierarchy):
+    """Verify that the closure rows of subtrees moved into (and out of) each other in one batch are relinked."""
+    project, item_1, item_2, item_3, _, _ = example_hierarchy
+    item_4 = Item.objects.create(
+        project=project,
+        parent=item_1,
+        item_type=item_3.item_type,
+        item_status=item_3.item_status,
+        item_location=item_3.item_location,
+        title="item_4",
+    )
+    #   item_1              item_2
+    #     item_2      ->      item_4
+    #       item_3              item_1
+    #     item_4                  item_3
+    inputs = [
+        {
+            "id": item_1.id,
+            "input": {"parent": item_4.id, "itemType": item_4.item_type_id},
+        },
+        {"id": item_2.id, "input": {"parent": None}},
+        {"id": item_3.id, "input": {"parent": item_1.id}},
+        {"id": item_4.id, "input": {"parent": item_2.id}},
+    ]
+    data = execute(UPDATE_ITEMS, rf, variables={"inputs": inputs})["updateItems"]
+    assert data["success"], data["errors"]
+    item_3.refresh_from_db()
+    assert list(item_3.get_ancestors()) == [item_2, item_4, item_1]
+    assert_tree_consistent(project)
+
+
+@pytest.mark.django_db
+def test_update_items_validates_against_batch(rf, example_hierarchy):
+    """Verify that each row is validated against the other changes in the batch, eg to prevent circular references."""
+    project, item_1, item_2, item_3, _, _ = example_hierarchy
+    inputs = [
+        {"id": item_2.id, "input": {"parent": item_3.id}},
+        {"id": "missing", "input": {"title": "x"}},
+        {"id": 0, "input": {"title": "x"}},
+    ]
+    data = execute(UPDATE_ITEMS, rf, variables={"inputs": inputs})["updateItems"]
+    assert not data["success"]
+    assert data["errors"] == [
+        {"index": 1, "id": "missing", "messages": ["'missing' is not a valid id."]},
+    ]
+
+    del inputs[1]
+    data = execute(UPDATE_ITEMS, rf, variables={"inputs": inputs})["updateItems"]
+    assert data["errors"] == [
+        {
+            "index": 0,
+            "id": str(item_2.id),
+            "messages": ["An item cannot be its own ancestor."],
+        },
+        {"index": 1, "id": "0", "messages": ["Item does not exist."]},
+    ]
+    item_2.refresh_from_db()
+    assert item_2.parent == item_1
+
+
+@pytest.mark.django_db
+def test_delete_items(rf, example_hierarchy):
+    """Verify that deleting a batch of items deletes their descendants and updates the counters."""
+    project, item_1, item_2, item_3, other_project, other_item = example_hierarchy
+    data = execute(DELETE_ITEMS, rf, variables={"ids": [item_2.id, other_item.id]})[
+        "deleteItems"
+    ]
+    assert data["success"]
+    assert data["ids"] == [str(item_2.id), str(other_item.id)]
+    assert list(Item.objects.all()) == [item_1]
+    assert_tree_consistent(project)
+    assert_tree_consistent(other_project)
+
+    data = execute(DELETE_ITEMS, rf, variables={"ids": [item_1.id, 0]})["deleteItems"]
+    assert data["errors"] == [
+        {"index": 1, "id": "0", "messages": ["Item does not exist."]}
+    ]
+    assert Item.objects.filter(id=item_1.id).exists()
+
+
+CREATE_PROJECTS = """
+mutation ($inputs: [CreateProjectInput!]!) {
+  createProjects(inputs: $inputs) { success projects { name } errors { index messages } }
+}
+"""
+
+
+@pytest.mark.django_db
+def test_create_projects(rf, django_assert_num_queries):
+    """Verify that a batch of projects is created with their default attributes in one query per model."""
+    inputs = [{"name": f" project {i} "} for i in range(20)]
+    # The projects, then the item types, statuses and locations (inside a savepoint)
+    with django_assert_num_queries(6):
+        data = execute(CREATE_PROJECTS, rf, variables={"inputs": inputs})
+    data = data["createProjects"]
+    assert data["success"]
+    assert [project["name"] for project in data["projects"]][:2] == [
+        "project 0",
+        "project 1",
+    ]
+    for project in Project.objects.all():
+        assert project.get_default_item_type().name == "Task"
+        assert project.get_item_locations().count() == len(
+            ItemLocation.default_options()
+        )
+
+
+@pytest.mark.django_db
+def test_create_projects_errors(rf):
+    """Verify that invalid rows are reported by index and that nothing is written if any row is invalid."""
+    inputs = [{"name": "valid"}, {"name": " "}, {"name": "x" * 101}]
+    data = execute(CREATE_PROJECTS, rf, variables={"inputs": inputs})["createProjects"]
+    assert not data["success"]
+    assert [error["index"] for error in data["errors"]] == [1, 2]
+    assert not Project.objects.exists()
@@ -0,0 +1,213 @@
+import asyncio
+import random
+import time
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from benchmarks.__main__ import main as benchmarks_main
+from benchmarks.load import (
+    OPERATIONS,
+    OperationStats,
+    format_summary,
+)
+from benchmarks.load import main as load_main
+from benchmarks.load import run_client, run_load, summarize
+from benchmarks.runner import compare, load_baseline
+from items.models import Item, ItemClosure, Project
+
+
+@pytest.mark.django_db
+def test_check_item_tree_consistent(example_hierarchy):
+    """Verify that the tree check passes when all stored paths are correct."""
+    call_command("check_item_tree")
+
+
+@pytest.mark.django_db
+def test_check_item_tree_fix(example_hierarchy):
+    """Verify that the tree check reports inconsistent paths and can repair them."""
+    _, item_1, item_2, item_3, _, _ = example_hierarchy
+    Item.objects.filter(id=item_3.id).update(path="", depth=0)
+
+    with pytest.raises(CommandError):
+        call_command("check_item_tree")
+
+    call_command("check_item_tree", "--fix")
+    item_3.refresh_from_db()
+    assert item_3.path == f"{item_1.id}/{item_2.id}/" and item_3.depth == 2
+    call_command("check_item_tree")
+
+
+@pytest.mark.django_db
+def test_check_item_tree_fix_closure(closure_strategy, example_hierarchy):
+    """Verify that the tree check repairs missing closure table rows."""
+    _, item_1, _, item_3, _, _ = example_hierarchy
+    ItemClosure.objects.filter(descendant=item_3).delete()
+
+    with pytest.raises(CommandError):
+        call_command("check_item_tree")
+
+    call_command("check_item_tree", "--fix")
+    assert item_1.get_num_descendants() == 2
+    call_command("check_item_tree")
+
+
+@pytest.mark.django_db
+def test_recount(example_hierarchy):
+    """Verify that the recount verification reports drifted counters and that recounting rebuilds them."""
+    project, item_1, _, _, _, _ = example_hierarchy
+    call_command("recount", "--verify")
+
+    Item.objects.filter(id=item_1.id).update(num_descendants=7)
+    Project.objects.filter(id=project.id).update(num_descendants_by_status={})
+    with pytest.raises(CommandError):
+        call_command("recount", "--verify")
+
+    call_command("recount")
+    item_1.refresh_from_db()
+    assert item_1.num_descendants == 2
+    call_command("recount", "--verify")
+
+
+@pytest.mark.django_db
+def test_benchmark_move_subtree(tree_strategy):
+    """Verify that the subtree move benchmark runs and rolls back the project it generates."""
+    stdout = StringIO()
+    call_command(
+        "benchmark_move_subtree", "--size", "30", "--breadth", "3", stdout=stdout
+    )
+    assert "Moved a subtree of 30 item(s)" in stdout.getvalue()
+    assert not Project.objects.exists()
+
+
+def test_benchmark_graphql_documents():
+    """Verify that the document benchmark parses and validates each of its queries."""
+    stdout = StringIO()
+    call_command("benchmark_graphql_documents", "--iterations", "2", stdout=stdout)
+    assert "dashboard:" in stdout.getvalue()
+    assert "item detail:" in stdout.getvalue()
+
+
+@pytest.mark.django_db
+def test_generate_hierarchy(tree_strategy):
+    """Verify that the generated hierarchies have the requested shape and consistent counters."""
+    stdout = StringIO()
+    call_command(
+        "generate_hierarchy",
+        "--projects",
+        "2",
+        "--breadth",
+        "3",
+        "--depth",
+        "3",
+        stdout=stdout,
+    )
+    assert "Generated 2 project(s) with 78 item(s)" in stdout.getvalue()
+    project = Project.objects.get(name="generated 1")
+    assert project.num_children == 3 and project.num_descendants == 39
+    deepest = project.items.order_by("-depth").first()
+    assert deepest.depth == 2 and deepest.get_num_ancestors() == 2
+    assert len(project.items.values("item_status").distinct()) > 1
+    call_command("recount", "--verify", stdout=StringIO())
+    call_command("check_item_tree", stdout=StringIO())
+
+    call_command("generate_hierarchy", "--items", "5", "--name", "small", stdout=stdout)
+    assert Project.objects.get(name="small 1").num_descendants == 5
+
+
+@pytest.mark.django_db
+def test_benchmarks(tmp_path, capsys):
+    """Verify that the benchmarks run, roll back the projects they generate and compare against a baseline."""
+    baseline = tmp_path / "baseline.json"
+    options = ["--breadth", "2", "--depth", "3", "--iterations", "2"]
+    assert benchmarks_main([*options, "--save-baseline", str(baseline)]) == 0
+    assert not Project.objects.exists()
+    output = capsys.readouterr().out
+    assert "README query" in output and "updateItem mutation" in output
+
+    assert (
+        benchmarks_main([*options, "--baseline", str(baseline), "--tolerance", "100"])
+        == 0
+    )
+    results = load_baseline(baseline)
+    results["ancestors"]["queries"] = 0
+    assert compare(results, load_baseline(baseline)) == []
+    assert compare(load_baseline(baseline), results) == [
+        ("ancestors", "1 queries, up from 0")
+    ]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_load(live_server):
+    """Verify that the load generator replays every operation of the mix against a running server without errors."""
+    call_command(
+        "generate_hierarchy", "--breadth", "3", "--depth", "2", stdout=StringIO()
+    )
+    stats, elapsed = asyncio.run(
+        run_load(f"{live_server.url}/graphql/", concurrency=2, duration=1, seed=0)
+    )
+    summary = summarize(stats, elapsed)
+    assert summary["total"]["requests"] == sum(
+        summary[name]["requests"] for name in OPERATIONS
+    )
+    assert all(summary[name]["requests"] for name in OPERATIONS)
+    assert summary["total"]["error_rate"] == 0
+    assert "total" in format_summary(summary)
+
+
+def test_load_truncated_response():
+    """Verify that a response cut short by the server is counted as an error rather than stopping the client."""
+
+    async def truncate(reader, writer):
+        await reader.readuntil(b"\r\n\r\n")
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Length: 100\r\n\r\n{")
+        await writer.drain()
+        writer.close()
+
+    async def run():
+        server = await asyncio.start_server(truncate, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        stats = {"dashboard": OperationStats()}
+        async with server:
+            await run_client(
+                f"http://127.0.0.1:{port}/graphql/",
+                timeout=5,
+                items=[("1", "item")],
+                operations={"dashboard": OPERATIONS["dashboard"]},
+                deadline=time.perf_counter() + 0.2,
+                stats=stats,
+                rng=random.Random(0),
+            )
+        return stats["dashboard"]
+
+    stats = asyncio.run(run())
+    assert stats.errors == len(stats.durations) > 0
+    assert set(stats.error_messages) == {"IncompleteReadError"}
+
+
+@pytest.mark.parametrize(
+    "weight, message",
+    [
+        ("dashboard=lots", "invalid weight 'lots' for 'dashboard'"),
+        ("dashboard=-1", "the weight of 'dashboard' must be a non-negative number"),
+        ("unknown=1", "unknown operation 'unknown'"),
+    ],
+)
+def test_load_weight_errors(weight, message, capsys):
+    """Verify that invalid weights are reported as usage errors."""
+    with pytest.raises(SystemExit) as e:
+        load_main(["--weight", weight])
+    assert e.value.code == 2
+    assert message in capsys.readouterr().err
+
+
+def test_load_empty_mix(capsys):
+    """Verify that a mix without any weighted operations is reported as a usage error."""
+    with pytest.raises(SystemExit) as e:
+        load_main([f"--weight={name}=0" for name in OPERATIONS])
+    assert e.value.code == 2
+    assert "at least one operation must have a weight above 0" in (
+        capsys.readouterr().err
+    )
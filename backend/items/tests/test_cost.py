@@ -0,0 +1,143 @@
+import pytest
+from graphql import get_operation_ast, parse
+
+from items.graphql.cost import CostEstimator
+from items.graphql.schema import schema
+from items.management.commands.generate_hierarchy import generate_project
+from items.models import Project
+from items.tests.test_loaders import README_QUERY, create_projects
+
+ROW_COUNTS = {
+    "projects": 2,
+    "items": 20,
+    "project_children": 3,
+    "project_descendants": 10,
+    "item_children": 4,
+    "item_descendants": 7,
+    "ancestors": 2,
+    "siblings": 4,
+}
+
+
+def estimate(query, variables=None):
+    """Estimate the cost of a query with fixed row counts."""
+    document = parse(query)
+    estimator = CostEstimator(
+        schema.graphql_schema, document, variables, lambda project_id: ROW_COUNTS
+    )
+    return estimator.estimate(get_operation_ast(document))
+
+
+def nested_descendants(depth):
+    """Return a query for the descendants of an item nested to a depth."""
+    return "{ item(id: 1) " + "{ descendants " * depth + "{ id }" + " }" * depth + " }"
+
+
+@pytest.mark.parametrize(
+    "query, variables, cost",
+    [
+        ("{ projects { id name } }", None, 2),
+        # 2 projects, 3 children each with their 3 attributes
+        (README_QUERY, None, 2 + 6 + 3 * 6),
+        ("{ item(id: 1) { descendants { descendants { id } } } }", None, 1 + 7 + 49),
+        # A connection of 5 items, with its edges and their nodes
+        (
+            "query ($n: Int) { itemsConnection(first: $n) { totalCount edges { node { id } } } }",
+            {"n": 5},
+            5 + 5 + 5,
+        ),
+        ("{ itemsConnection { edges { node { id } } } }", None, 300),
+        (
+            "{ projects { ...Children } } fragment Children on ProjectType { children { id } }",
+            None,
+            2 + 6,
+        ),
+        ("{ __schema { types { name } } }", None, 0),
+    ],
+)
+def test_estimate_cost(query, variables, cost):
+    """Verify that the cost of a query is estimated as the number of objects it may resolve."""
+    assert estimate(query, variables) == cost
+
+
+@pytest.mark.django_db
+def test_cost_extension(client):
+    """Verify that the estimated cost is returned in the response's extensions."""
+    create_projects(2, num_items=3)
+    response = client.post(
+        "/graphql/", {"query": README_QUERY}, content_type="application/json"
+    )
+    # 2 projects, with at most 1 child each (with their 3 attributes)
+    assert response.json()["extensions"]["cost"] == {
+        "estimated": 2 + 2 + 3 * 2,
+        "maximum": 50000,
+    }
+
+
+@pytest.mark.django_db
+def test_project_row_counts(client, settings):
+    """Verify that the lists of a query targeting one project are bounded by that project's counters, so a larger
+    project does not get a small project's queries rejected."""
+    create_projects(1, num_items=2)
+    small = Project.objects.get()
+    generate_project("large", breadth=10, depth=2)
+    settings.GRAPHQL_MAX_COST = 50
+
+    def post(query, variables=None):
+        return client.post(
+            "/graphql/",
+            {"query": query, "variables": variables or {}},
+            content_type="application/json",
+        )
+
+    # The project, its root item (with 2 children) and the children of each item
+    response = post(
+        "query ($id: ID) { project(id: $id) { children { children { id } } } }",
+        {"id": small.id},
+    )
+    assert response.status_code == 200
+    assert response.json()["extensions"]["cost"]["estimated"] == 1 + 1 + 2
+    # The 3 items of the project and up to 2 children of each
+    response = post(
+        "query ($id: ID) { items(filters: {project: $id}) { children { id } } }",
+        {"id": small.id},
+    )
+    assert response.status_code == 200
+    assert response.json()["extensions"]["cost"]["estimated"] == 3 + 3 * 2
+
+    # Without a project, the lists are bounded by the large project's counters
+    response = post("{ projects { children { children { id } } } }")
+    assert response.status_code == 400
+    assert "exceeds the maximum of 50" in response.json()["errors"][0]["message"]
+
+
+@pytest.mark.django_db
+def test_cost_limit(client, settings):
+    """Verify that operations with an estimated cost over the maximum are rejected."""
+    create_projects(2, num_items=3)
+    settings.GRAPHQL_MAX_COST = 9
+    response = client.post(
+        "/graphql/", {"query": README_QUERY}, content_type="application/json"
+    )
+    assert response.status_code == 400
+    assert response.json()["errors"][0]["message"] == (
+        "The estimated cost of 10 exceeds the maximum of 9."
+    )
+    assert "data" not in response.json()
+
+
+@pytest.mark.django_db
+def test_depth_limit(client, settings):
+    """Verify that operations which nest deeper than the maximum depth are rejected."""
+    settings.GRAPHQL_MAX_DEPTH = 4
+    response = client.post(
+        "/graphql/", {"query": nested_descendants(3)}, "application/json"
+    )
+    assert response.status_code == 200
+    response = client.post(
+        "/graphql/", {"query": nested_descendants(4)}, "application/json"
+    )
+    assert response.status_code == 400
+    assert response.json()["errors"][0]["message"] == (
+        "Operation has a depth of 5, which exceeds the maximum of 4."
+    )
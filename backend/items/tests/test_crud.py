@@ -0,0 +1,65 @@
+import pytest
+from django.core.exceptions import ValidationError
+
+from items.graphql.crud import BaseCRUD
+from items.models import ItemLocation, ItemStatus, ItemType
+
+itemattribute_models = [ItemType, ItemStatus, ItemLocation]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("model", itemattribute_models)
+@pytest.mark.parametrize(
+    "input, message",
+    [
+        (
+            {"name": "first", "order": 2},
+            "{} names must be unique within each project.",
+        ),
+        (
+            {"name": "second", "order": 1},
+            "{} order must be unique within each project.",
+        ),
+        (
+            {"name": "second", "order": 2, "default": True},
+            "There can only be one default {} within each project.",
+        ),
+    ],
+)
+def test_create_constraint_errors(clean_project, model, input, message):
+    """Verify that violating an item attribute constraint on create raises a friendly `ValidationError`, with the same
+    message as validating a set of new attributes in memory."""
+    BaseCRUD(model).create(
+        {"project": clean_project.id, "name": "first", "order": 1, "default": True}
+    )
+    with pytest.raises(ValidationError) as e:
+        BaseCRUD(model).create({"project": clean_project.id, **input})
+    assert e.value.messages == [message.format(model.__name__)]
+    assert model.objects.count() == 1
+
+    attributes = [
+        model(project=clean_project, name="first", order=1, default=True),
+        model(project=clean_project, **{"default": False, **input}),
+    ]
+    with pytest.raises(ValidationError) as e:
+        model.validate_set(attributes)
+    assert e.value.messages == [message.format(model.__name__)]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("model", itemattribute_models)
+def test_update_constraint_errors(clean_project, model, django_assert_num_queries):
+    """Verify that the constraints are checked by the database on update, with a friendly `ValidationError`."""
+    first = model.objects.create(project=clean_project, name="first", order=1)
+    second = model.objects.create(project=clean_project, name="second", order=2)
+    with pytest.raises(ValidationError) as e:
+        BaseCRUD(model).update(second.id, {"name": "first"})
+    assert e.value.messages == [
+        f"{model.__name__} names must be unique within each project."
+    ]
+    # Fetch, check the project exists (in `full_clean`), then the update in a savepoint (where an `ItemType` also
+    # copies its order to its items)
+    with django_assert_num_queries(6 if model is ItemType else 5):
+        BaseCRUD(model).update(second.id, {"name": "third"})
+    second.refresh_from_db()
+    assert second.name == "third"
@@ -0,0 +1,85 @@
+import json
+
+import pytest
+
+from items.graphql.documents import DocumentCache, document_cache, get_query_hash
+from items.graphql.schema import schema
+from items.tests.test_loaders import README_QUERY, create_projects
+from items.tests.test_response_cache import post_graphql
+
+
+def post_persisted(client, query_hash, query=None):
+    """Post a persisted query (by its hash, with or without the query itself) and return the response."""
+    extensions = {"persistedQuery": {"version": 1, "sha256Hash": query_hash}}
+    data = {"extensions": extensions}
+    if query is not None:
+        data["query"] = query
+    return client.post("/graphql/", data, content_type="application/json")
+
+
+@pytest.mark.django_db
+def test_persisted_query(client):
+    """Verify that a query can be sent by its hash once it has been sent with it."""
+    create_projects(1, num_items=1)
+    query_hash = get_query_hash(README_QUERY)
+
+    response = post_persisted(client, query_hash)
+    assert response.status_code == 400
+    assert response.json()["errors"] == [{"message": "PersistedQueryNotFound"}]
+
+    response = post_persisted(client, query_hash, README_QUERY)
+    assert response.status_code == 200
+    data = response.json()["data"]
+
+    response = post_persisted(client, query_hash)
+    assert response.status_code == 200
+    assert response.json()["data"] == data
+
+    extensions = {"persistedQuery": {"version": 1, "sha256Hash": query_hash}}
+    response = client.get("/graphql/", {"extensions": json.dumps(extensions)})
+    assert response.json()["data"] == data
+
+
+@pytest.mark.django_db
+def test_persisted_query_hash_mismatch(client):
+    """Verify that a query is not persisted by a hash that does not match it."""
+    query_hash = get_query_hash("{ projects { id } }")
+    response = post_persisted(client, query_hash, README_QUERY)
+    assert response.status_code == 400
+    assert post_persisted(client, query_hash).status_code == 400
+
+
+@pytest.mark.django_db
+def test_document_cache(client):
+    """Verify that each query string is parsed and validated once and that invalid queries are not cached."""
+    stats = document_cache.stats()
+    post_graphql(client, README_QUERY)
+    post_graphql(client, README_QUERY)
+    assert document_cache.stats() == {
+        "hits": stats["hits"] + 1,
+        "misses": stats["misses"] + 1,
+        "entries": 1,
+    }
+
+    response = client.post(
+        "/graphql/", {"query": "{ projects { missing } }"}, "application/json"
+    )
+    assert response.status_code == 400
+    assert document_cache.stats()["entries"] == 1
+
+
+def test_document_cache_eviction(settings):
+    """Verify that the least recently used documents are evicted once the cache is full."""
+    settings.GRAPHQL_DOCUMENT_CACHE_SIZE = 2
+    documents = DocumentCache()
+    graphql_schema = schema.graphql_schema
+    queries = ["{ projects { id } }", "{ items { id } }", "{ item(id: 1) { id } }"]
+    first, errors = documents.get(graphql_schema, queries[0])
+    assert errors == []
+    assert first.normalized_query == "{\n  projects {\n    id\n  }\n}"
+    documents.get(graphql_schema, queries[1])
+    assert documents.get(graphql_schema, queries[0])[0] is first
+    documents.get(graphql_schema, queries[2])  # Evicts the second query
+    assert documents.get(graphql_schema, queries[0])[0] is first
+    documents.get(graphql_schema, queries[1])
+    assert documents.stats() == {"hits": 2, "misses": 4, "entries": 2}
@@ -0,0 +1,74 @@
+import pytest
+from django.db import connection
+
+
+@pytest.fixture
+def explain():
+    """Return a function that explains a QuerySet.
+
+    Sequential scans are discouraged on Postgres, where the tiny test tables would otherwise always be scanned.
+    """
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+    return lambda qs: qs.explain()
+
+
+def assert_uses_index(plan, *index_names):
+    """Assert that a query plan reads through one of some indexes."""
+    assert any(index_name in plan for index_name in index_names), plan
+
+
+@pytest.mark.django_db
+def test_dashboard_queries_use_indexes(explain, example_hierarchy):
+    """Verify that the common dashboard queries are index scans rather than scans of the whole table."""
+    project, item_1, _, _, _, _ = example_hierarchy
+    done = project.get_item_statuses().get(name="done")
+    cleared = project.get_item_locations().get(name="cleared")
+
+    assert_uses_index(explain(project.get_children()), "item_project_parent_idx")
+    assert_uses_index(explain(project.get_descendants()), "item_project_order_idx")
+    assert_uses_index(
+        explain(project.get_descendants(item_status=done.id)),
+        "item_project_status_idx",
+        "item_project_order_idx",
+    )
+    assert_uses_index(
+        explain(project.get_descendants(item_location=cleared.id)),
+        "item_project_location_idx",
+        "item_project_order_idx",
+    )
+    assert_uses_index(explain(item_1.get_children()), "item_parent_order_idx")
+
+
+@pytest.mark.django_db
+def test_item_ordering_is_not_joined(example_hierarchy):
+    """Verify that sorting items uses the denormalized type order rather than joining the item types."""
+    project, _, _, _, _, _ = example_hierarchy
+    assert "JOIN" not in str(project.get_descendants().query)
+
+
+@pytest.mark.django_db
+def test_item_type_order_maintained(example_hierarchy):
+    """Verify that the denormalized type order follows changes to an item's type and to the type's order."""
+    project, item_1, item_2, _, _, _ = example_hierarchy
+    area, task = project.get_item_types()
+    assert (item_1.item_type_order, item_2.item_type_order) == (1, 2)
+
+    task.order = 5
+    task.save()
+    item_2.refresh_from_db()
+    assert item_2.item_type_order == 5
+
+    # Moving the area type after the tasks reorders the items
+    area.order = 6
+    area.save()
+    item_1.refresh_from_db()
+    assert item_1.item_type_order == 6
+    assert list(project.get_descendants())[-1] == item_1
+
+    # Changing an item's type (saving only that field) updates its order too
+    item_1.item_type = task
+    item_1.save(update_fields=["item_type"])
+    item_1.refresh_from_db()
+    assert item_1.item_type_order == 5
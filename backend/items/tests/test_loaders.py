@@ -0,0 +1,133 @@
+import pytest
+
+from items.graphql.loaders import Loaders
+from items.graphql.schema import schema
+from items.models import Item, Project
+
+README_QUERY = """
+{
+  projects {
+    name
+    children {
+      title
+      itemType { name }
+      itemStatus { name }
+      itemLocation { name }
+      numChildren
+    }
+  }
+}
+"""
+
+
+def create_projects(num_projects, num_items):
+    """Create some projects (with default attributes) each with a root item that has a number of children."""
+    for i in range(num_projects):
+        project = Project.objects.create(name=f"project {i}")
+        item_type = project.get_default_item_type()
+        root = Item.objects.create(
+            project=project,
+            item_type=project.get_item_types().get(name="Feature"),
+            item_status=project.get_default_item_status(),
+            item_location=project.get_default_item_location(),
+            title="root",
+        )
+        for j in range(num_items):
+            Item.objects.create(
+                project=project,
+                parent=root,
+                item_type=item_type,
+                item_status=project.get_default_item_status(),
+                item_location=project.get_default_item_location(),
+                title=f"child {j}",
+            )
+
+
+def execute(query, rf, **kwargs):
+    """Execute a query against the schema with a request as the context, failing on any errors."""
+    result = schema.execute(query, context_value=rf.post("/graphql/"), **kwargs)
+    assert result.errors is None
+    return result.data
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("num_projects", [1, 5])
+def test_readme_query_batched(rf, django_assert_num_queries, num_projects):
+    """Verify that the README query costs the same number of queries however many projects and items it returns."""
+    create_projects(num_projects, num_items=3)
+    # projects, children (prefetched with their attributes joined and numChildren annotated)
+    with django_assert_num_queries(2):
+        data = execute(README_QUERY, rf)
+    assert len(data["projects"]) == num_projects
+    assert data["projects"][0]["children"] == [
+        {
+            "title": "root",
+            "itemType": {"name": "Feature"},
+            "itemStatus": {"name": "To Do"},
+            "itemLocation": {"name": "Backlog"},
+            "numChildren": 3,
+        }
+    ]
+
+
+@pytest.mark.django_db
+def test_nested_children_batched(rf, django_assert_num_queries):
+    """Verify that each nested level of children costs a constant number of queries."""
+    create_projects(3, num_items=4)
+    query = """
+    {
+      projects {
+        children {
+          parent { title }
+          children { title parent { title } numChildren numDescendants }
+          numDescendants
+        }
+        numChildren
+        numDescendants
+      }
+    }
+    """
+    # projects, children, nested children (each with their counts annotated and the items' parents joined)
+    with django_assert_num_queries(3):
+        data = execute(query, rf)
+    project = data["projects"][0]
+    assert project["numChildren"] == 1 and project["numDescendants"] == 5
+    root = project["children"][0]
+    assert root["parent"] is None and root["numDescendants"] == 4
+    assert len(root["children"]) == 4
+    assert root["children"][0]["parent"] == {"title": "root"}
+    assert root["children"][0]["numDescendants"] == 0
+
+
+@pytest.mark.django_db
+def test_filtered_counts_batched(tree_strategy, rf, example_hierarchy):
+    """Verify that batch loaded counts apply the filters, keeping separate results for each set of filters."""
+    project, item_1, _, _, _, _ = example_hierarchy
+    done = project.get_item_statuses().get(name="done")
+    query = """
+    query ($id: ID, $status: ID) {
+      item(id: $id) {
+        all: numDescendants
+        done: numDescendants(filters: {itemStatus: $status})
+        children(filters: {itemStatus: $status}) { title }
+      }
+    }
+    """
+    data = execute(query, rf, variables={"id": item_1.id, "status": done.id})
+    assert data["item"] == {"all": 2, "done": 1, "children": []}
+
+
+@pytest.mark.django_db
+def test_num_descendants_counted_in_sql(
+    tree_strategy, example_hierarchy, django_assert_num_queries
+):
+    """Verify that descendant counts the stored counters cannot answer are counted for a batch in one query."""
+    _, item_1, item_2, item_3, _, _ = example_hierarchy
+    loaders = Loaders()
+    loaders.register(Item.objects.filter(id__in=[item_1.id, item_2.id, item_3.id]))
+    filters = {"title_contains": "item_"}
+    with django_assert_num_queries(1):
+        assert loaders.load_count("num_descendants", item_1, filters) == 2
+        assert loaders.load_count("num_descendants", item_2, filters) == 1
+        assert loaders.load_count("num_descendants", item_3, filters) == 0
+    assert loaders.load_count("num_descendants", item_1, {"title_contains": "3"}) == 1
@@ -0,0 +1,164 @@
+import pytest
+from django.core.exceptions import ObjectDoesNotExist
+
+from backend.metrics import MAX_SERIES, MetricFamily, MetricsRegistry, Sample, registry
+from items.graphql.crud import BaseCRUD
+from items.models import Project
+from items.tests.test_loaders import README_QUERY, create_projects
+from items.tests.test_response_cache import post_graphql
+
+
+def get_value(name, **labels):
+    """Return the value of a sample of the process's metrics, or 0 if it has not been recorded."""
+    for family in registry.collect():
+        for sample in family.samples:
+            if sample.name == name and sample.labels == labels:
+                return sample.value
+    return 0
+
+
+def test_exposition():
+    """Verify that metrics and collectors are exposed in the Prometheus text format."""
+    metrics = MetricsRegistry()
+    requests = metrics.counter("requests_total", "The requests.", ["path"])
+    latency = metrics.histogram("latency_seconds", "The latency.", buckets=(0.1, 1))
+    metrics.add_collector(
+        lambda: [
+            MetricFamily(
+                "temperature", "gauge", "The heat.", [Sample("temperature", {}, 21)]
+            )
+        ]
+    )
+    requests.inc(path='/a"b')
+    requests.inc(2, path='/a"b')
+    latency.observe(0.5)
+    latency.observe(5)
+
+    assert metrics.expose().splitlines() == [
+        "# HELP requests_total The requests.",
+        "# TYPE requests_total counter",
+        'requests_total{path="/a\\"b"} 3',
+        "# HELP latency_seconds The latency.",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{le="0.1"} 0',
+        'latency_seconds_bucket{le="1"} 1',
+        'latency_seconds_bucket{le="+Inf"} 2',
+        "latency_seconds_sum 5.5",
+        "latency_seconds_count 2",
+        "# HELP temperature The heat.",
+        "# TYPE temperature gauge",
+        "temperature 21",
+    ]
+
+
+def test_labels():
+    """Verify that a metric's labels must match and that its number of series is bounded."""
+    metrics = MetricsRegistry()
+    counter = metrics.counter("operations_total", "The operations.", ["name"])
+    with pytest.raises(ValueError):
+        counter.inc(other="value")
+    with pytest.raises(ValueError):
+        metrics.gauge("operations_total", "A duplicate.")
+
+    for i in range(MAX_SERIES + 5):
+        counter.inc(name=str(i))
+    samples = counter.collect()[0].samples
+    assert len(samples) == MAX_SERIES + 1
+    assert Sample("operations_total", {"name": "other"}, 5) in samples
+
+
+@pytest.mark.django_db
+def test_metrics_endpoint(client):
+    """Verify that the requests, operations and cache lookups of the endpoint are served at /metrics."""
+    create_projects(1, num_items=1)
+    labels = {"operation_type": "query", "operation_name": "anonymous"}
+    operations = get_value("graphql_operations_total", **labels)
+    requests = get_value(
+        "http_request_duration_seconds_count",
+        view="graphql",
+        method="POST",
+        status="200",
+    )
+    post_graphql(client, README_QUERY)
+    post_graphql(client, README_QUERY)
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response["Content-Type"].startswith("text/plain")
+    assert get_value("graphql_operations_total", **labels) == operations + 2
+    assert (
+        get_value(
+            "http_request_duration_seconds_count",
+            view="graphql",
+            method="POST",
+            status="200",
+        )
+        == requests + 2
+    )
+    lines = response.content.decode().splitlines()
+    assert "# TYPE http_request_db_queries histogram" in lines
+    assert 'db_connection_open{alias="default"} 1' in lines
+    # The second request's document came from the document cache
+    assert any(
+        line.startswith('cache_hit_ratio{cache="graphql_document"}') for line in lines
+    )
+
+
+@pytest.mark.django_db
+def test_metrics_endpoint_access(client, admin_client, settings):
+    """Verify that the metrics are only served when enabled, to staff users and the allowed addresses."""
+    settings.METRICS_ENABLED = True
+    settings.METRICS_ALLOWED_IPS = ["10.0.0.1"]
+    assert client.get("/metrics").status_code == 404
+    assert client.get("/metrics", REMOTE_ADDR="10.0.0.1").status_code == 200
+    assert admin_client.get("/metrics").status_code == 200
+
+    settings.METRICS_ENABLED = False
+    assert client.get("/metrics", REMOTE_ADDR="10.0.0.1").status_code == 404
+    assert admin_client.get("/metrics").status_code == 404
+
+
+@pytest.mark.django_db
+def test_crud_metrics():
+    """Verify that writes through the CRUD layer are counted by their result."""
+    success = {"model": "Project", "operation": "create", "result": "success"}
+    error = {"model": "Project", "operation": "delete", "result": "error"}
+    successes, errors = get_value("crud_operations_total", **success), get_value(
+        "crud_operations_total", **error
+    )
+    duration_count = get_value(
+        "crud_operation_duration_seconds_count", model="Project", operation="create"
+    )
+
+    BaseCRUD(Project).create({"name": "project"})
+    with pytest.raises(ObjectDoesNotExist):
+        BaseCRUD(Project).delete(0)
+
+    assert get_value("crud_operations_total", **success) == successes + 1
+    assert get_value("crud_operations_total", **error) == errors + 1
+    assert (
+        get_value(
+            "crud_operation_duration_seconds_count", model="Project", operation="create"
+        )
+        == duration_count + 1
+    )
+
+
+@pytest.mark.django_db
+def test_response_cache_metrics(client, settings):
+    """Verify that the hit ratio of the response cache is reported."""
+    settings.GRAPHQL_RESPONSE_CACHE = "default"
+    hits = get_value("cache_requests_total", cache="graphql_response", result="hit")
+    misses = get_value("cache_requests_total", cache="graphql_response", result="miss")
+    post_graphql(client, README_QUERY)
+    post_graphql(client, README_QUERY)
+    post_graphql(client, README_QUERY)
+
+    new_hits = get_value("cache_requests_total", cache="graphql_response", result="hit")
+    new_misses = get_value(
+        "cache_requests_total", cache="graphql_response", result="miss"
+    )
+    assert (new_hits - hits, new_misses - misses) == (2, 1)
+    assert get_value("cache_hit_ratio", cache="graphql_response") == new_hits / (
+        new_hits + new_misses
+    )
@@ -1,89 +1,21 @@
+import threading
+
 import pytest
 from django.core.exceptions import ValidationError
-from django.db.models.signals import post_save
-
-from items.models import Item, ItemLocation, ItemStatus, ItemType, Project
-from items.signals import create_default_item_attributes
-
-## Fixtures
-
-
-@pytest.fixture
-def clean_project():
-    """Create a project without triggering default item attribute creation."""
-    post_save.disconnect(create_default_item_attributes, sender=Project)
-    project = Project.objects.create(name="project")
-    post_save.connect(create_default_item_attributes, sender=Project)
-    return project
-
-
-@pytest.fixture
-def example_hierarchy(clean_project):
-    """Create an example hierarchy.
-
-    project
-        item_1
-            item_2
-                item_3
-    other_project
-        other_item
-    """
-    project = clean_project
-    # Create some item attributes
-    area = ItemType.objects.create(
-        project=project, name="area", default=False, order=1, nestable=False
-    )
-    task = ItemType.objects.create(
-        project=project, name="task", default=True, order=2, nestable=True
-    )
-    todo = ItemStatus.objects.create(
-        project=project, name="todo", default=True, order=1
-    )
-    done = ItemStatus.objects.create(
-        project=project, name="done", default=False, order=2
-    )
-    backlog = ItemLocation.objects.create(
-        project=project, name="backlog", default=True, order=1
-    )
-    cleared = ItemLocation.objects.create(
-        project=project, name="cleared", default=False, order=2
-    )
-    # Create some items
-    item_1 = Item.objects.create(
-        project=project,
-        item_type=area,
-        item_status=todo,
-        item_location=backlog,
-        title="item_1",
-        changelog="item_1",
-    )
-    item_2 = Item.objects.create(
-        project=project,
-        parent=item_1,
-        item_type=task,
-        item_status=todo,
-        item_location=backlog,
-        title="item_2",
-    )
-    item_3 = Item.objects.create(
-        project=project,
-        parent=item_2,
-        item_type=task,
-        item_status=done,
-        item_location=cleared,
-        title="item_3",
-    )
-    # Create a second project with an item, using default attributes
-    other_project = Project.objects.create(name="other_project")
-    other_item = Item.objects.create(
-        project=other_project,
-        item_type=other_project.get_default_item_type(),
-        item_status=other_project.get_default_item_status(),
-        item_location=other_project.get_default_item_location(),
-        title="other_item",
-    )
-    return project, item_1, item_2, item_3, other_project, other_item
-
+from django.core.management import call_command
+from django.db import IntegrityError
+
+from items import validation
+from items.models import (
+    Item,
+    ItemClosure,
+    ItemLocation,
+    ItemQuerySet,
+    ItemStatus,
+    ItemType,
+    Project,
+)
+from items.validation import get_validation_context, invalidate_validation_context
 
 #### Filters
 
@@ -293,19 +225,19 @@ def test_itemattribute_clean_name(clean_project, model):
 
 @pytest.mark.django_db
 @pytest.mark.parametrize("model", itemattribute_models)
-def test_itemattribute_clean_unique_name(clean_project, model):
+def test_itemattribute_unique_name_constraint(clean_project, model):
     """Verify that item attributes of the same type must have unique names within a `Project`."""
     model.objects.create(project=clean_project, name="name", order=1)
-    with pytest.raises(ValidationError):
+    with pytest.raises(IntegrityError):
         model.objects.create(project=clean_project, name="name", order=2)
 
 
 @pytest.mark.django_db
 @pytest.mark.parametrize("model", itemattribute_models)
-def test_itemattribute_clean_one_default(clean_project, model):
+def test_itemattribute_one_default_constraint(clean_project, model):
     """Verify that each item attribute type can only have one default option within a `Project`."""
     model.objects.create(project=clean_project, name="first", default=True, order=1)
-    with pytest.raises(ValidationError):
+    with pytest.raises(IntegrityError):
         model.objects.create(
             project=clean_project, name="second", default=True, order=2
         )
@@ -313,13 +245,46 @@ def test_itemattribute_clean_one_default(clean_project, model):
 
 @pytest.mark.django_db
 @pytest.mark.parametrize("model", itemattribute_models)
-def test_itemattribute_clean_unique_order(clean_project, model):
+def test_itemattribute_unique_order_constraint(clean_project, model):
     """Verify that the ordering of item attribute is unique with type within a `Project`."""
     model.objects.create(project=clean_project, name="first", order=1)
-    with pytest.raises(ValidationError):
+    with pytest.raises(IntegrityError):
         model.objects.create(project=clean_project, name="second", order=1)
 
 
+@pytest.mark.django_db
+@pytest.mark.parametrize("model", itemattribute_models)
+def test_itemattribute_reorder(clean_project, model, django_assert_max_num_queries):
+    """Verify that a whole set of item attributes can be reordered (including swaps) in a fixed number of queries."""
+    one = model.objects.create(project=clean_project, name="one", order=1)
+    two = model.objects.create(project=clean_project, name="two", order=2)
+    three = model.objects.create(project=clean_project, name="three", order=3)
+    # Lock and load, the two updates (and the item type orders), in a savepoint
+    with django_assert_max_num_queries(6):
+        reordered = model.reorder(clean_project.id, [three.id, two.id, one.id])
+    assert reordered == [three, two, one]
+    assert list(model.objects.values_list("name", "order")) == [
+        ("three", 1),
+        ("two", 2),
+        ("one", 3),
+    ]
+    with pytest.raises(ValidationError):
+        model.reorder(clean_project.id, [three.id, two.id])
+    with pytest.raises(ValidationError):
+        model.reorder(clean_project.id, [three.id, two.id, two.id])
+
+
+@pytest.mark.django_db
+def test_itemtype_reorder_items(example_hierarchy):
+    """Verify that reordering `ItemType`s copies the new orders to their items."""
+    project, item_1, item_2, _, _, _ = example_hierarchy
+    area, task = project.get_item_types()
+    ItemType.reorder(project.id, [task.id, area.id])
+    item_1.refresh_from_db()
+    item_2.refresh_from_db()
+    assert (item_1.item_type_order, item_2.item_type_order) == (2, 1)
+
+
 #### Item
 
 
@@ -400,6 +365,233 @@ def test_item_get_num_children(example_hierarchy):
     assert item_1.get_num_children() == 1
 
 
+@pytest.mark.django_db
+def test_item_path(example_hierarchy):
+    """Verify that an `Item` stores the ids of its ancestors and its depth."""
+    _, item_1, item_2, item_3, _, _ = example_hierarchy
+    item_3.refresh_from_db()
+    assert item_1.path == "" and item_1.depth == 0
+    assert item_3.path == f"{item_1.id}/{item_2.id}/" and item_3.depth == 2
+
+
+@pytest.mark.django_db
+def test_item_reparent_updates_descendant_paths(example_hierarchy):
+    """Verify that moving an `Item` rewrites the paths of all its descendants."""
+    project, item_1, item_2, item_3, _, _ = example_hierarchy
+    item_2.parent = None
+    item_2.save()
+    item_3.refresh_from_db()
+    assert item_3.path == f"{item_2.id}/" and item_3.depth == 1
+    assert list(item_1.get_descendants()) == []
+    assert list(item_3.get_ancestors()) == [item_2]
+
+    # Move back below item_1 via a partial update
+    item_2.parent = item_1
+    item_2.save(update_fields=["parent"])
+    item_3.refresh_from_db()
+    assert item_3.path == f"{item_1.id}/{item_2.id}/" and item_3.depth == 2
+    assert list(item_1.get_descendants()) == [item_2, item_3]
+
+
+@pytest.mark.django_db
+def test_item_stale_save_keeps_path(example_hierarchy):
+    """Verify that saving a stale `Item` after one of its ancestors has moved does not write back its old path."""
+    _, item_1, item_2, item_3, _, _ = example_hierarchy
+    stale_item_3 = Item.objects.get(id=item_3.id)
+    item_2.parent = None
+    item_2.save()
+
+    stale_item_3.title = "renamed"
+    stale_item_3.save()
+    item_3.refresh_from_db()
+    assert item_3.title == "renamed"
+    assert item_3.path == f"{item_2.id}/" and item_3.depth == 1
+
+
+@pytest.mark.django_db
+def test_item_get_descendants_single_query(
+    example_hierarchy, django_assert_num_queries
+):
+    """Verify that listing and counting descendants does not load the rest of the project."""
+    _, item_1, _, _, _, _ = example_hierarchy
+    with django_assert_num_queries(1):
+        item_1.get_num_descendants()
+    with django_assert_num_queries(1):
+        list(item_1.get_descendants())
+
+
+@pytest.mark.django_db
+def test_item_closure_rows(closure_strategy, example_hierarchy):
+    """Verify that creating an `Item` links it to itself and all its ancestors in the closure table."""
+    _, item_1, item_2, item_3, _, _ = example_hierarchy
+    assert set(
+        ItemClosure.objects.filter(descendant=item_3).values_list(
+            "ancestor_id", "depth"
+        )
+    ) == {(item_3.id, 0), (item_2.id, 1), (item_1.id, 2)}
+
+
+@pytest.mark.django_db
+def test_item_closure_reparent(closure_strategy, example_hierarchy):
+    """Verify that moving an `Item` relinks its whole subtree in the closure table."""
+    _, item_1, item_2, item_3, _, _ = example_hierarchy
+    item_2.parent = None
+    item_2.save()
+    assert list(item_1.get_descendants()) == []
+    assert set(
+        ItemClosure.objects.filter(descendant=item_3).values_list(
+            "ancestor_id", "depth"
+        )
+    ) == {(item_3.id, 0), (item_2.id, 1)}
+
+    item_2.parent = item_1
+    item_2.save(update_fields=["parent"])
+    assert list(item_1.get_descendants()) == [item_2, item_3]
+    assert ItemClosure.objects.get(ancestor=item_1, descendant=item_3).depth == 2
+
+
+@pytest.mark.django_db
+def test_item_closure_get_descendants(closure_strategy, example_hierarchy):
+    """Verify that filtered descendants are found by joining against the closure table."""
+    project, item_1, _, item_3, _, _ = example_hierarchy
+    done = project.get_item_statuses().get(name="done")
+    descendants = item_1.get_descendants(item_status=done.id)
+    assert "items_itemclosure" in str(descendants.query)
+    assert list(descendants) == [item_3]
+    assert item_1.get_num_descendants(item_status=done.id) == 1
+
+
+@pytest.mark.django_db
+def test_item_closure_delete(closure_strategy, example_hierarchy):
+    """Verify that deleting an `Item` removes the closure rows of its whole subtree."""
+    project, item_1, item_2, _, _, _ = example_hierarchy
+    item_2.delete()
+    assert set(
+        ItemClosure.objects.filter(descendant__project=project).values_list(
+            "ancestor_id", "descendant_id"
+        )
+    ) == {(item_1.id, item_1.id)}
+
+
+@pytest.mark.django_db
+def test_item_tree_strategies(tree_strategy, example_hierarchy):
+    """Verify that every tree strategy finds the same ancestors and (filtered) descendants."""
+    project, item_1, item_2, item_3, _, _ = example_hierarchy
+    done = project.get_item_statuses().get(name="done")
+    assert list(Item.objects.ancestors_of(item_3)) == [item_1, item_2]
+    assert list(Item.objects.ancestors_of(item_1)) == []
+    assert list(Item.objects.descendants_of(item_1)) == [item_2, item_3]
+    assert list(Item.objects.descendants_of(item_3)) == []
+    assert item_1.get_num_descendants(item_status=done.id) == 1
+
+
+@pytest.mark.django_db
+def test_item_recursive_cte(settings, example_hierarchy, django_assert_num_queries):
+    """Verify that the cte strategy finds ancestors and descendants with a single recursive query."""
+    settings.ITEM_TREE_STRATEGY = "cte"
+    _, item_1, item_2, item_3, _, _ = example_hierarchy
+    descendants = Item.objects.descendants_of(item_1)
+    assert "WITH RECURSIVE" in str(descendants.query)
+    with django_assert_num_queries(1):
+        assert list(descendants) == [item_2, item_3]
+    with django_assert_num_queries(1):
+        assert list(Item.objects.ancestors_of(item_3)) == [item_1, item_2]
+
+
+@pytest.mark.django_db
+def test_item_recursive_cte_fallback(settings, monkeypatch, example_hierarchy):
+    """Verify that the cte strategy walks the hierarchy in Python on backends without recursive queries."""
+    settings.ITEM_TREE_STRATEGY = "cte"
+    monkeypatch.setattr(ItemQuerySet, "RECURSIVE_CTE_VENDORS", ())
+    _, item_1, item_2, item_3, _, _ = example_hierarchy
+    descendants = Item.objects.descendants_of(item_1)
+    assert "WITH RECURSIVE" not in str(descendants.query)
+    assert list(descendants) == [item_2, item_3]
+    assert list(Item.objects.ancestors_of(item_3)) == [item_1, item_2]
+
+
+def assert_counters(obj, num_children, num_descendants, num_descendants_by_status):
+    """Assert the stored counters of a project or item (reloaded from the database)."""
+    obj.refresh_from_db()
+    assert obj.num_children == num_children
+    assert obj.num_descendants == num_descendants
+    assert obj.num_descendants_by_status == {
+        str(item_status.id): num for item_status, num in num_descendants_by_status
+    }
+
+
+@pytest.mark.django_db
+def test_item_counters(tree_strategy, example_hierarchy):
+    """Verify that the stored counters are maintained as items are created, moved, restatused and deleted."""
+    project, item_1, item_2, item_3, _, _ = example_hierarchy
+    todo, done = project.get_item_statuses()
+    assert_counters(project, 1, 3, [(todo, 2), (done, 1)])
+    assert_counters(item_1, 1, 2, [(todo, 1), (done, 1)])
+    assert_counters(item_2, 1, 1, [(done, 1)])
+    assert_counters(item_3, 0, 0, [])
+
+    # Restatus
+    item_3.item_status = todo
+    item_3.save()
+    assert_counters(project, 1, 3, [(todo, 3)])
+    assert_counters(item_1, 1, 2, [(todo, 2)])
+
+    # Move a subtree to the root of the project, with a new status
+    item_2.parent = None
+    item_2.item_status = done
+    item_2.save()
+    assert_counters(project, 2, 3, [(todo, 2), (done, 1)])
+    assert_counters(item_1, 0, 0, [])
+    assert_counters(item_2, 1, 1, [(todo, 1)])
+
+    # Add an item and move the subtree back below it
+    item_4 = Item.objects.create(
+        project=project,
+        parent=item_1,
+        item_type=item_2.item_type,
+        item_status=done,
+        item_location=item_2.item_location,
+        title="item_4",
+    )
+    item_2.parent = item_4
+    item_2.save()
+    assert_counters(project, 1, 4, [(todo, 2), (done, 2)])
+    assert_counters(item_1, 1, 3, [(todo, 1), (done, 2)])
+    assert_counters(item_4, 1, 2, [(todo, 1), (done, 1)])
+
+    # Delete a subtree
+    item_4.delete()
+    assert_counters(project, 1, 1, [(todo, 1)])
+    assert_counters(item_1, 0, 0, [])
+
+
+@pytest.mark.django_db
+def test_item_counters_update_fields(example_hierarchy):
+    """Verify that the counters only change when the changed fields are saved."""
+    project, item_1, _, item_3, _, _ = example_hierarchy
+    todo, done = project.get_item_statuses()
+    item_3.item_status = todo
+    item_3.save(update_fields=["title"])
+    assert_counters(item_1, 1, 2, [(todo, 1), (done, 1)])
+    item_3.save(update_fields=["item_status"])
+    assert_counters(item_1, 1, 2, [(todo, 2)])
+
+
+@pytest.mark.django_db
+def test_item_counters_attribute_delete(tree_strategy, example_hierarchy):
+    """Verify that deleting an attribute uncounts the items deleted with it and bumps the project's tree version."""
+    project, item_1, item_2, item_3, _, _ = example_hierarchy
+    todo, done = project.get_item_statuses()
+    tree_version = Project.objects.get(id=project.id).tree_version
+    done.delete()  # Deletes item_3 by cascade
+    assert not Item.objects.filter(id=item_3.id).exists()
+    assert_counters(project, 1, 2, [(todo, 2)])
+    assert_counters(item_1, 1, 1, [(todo, 1)])
+    assert_counters(item_2, 0, 0, [])
+    assert Project.objects.get(id=project.id).tree_version == tree_version + 1
+    call_command("recount", "--verify")
+
+
 @pytest.mark.django_db
 def test_item_clean_title_and_changelog(example_hierarchy):
     """Verify that `Item` title and changelog are stripped of whitespace and title cannot be empty."""
@@ -468,6 +660,62 @@ def test_item_clean_circular_ancestry(example_hierarchy):
         item_1.clean()
 
 
+@pytest.mark.django_db
+def test_item_clean_single_query(example_hierarchy, django_assert_num_queries):
+    """Verify that validating an `Item` loads its project's attribute sets in one query, then uses the cache, and only
+    looks up its parent when its place in the hierarchy changes."""
+    _, item_1, item_2, item_3, _, _ = example_hierarchy
+    invalidate_validation_context()
+    item_3.parent = item_1
+    # The attribute sets, then the new parent
+    with django_assert_num_queries(2):
+        item_3.clean()
+    with django_assert_num_queries(0):
+        item_2.clean()
+    # Saving without any hierarchy or counter changes only adds the update itself, however often
+    item_2.title = "renamed"
+    with django_assert_num_queries(1):
+        item_2.save(update_fields=["title"])
+    with django_assert_num_queries(1):
+        item_2.save(update_fields=["title"])
+
+
+@pytest.mark.django_db
+def test_item_clean_thread_local_context(example_hierarchy):
+    """Verify that the cached validation contexts are kept per thread."""
+    project = example_hierarchy[0]
+    context = get_validation_context(project.id)
+    other_thread = []
+    thread = threading.Thread(
+        target=lambda: other_thread.append(validation._get_contexts())
+    )
+    thread.start()
+    thread.join()
+    assert other_thread == [{}]
+    assert get_validation_context(project.id) is context
+
+
+@pytest.mark.django_db
+def test_item_clean_context_invalidation(example_hierarchy):
+    """Verify that the cached validation context is invalidated when a project's attributes or items are written."""
+    project, item_1, item_2, item_3, _, _ = example_hierarchy
+    item_3.clean()  # Cache the context
+    item_type = ItemType.objects.create(
+        project=project, name="subtask", order=3, nestable=False
+    )
+    item_3.item_type = item_type
+    item_3.clean()
+
+    # Moving item_2 below item_3 is only valid once item_3 is no longer its child
+    item_2.parent = item_3
+    with pytest.raises(ValidationError):
+        item_2.clean()
+    item_3.item_type = item_2.item_type
+    item_3.parent = item_1
+    item_3.save()
+    item_2.clean()
+
+
 @pytest.mark.django_db
 def test_item_clean_nestable_type():
     """Verify that only nestable `ItemType`s can nest."""
@@ -554,6 +802,46 @@ def test_item_clean_order():
         )
 
 
+@pytest.mark.django_db
+def test_item_move_to(tree_strategy, example_hierarchy):
+    """Verify that moving an `Item` moves its whole subtree and maintains the stored hierarchy."""
+    project, item_1, item_2, item_3, _, _ = example_hierarchy
+    item_2.move_to(None)
+    item_3.refresh_from_db()
+    assert (item_2.path, item_3.path) == ("", f"{item_2.id}/")
+    assert list(item_3.get_ancestors()) == [item_2]
+    assert list(item_1.get_descendants()) == []
+    item_1.refresh_from_db()
+    item_2.refresh_from_db()
+    assert (item_1.num_descendants, item_2.num_descendants) == (0, 1)
+
+    with pytest.raises(ValidationError):
+        item_1.move_to(item_3)  # An area cannot be below a task
+
+
+@pytest.mark.django_db
+def test_item_move_to_validates_subtree(example_hierarchy):
+    """Verify that moving an `Item` validates every item in its subtree against the current type orders."""
+    project, item_1, item_2, item_3, _, _ = example_hierarchy
+    area, task = project.get_item_types()
+    ItemType.reorder(project.id, [task.id, area.id])
+    item_4 = Item.objects.create(
+        project=project,
+        parent=item_3,
+        item_type=area,
+        item_status=item_3.item_status,
+        item_location=item_3.item_location,
+        title="item_4",
+    )
+    ItemType.reorder(
+        project.id, [area.id, task.id]
+    )  # item_4 is now invalid below item_3
+    with pytest.raises(ValidationError):
+        item_2.move_to(None)
+    item_2.refresh_from_db()
+    assert item_2.parent == item_1
+
+
 @pytest.mark.django_db
 def test_item_hierarchy_depth(clean_project, num_levels=100):
     """Verify that we can create and fetch on a nested hierarchy deeper than reasonably expected."""
@@ -0,0 +1,85 @@
+import pytest
+
+from items.models import Item
+from items.tests.test_loaders import create_projects, execute
+from items.tests.test_response_cache import post_graphql
+from items.validation import invalidate_validation_context
+
+REORDER_ITEM_ATTRIBUTES = """
+mutation ($project: ID!, $kind: ItemAttributeKind!, $ids: [ID!]!) {
+  reorderItemAttributes(project: $project, kind: $kind, ids: $ids) {
+    success
+    project { itemStatuses { name } }
+  }
+}
+"""
+
+
+@pytest.mark.django_db
+def test_reorder_item_attributes(rf, example_hierarchy):
+    """Verify that a project's item attributes of one kind can be reordered."""
+    project, _, _, _, _, _ = example_hierarchy
+    todo, done = project.get_item_statuses()
+    data = execute(
+        REORDER_ITEM_ATTRIBUTES,
+        rf,
+        variables={
+            "project": project.id,
+            "kind": "ITEM_STATUS",
+            "ids": [done.id, todo.id],
+        },
+    )["reorderItemAttributes"]
+    assert data["success"]
+    assert data["project"]["itemStatuses"] == [{"name": "done"}, {"name": "todo"}]
+
+
+MOVE_SUBTREE = """
+mutation ($itemId: ID!, $newParentId: ID) {
+  moveSubtree(itemId: $itemId, newParentId: $newParentId) { item { parent { id } } }
+}
+"""
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("num_children", [1, 20])
+def test_move_subtree(
+    rf, example_hierarchy, num_children, django_assert_max_num_queries
+):
+    """Verify that moving a subtree takes the same number of queries however large it is."""
+    project, item_1, item_2, item_3, _, _ = example_hierarchy
+    for i in range(num_children - 1):
+        Item.objects.create(
+            project=project,
+            parent=item_3,
+            item_type=item_3.item_type,
+            item_status=item_3.item_status,
+            item_location=item_3.item_location,
+            title=f"child {i}",
+        )
+    # Validation loads the attribute sets, the new parent and the moved subtree (not the whole project)
+    with django_assert_max_num_queries(17):
+        data = execute(
+            MOVE_SUBTREE,
+            rf,
+            variables={"itemId": item_2.id, "newParentId": None},
+        )
+    assert data["moveSubtree"]["item"]["parent"] is None
+    assert Item.objects.get(id=item_3.id).path == f"{item_2.id}/"
+
+
+@pytest.mark.django_db
+def test_update_item_title_queries(client, django_assert_num_queries):
+    """Verify that an autosave of an item's title does not read the rest of its project."""
+    create_projects(1, num_items=50)
+    child = Item.objects.get(title="child 0")
+    invalidate_validation_context()
+    query = (
+        'mutation { updateItem(id: %d, input: {title: "autosaved"}) { item { id } } }'
+    )
+    # The two row counts of the cost estimate, the item, its five foreign keys (checked by `full_clean`), the attribute
+    # sets of the project and the update in a savepoint, however many items the project has
+    with django_assert_num_queries(12):
+        post_graphql(client, query % child.id)
+    invalidate_validation_context()
+    with django_assert_num_queries(10):  # The row counts are cached
+        post_graphql(client, query % child.id)
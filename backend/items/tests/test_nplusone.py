@@ -0,0 +1,69 @@
+import logging
+
+import pytest
+
+from items.graphql.nplusone import NPlusOneError, get_fingerprint
+from items.models import Item
+from items.tests.test_loaders import README_QUERY, create_projects
+from items.tests.test_metrics import get_value
+from items.tests.test_response_cache import post_graphql
+
+# The ancestors of each item are queried separately
+ANCESTORS_QUERY = "{ projects { children { children { ancestors { id } } } } }"
+
+
+def test_fingerprint():
+    """Verify that queries differing only in their values have the same fingerprint."""
+    assert get_fingerprint(
+        "SELECT * FROM t1 WHERE id IN (1, 2, 3) AND name = 'it''s'  LIMIT 21"
+    ) == get_fingerprint("SELECT * FROM t1 WHERE id IN (%s) AND name = %s\nLIMIT 1")
+    assert get_fingerprint("SELECT * FROM t1 WHERE id = 1") == (
+        "SELECT * FROM t1 WHERE id = ?"
+    )
+
+
+@pytest.mark.django_db
+def test_raise(client):
+    """Verify that a request making N+1 queries raises an error naming the field that made them."""
+    create_projects(2, num_items=3)
+    post_graphql(client, README_QUERY)
+    with pytest.raises(NPlusOneError) as excinfo:
+        post_graphql(client, ANCESTORS_QUERY)
+    [repeated_query] = excinfo.value.repeated_queries
+    assert repeated_query.path == "projects.children.children.ancestors"
+    assert repeated_query.count == 6
+    assert "queries resolving projects.children.children.ancestors" in str(
+        excinfo.value
+    )
+
+
+@pytest.mark.django_db
+def test_log(client, settings, caplog):
+    """Verify that N+1 queries are logged and counted for the sampled requests."""
+    settings.GRAPHQL_NPLUSONE_DETECTION = "log"
+    settings.GRAPHQL_NPLUSONE_SAMPLE_RATE = 0
+    create_projects(2, num_items=3)
+    path = "projects.children.children.ancestors"
+    count = get_value("graphql_repeated_queries_total", path=path)
+    with caplog.at_level(logging.WARNING, logger="items.graphql.nplusone"):
+        post_graphql(client, ANCESTORS_QUERY)
+        assert not caplog.records
+
+        settings.GRAPHQL_NPLUSONE_SAMPLE_RATE = 1
+        post_graphql(client, ANCESTORS_QUERY)
+    [record] = caplog.records
+    assert f"6 queries resolving {path}" in record.getMessage()
+    assert get_value("graphql_repeated_queries_total", path=path) == count + 6
+
+
+@pytest.mark.django_db
+def test_single_resolution(client):
+    """Verify that a field resolved once is not reported, even if it makes several queries of the same shape."""
+    create_projects(1, num_items=1)
+    child = Item.objects.get(title="child 0")
+    # Looks up the item and then its parent, to validate it
+    post_graphql(
+        client,
+        'mutation { updateItem(id: %d, input: {title: "renamed"}) { item { id } } }'
+        % child.id,
+    )
@@ -0,0 +1,125 @@
+import pytest
+
+from items.tests.test_loaders import create_projects, execute
+
+
+@pytest.mark.django_db
+def test_fragments_optimized(rf, django_assert_num_queries):
+    """Verify that fields selected through fragments are joined and prefetched."""
+    create_projects(3, num_items=4)
+    query = """
+    query Dashboard {
+      projects {
+        name
+        children { ...ItemSummary children { ...ItemSummary parent { title } } }
+      }
+    }
+    fragment ItemSummary on ItemType {
+      title
+      itemType { name }
+      itemStatus { name }
+      ... on ItemType { itemLocation { name } }
+      numChildren
+    }
+    """
+    # projects, children, nested children (both prefetched with their attributes joined and numChildren annotated)
+    with django_assert_num_queries(3):
+        data = execute(query, rf)
+    root = data["projects"][0]["children"][0]
+    assert root["itemLocation"] == {"name": "Backlog"} and root["numChildren"] == 4
+    assert root["children"][0]["parent"] == {"title": "root"}
+    assert root["children"][0]["itemType"] == {"name": "Task"}
+
+
+@pytest.mark.django_db
+def test_select_related_optimized(rf, django_assert_num_queries):
+    """Verify that a chain of selected foreign keys is joined into the query for a single item."""
+    create_projects(1, num_items=2)
+    item = execute('{ items(filters: {titleContains: "child 1"}) { id } }', rf)[
+        "items"
+    ][0]
+    query = """
+    query ($id: ID) {
+      item(id: $id) { title itemType { name } parent { title itemType { name } project { name } } }
+    }
+    """
+    with django_assert_num_queries(1):
+        data = execute(query, rf, variables={"id": item["id"]})
+    assert data["item"] == {
+        "title": "child 1",
+        "itemType": {"name": "Task"},
+        "parent": {
+            "title": "root",
+            "itemType": {"name": "Feature"},
+            "project": {"name": "project 0"},
+        },
+    }
+
+
+@pytest.mark.django_db
+def test_only_selected_columns(rf, django_assert_num_queries):
+    """Verify that columns which are not selected are not loaded."""
+    create_projects(1, num_items=2)
+    with django_assert_num_queries(1) as captured:
+        data = execute("{ items { title } }", rf)
+    assert len(data["items"]) == 3
+    sql = captured.captured_queries[0]["sql"]
+    assert '"title"' in sql and '"requirements"' not in sql
+
+
+@pytest.mark.django_db
+def test_filtered_prefetch(rf, example_hierarchy, django_assert_num_queries):
+    """Verify that the same list selected with different filters is prefetched separately."""
+    project, _, _, _, _, _ = example_hierarchy
+    done = project.get_item_statuses().get(name="done")
+    query = """
+    query ($id: ID, $status: ID) {
+      project(id: $id) {
+        all: descendants { title }
+        done: descendants(filters: {itemStatus: $status}) { title }
+      }
+    }
+    """
+    with django_assert_num_queries(3):
+        data = execute(query, rf, variables={"id": project.id, "status": done.id})
+    assert len(data["project"]["all"]) == 3
+    assert data["project"]["done"] == [{"title": "item_3"}]
+
+
+@pytest.mark.django_db
+def test_list_counts_in_one_query(rf, django_assert_num_queries):
+    """Verify that the counts selected for a list are loaded with its query however long it is."""
+    create_projects(20, num_items=3)
+    query = "{ projects { numChildren numDescendants numItems } }"
+    with django_assert_num_queries(1):
+        data = execute(query, rf)
+    assert len(data["projects"]) == 20
+    assert data["projects"][0] == {"numChildren": 1, "numDescendants": 4, "numItems": 4}
+
+
+@pytest.mark.django_db
+def test_filtered_counts_annotated(
+    tree_strategy, rf, example_hierarchy, django_assert_num_queries
+):
+    """Verify that annotated counts (for filters the stored counters cannot answer) match `filter_items`."""
+    project, item_1, item_2, item_3, _, _ = example_hierarchy
+    cleared = project.get_item_locations().get(name="cleared")
+    query = """
+    query ($location: ID) {
+      items {
+        id
+        numChildren(filters: {itemLocation: $location})
+        numDescendants(filters: {titleContains: "item"})
+        cleared: numDescendants(filters: {itemLocation: $location})
+      }
+    }
+    """
+    with django_assert_num_queries(1):
+        data = execute(query, rf, variables={"location": cleared.id})
+    counts = {
+        int(item["id"]): (item["numChildren"], item["numDescendants"], item["cleared"])
+        for item in data["items"]
+    }
+    assert counts[item_1.id] == (0, 2, 1)
+    assert counts[item_2.id] == (1, 1, 1)
+    assert counts[item_3.id] == (0, 0, 0)
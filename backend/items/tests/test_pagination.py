@@ -0,0 +1,100 @@
+import pytest
+from django.utils import timezone
+
+from items.graphql.schema import schema
+from items.models import Item
+from items.tests.test_loaders import create_projects, execute
+
+ITEMS_QUERY = """
+query ($first: Int, $after: String, $last: Int, $before: String) {
+  itemsConnection(first: $first, after: $after, last: $last, before: $before) {
+    edges { cursor node { title } }
+    pageInfo { hasNextPage hasPreviousPage startCursor endCursor }
+  }
+}
+"""
+
+
+def page_through(rf, **variables):
+    """Return the titles from every page of the items connection, following the cursors in one direction."""
+    backwards = "last" in variables
+    titles = []
+    while True:
+        connection = execute(ITEMS_QUERY, rf, variables=variables)["itemsConnection"]
+        page = [edge["node"]["title"] for edge in connection["edges"]]
+        titles = page + titles if backwards else titles + page
+        page_info = connection["pageInfo"]
+        if backwards and page_info["hasPreviousPage"]:
+            variables["before"] = page_info["startCursor"]
+        elif not backwards and page_info["hasNextPage"]:
+            variables["after"] = page_info["endCursor"]
+        else:
+            return titles
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("variables", [{"first": 2}, {"last": 2}, {"first": 100}])
+def test_items_connection_pages(rf, variables):
+    """Verify that paging forwards or backwards returns every item once, in the same order as the items list."""
+    create_projects(2, num_items=3)
+    # Give every item the same timestamp so the order depends on the id tie breaker
+    Item.objects.update(created_at=timezone.now())
+    expected = [item["title"] for item in execute("{ items { title } }", rf)["items"]]
+    assert page_through(rf, **variables) == expected
+
+
+@pytest.mark.django_db
+def test_items_connection_total_count(rf, django_assert_num_queries):
+    """Verify that all the rows are only counted when the total count is selected."""
+    create_projects(1, num_items=3)
+    with django_assert_num_queries(1):
+        data = execute("{ itemsConnection(first: 1) { edges { node { id } } } }", rf)
+    assert len(data["itemsConnection"]["edges"]) == 1
+    with django_assert_num_queries(2):
+        data = execute("{ itemsConnection(first: 1) { totalCount } }", rf)
+    assert data["itemsConnection"]["totalCount"] == 4
+
+
+@pytest.mark.django_db
+def test_nested_connections(rf, django_assert_num_queries):
+    """Verify the descendant and children connections, with their total counts read from the stored counters."""
+    create_projects(1, num_items=3)
+    query = """
+    {
+      projects {
+        descendantsConnection(first: 2) {
+          totalCount
+          edges { node { title childrenConnection(last: 1) { totalCount edges { node { title } } } } }
+        }
+      }
+    }
+    """
+    # projects, one page of descendants, one page of children for each of those
+    with django_assert_num_queries(4):
+        data = execute(query, rf)
+    connection = data["projects"][0]["descendantsConnection"]
+    assert connection["totalCount"] == 4
+    root = connection["edges"][0]["node"]
+    assert root["title"] == "root"
+    assert root["childrenConnection"] == {
+        "totalCount": 3,
+        "edges": [{"node": {"title": "child 2"}}],
+    }
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "arguments, message",
+    [
+        ("first: 1, last: 1", "either first or last"),
+        ("first: 1000", "between 0 and"),
+        ('after: "not a cursor"', "Invalid cursor"),
+    ],
+)
+def test_connection_arguments(rf, arguments, message):
+    """Verify that invalid pagination arguments are reported as errors."""
+    result = schema.execute(
+        f"{{ projectsConnection({arguments}) {{ edges {{ cursor }} }} }}",
+        context_value=rf.post("/graphql/"),
+    )
+    assert message in result.errors[0].message
@@ -0,0 +1,100 @@
+import pytest
+from django.core.cache import cache
+from graphql import parse
+
+from items.graphql.schema import schema
+from items.graphql.views import get_response_tags
+from items.models import Item, ItemLocation, ItemType
+from items.response_cache import ALL_TAGS, invalidate_responses
+from items.tests.test_loaders import README_QUERY, create_projects
+
+ITEM_TYPES_QUERY = "{ projects { itemTypes { name } } }"
+
+
+def post_graphql(client, query, variables=None):
+    """Post a query to the GraphQL endpoint and return its data, failing on any errors."""
+    response = client.post(
+        "/graphql/",
+        {"query": query, "variables": variables or {}},
+        content_type="application/json",
+    )
+    assert response.status_code == 200
+    assert "errors" not in response.json()
+    return response.json()["data"]
+
+
+@pytest.fixture
+def response_cache(settings):
+    """Enable the response cache."""
+    settings.GRAPHQL_RESPONSE_CACHE = "default"
+    return cache
+
+
+@pytest.mark.parametrize(
+    "query, tags",
+    [
+        (ITEM_TYPES_QUERY, ["items.itemtype", "items.project"]),
+        ("{ itemsConnection { totalCount } }", ["items.item"]),
+        ("{ projectTree(id: 1) { nodes { id } } }", sorted(ALL_TAGS)),
+        ("{ __typename }", []),
+    ],
+)
+def test_get_response_tags(query, tags):
+    """Verify that a document is tagged with the models whose fields it selects."""
+    assert get_response_tags(schema.graphql_schema, parse(query)) == tags
+
+
+@pytest.mark.django_db
+def test_response_cache(client, response_cache, django_assert_num_queries):
+    """Verify that a repeated query is served from the cache, however it is formatted."""
+    create_projects(2, num_items=3)
+    data = post_graphql(client, README_QUERY)
+    with django_assert_num_queries(0):
+        assert post_graphql(client, " ".join(README_QUERY.split())) == data
+
+
+@pytest.mark.django_db
+def test_response_cache_disabled(client, django_assert_num_queries):
+    """Verify that responses are not cached unless the cache is enabled."""
+    create_projects(1, num_items=1)
+    post_graphql(client, README_QUERY)
+    with django_assert_num_queries(2):
+        post_graphql(client, README_QUERY)
+
+
+@pytest.mark.django_db
+def test_response_cache_invalidated_by_mutation(client, response_cache):
+    """Verify that a mutation invalidates the cached responses that depend on the models it writes."""
+    create_projects(1, num_items=1)
+    item = Item.objects.get(title="root")
+    post_graphql(client, README_QUERY)
+    post_graphql(client, ITEM_TYPES_QUERY)
+
+    post_graphql(
+        client,
+        'mutation ($id: ID!) { updateItem(id: $id, input: {title: "renamed"}) { item { id } } }',
+        {"id": item.id},
+    )
+    data = post_graphql(client, README_QUERY)
+    assert data["projects"][0]["children"][0]["title"] == "renamed"
+
+
+@pytest.mark.django_db
+def test_response_cache_invalidated_by_bulk_writes(
+    client, response_cache, django_assert_num_queries
+):
+    """Verify that writes which do not send signals, such as reordering attributes, invalidate cached responses."""
+    create_projects(1, num_items=1)
+    project = Item.objects.first().project
+    data = post_graphql(client, ITEM_TYPES_QUERY)
+    ids = list(project.get_item_types().values_list("id", flat=True))
+    ItemType.reorder(project.id, ids[::-1])
+    reordered = post_graphql(client, ITEM_TYPES_QUERY)
+    assert (
+        reordered["projects"][0]["itemTypes"] == data["projects"][0]["itemTypes"][::-1]
+    )
+
+    # Writes to models the response does not depend on leave it cached
+    invalidate_responses(ItemLocation)
+    with django_assert_num_queries(0):
+        post_graphql(client, ITEM_TYPES_QUERY)
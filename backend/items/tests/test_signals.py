@@ -1,3 +1,4 @@
+from django.core.exceptions import ValidationError
 from django.test import TestCase
 
 from items.models import ItemLocation, ItemStatus, ItemType, Project
@@ -18,3 +19,33 @@ class ProjectSignalTests(TestCase):
 
         item_locations = ItemLocation.objects.filter(project=self.project)
         self.assertEqual(item_locations.count(), len(ItemLocation.default_options()))
+
+    def test_create_default_item_attributes_queries(self):
+        """Verify that the default item attributes are created with one query for each attribute set."""
+        with self.assertNumQueries(4):
+            Project.objects.create(name="Test Project")
+
+    def test_validate_default_item_attributes(self):
+        """Verify that a set of new attributes is validated in memory like `clean`."""
+        project = Project(name="Test Project")
+        with self.assertRaises(ValidationError):
+            ItemStatus.validate_set(
+                [
+                    ItemStatus(project=project, name="todo", order=1),
+                    ItemStatus(project=project, name=" todo ", order=2),
+                ]
+            )
+        with self.assertRaises(ValidationError):
+            ItemStatus.validate_set(
+                [
+                    ItemStatus(project=project, name="todo", order=1, default=True),
+                    ItemStatus(project=project, name="done", order=2, default=True),
+                ]
+            )
+        with self.assertRaises(ValidationError):
+            ItemStatus.validate_set(
+                [
+                    ItemStatus(project=project, name="todo", order=1),
+                    ItemStatus(project=project, name="done", order=1),
+                ]
+            )
@@ -0,0 +1,104 @@
+import pytest
+
+from items.graphql.tracing import (
+    FieldStats,
+    Tracer,
+    TracingMiddleware,
+    resolver_stats,
+)
+from items.tests.test_loaders import README_QUERY, create_projects
+
+
+@pytest.fixture(autouse=True)
+def clear_resolver_stats():
+    """Start every test without any recorded timings."""
+    resolver_stats.clear()
+
+
+def post_query(client, query, **headers):
+    """Post a query to the GraphQL endpoint and return its JSON response."""
+    response = client.post(
+        "/graphql/", {"query": query}, content_type="application/json", headers=headers
+    )
+    assert response.status_code == 200
+    return response.json()
+
+
+@pytest.mark.django_db
+def test_tracing(client, django_assert_num_queries):
+    """Verify that the timings and SQL queries of each field are returned if the tracing header is set."""
+    create_projects(2, num_items=3)
+    # The row counts of projects and items for the cost estimate, then the query itself
+    with django_assert_num_queries(4):
+        data = post_query(client, README_QUERY, **{"X-GraphQL-Tracing": "1"})
+    tracing = data["extensions"]["tracing"]
+    assert tracing["sqlCount"] == 2
+    resolvers = {tuple(trace["path"]): trace for trace in tracing["resolvers"]}
+    assert resolvers[("projects",)]["sqlCount"] == 2  # The children are prefetched
+    assert resolvers[("projects", 1, "children", 0, "title")]["sqlCount"] == 0
+    assert (
+        resolvers[("projects", 1, "children", 0, "title")]["parentType"] == "ItemType"
+    )
+    assert sum(trace["sqlCount"] for trace in tracing["resolvers"]) == 2
+
+
+@pytest.mark.django_db
+def test_tracing_disabled(client, settings):
+    """Verify that tracing is only returned when it is both requested and enabled."""
+    assert "tracing" not in post_query(client, README_QUERY)["extensions"]
+    settings.GRAPHQL_TRACING = False
+    data = post_query(client, README_QUERY, **{"X-GraphQL-Tracing": "1"})
+    assert "tracing" not in data["extensions"]
+
+
+@pytest.mark.django_db
+def test_tracing_sampled(client, settings, monkeypatch):
+    """Verify that only requests which ask for their tracing or are sampled are traced."""
+    settings.GRAPHQL_NPLUSONE_DETECTION = None
+    settings.GRAPHQL_TRACING_SAMPLE_RATE = 0
+    create_projects(1, num_items=1)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("An untraced request was traced.")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(Tracer, "__call__", fail)
+        patch.setattr(TracingMiddleware, "resolve", fail)
+        post_query(client, README_QUERY)
+    assert resolver_stats.snapshot() == []
+
+    post_query(client, README_QUERY, **{"X-GraphQL-Tracing": "1"})
+    settings.GRAPHQL_TRACING_SAMPLE_RATE = 1
+    post_query(client, README_QUERY)
+    [(_, _, stats)] = [
+        field for field in resolver_stats.snapshot() if field[1] == "projects"
+    ]
+    assert stats.count == 2
+
+
+def test_field_stats_quantiles():
+    """Verify that the quantiles are taken from the most recent durations."""
+    stats = FieldStats(window_size=100)
+    assert stats.quantiles() == {}
+    stats.durations.extend(range(200))
+    assert stats.quantiles() == {0.5: 150, 0.9: 190, 0.99: 199}
+
+
+@pytest.mark.django_db
+def test_metrics(client):
+    """Verify that the rolling timings of every request are served in the Prometheus text format."""
+    create_projects(1, num_items=1)
+    post_query(client, README_QUERY)
+    post_query(client, README_QUERY)
+    response = client.get("/metrics")
+    assert response["Content-Type"].startswith("text/plain")
+    lines = response.content.decode().splitlines()
+    labels = 'parent_type="Query",field_name="projects"'
+    assert f"graphql_resolver_duration_seconds_count{{{labels}}} 2" in lines
+    assert f"graphql_resolver_sql_queries_total{{{labels}}} 4" in lines
+    assert any(
+        line.startswith(
+            f'graphql_resolver_duration_seconds{{{labels},quantile="0.99"}}'
+        )
+        for line in lines
+    )
@@ -0,0 +1,65 @@
+import pytest
+
+from items.models import Item
+from items.tests.test_loaders import create_projects, execute
+from items.tree import build_tree, flatten_tree
+
+PROJECT_TREE_QUERY = """
+query ($id: ID!, $maxDepth: Int, $filters: ItemFilterInput) {
+  projectTree(id: $id, maxDepth: $maxDepth, filters: $filters) {
+    roots { item { title itemType { name } } children { id depth children { id } } }
+    nodes { id parentId depth }
+  }
+}
+"""
+
+
+@pytest.mark.django_db
+def test_build_tree_filtered(example_hierarchy):
+    """Verify that items missing from a filtered list are skipped, nesting their descendants below their ancestors."""
+    _, item_1, _, item_3, _, _ = example_hierarchy
+    roots = build_tree([item_1, item_3])
+    assert [node.item for node in roots] == [item_1]
+    assert [(node.item, node.parent_id, node.depth) for node in roots[0].children] == [
+        (item_3, item_1.id, 1)
+    ]
+
+
+@pytest.mark.django_db
+def test_project_get_tree(example_hierarchy, django_assert_num_queries):
+    """Verify that a `Project`'s tree is loaded in one query and can be limited by depth."""
+    project, item_1, item_2, item_3, _, _ = example_hierarchy
+    with django_assert_num_queries(1):
+        roots = project.get_tree()
+    assert [(node.item, node.depth) for node in flatten_tree(roots)] == [
+        (item_1, 0),
+        (item_2, 1),
+        (item_3, 2),
+    ]
+    roots = project.get_tree(max_depth=1)
+    assert [node.item for node in flatten_tree(roots)] == [item_1, item_2]
+    roots = project.get_tree(item_status=item_3.item_status_id)
+    assert [(node.item, node.depth) for node in flatten_tree(roots)] == [(item_3, 0)]
+
+
+@pytest.mark.django_db
+def test_project_tree_query(rf, django_assert_num_queries):
+    """Verify that the project tree query returns nested and flat trees in a constant number of queries."""
+    create_projects(1, num_items=20)
+    root = Item.objects.get(title="root")
+    # The project, all its items, then their item types
+    with django_assert_num_queries(3):
+        data = execute(PROJECT_TREE_QUERY, rf, variables={"id": root.project_id})
+    tree = data["projectTree"]
+    assert tree["roots"][0]["item"] == {
+        "title": "root",
+        "itemType": {"name": "Feature"},
+    }
+    assert len(tree["roots"][0]["children"]) == 20
+    assert tree["nodes"][0] == {"id": str(root.id), "parentId": None, "depth": 0}
+    assert {node["parentId"] for node in tree["nodes"][1:]} == {str(root.id)}
+
+    data = execute(
+        PROJECT_TREE_QUERY, rf, variables={"id": root.project_id, "maxDepth": 0}
+    )
+    assert data["projectTree"]["roots"][0]["children"] == []
@@ -0,0 +1,76 @@
+import pytest
+
+from items.models import Item, ItemQuerySet
+from items.tree_index import TreeIndex, TreeIndexCache, get_tree_index, tree_index_cache
+
+
+def test_tree_index():
+    """Verify that a `TreeIndex` finds ancestors and descendants from its arrays."""
+    #   1
+    #     2
+    #       4
+    #     3
+    #   5
+    index = TreeIndex([(1, None), (2, 1), (3, 1), (4, 2), (5, None)])
+    assert index.ancestor_ids(4) == [2, 1]
+    assert index.ancestor_ids(1) == []
+    assert index.ancestor_ids(100) == []
+    assert index.descendant_ids(1) == [2, 3, 4]
+    assert index.descendant_ids(5) == []
+    assert index.nbytes == 8 * (5 + 5 + 6 + 3)
+
+
+def test_tree_index_cache_eviction(settings):
+    """Verify that the least recently used indexes are evicted once the cache is over its memory budget."""
+    cache = TreeIndexCache()
+    rows = [(id, None) for id in range(10)]  # 8 * (10 + 10 + 11) bytes
+    settings.ITEM_TREE_INDEX_CACHE_BYTES = 500
+    first = cache.get(1, 0, lambda: rows)
+    cache.get(2, 0, lambda: rows)
+    assert cache.get(1, 0, lambda: rows) is first
+    cache.get(3, 0, lambda: rows)  # Evicts project 2, the least recently used
+    assert cache.stats() == {
+        "hits": 1,
+        "misses": 3,
+        "evictions": 1,
+        "entries": 2,
+        "bytes": 2 * 8 * 31,
+    }
+    assert cache.get(1, 1, lambda: rows) is not first  # A new version
+
+
+@pytest.mark.django_db(transaction=True)
+def test_get_tree_index_version(example_hierarchy, django_assert_num_queries):
+    """Verify that a project's cached index is used until a write changes the project's hierarchy."""
+    project, item_1, item_2, item_3, _, _ = example_hierarchy
+    assert get_tree_index(project.id).descendant_ids(item_1.id) == [
+        item_2.id,
+        item_3.id,
+    ]
+    with django_assert_num_queries(1):  # Only the version
+        get_tree_index(project.id)
+    assert tree_index_cache.stats()["hits"] == 1
+
+    item_3.parent = item_1
+    item_3.save()
+    misses = tree_index_cache.stats()["misses"]
+    assert get_tree_index(project.id).ancestor_ids(item_3.id) == [item_1.id]
+    assert tree_index_cache.stats()["misses"] == misses + 1
+
+
+@pytest.mark.django_db
+def test_get_tree_index_transaction(example_hierarchy):
+    """Verify that indexes built inside a transaction are not cached."""
+    project, _, _, _, _, _ = example_hierarchy
+    get_tree_index(project.id)
+    assert tree_index_cache.stats()["entries"] == 0
+
+
+@pytest.mark.django_db
+def test_walk_uses_tree_index(settings, monkeypatch, example_hierarchy):
+    """Verify that the cte strategy's fallback walks the project's tree index."""
+    settings.ITEM_TREE_STRATEGY = "cte"
+    monkeypatch.setattr(ItemQuerySet, "RECURSIVE_CTE_VENDORS", ())
+    _, item_1, item_2, item_3, _, _ = example_hierarchy
+    assert list(Item.objects.ancestors_of(item_3)) == [item_1, item_2]
+    assert list(Item.objects.descendants_of(item_1)) == [item_2, item_3]
@@ -0,0 +1,156 @@
+"""Helpers for the stored representations of the `Item` hierarchy.
+
+Each `Item` stores the ids of its ancestors from the root down to its parent, eg "1/5/9/" for an item nested three
+levels deep, so an item's descendants are the rows whose path starts with `{item.path}{item.id}/`.
+
+Optionally (see `ITEM_TREE_STRATEGY` in the settings) the hierarchy is also stored as a closure table of
+`(ancestor, descendant, depth)` rows, including a depth 0 row linking each item to itself. Alternatively the "cte"
+strategy ignores both and follows the `parent` relationships with recursive queries.
+
+Loaded items can also be assembled into a nested tree in memory with `build_tree`.
+"""
+
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+PATH_SEPARATOR = "/"
+
+TREE_STRATEGIES = ("path", "closure", "cte")
+
+
+def get_tree_strategy():
+    """Return the configured strategy used to query the `Item` hierarchy."""
+    strategy = getattr(settings, "ITEM_TREE_STRATEGY", "path")
+    if strategy not in TREE_STRATEGIES:
+        raise ImproperlyConfigured(
+            f"ITEM_TREE_STRATEGY must be one of {', '.join(TREE_STRATEGIES)}, not {strategy!r}."
+        )
+    return strategy
+
+
+def join_path(ids):
+    """Return the materialized path for a list of ancestor ids, ordered from the root."""
+    return "".join(f"{id}{PATH_SEPARATOR}" for id in ids)
+
+
+def split_path(path):
+    """Return the list of ancestor ids stored in a materialized path, ordered from the root."""
+    return [int(id) for id in path.split(PATH_SEPARATOR) if id]
+
+
+def build_paths(parent_lookup):
+    """Build the expected `(path, depth)` of every item from a `{item_id: parent_id, ...}` lookup.
+
+    Raises a `ValueError` if the lookup contains a circular reference.
+    """
+    paths = {}
+    for item_id in parent_lookup:
+        # Walk upwards until an item with a known path (or the root) is found
+        chain = []
+        current_id = item_id
+        while current_id is not None and current_id not in paths:
+            if current_id in chain:
+                raise ValueError(f"Item {current_id} is its own ancestor.")
+            chain.append(current_id)
+            current_id = parent_lookup.get(current_id)
+
+        # Then fill in the paths on the way back down
+        for chain_id in reversed(chain):
+            parent_id = parent_lookup.get(chain_id)
+            if parent_id is None:
+                paths[chain_id] = ("", 0)
+            else:
+                parent_path, parent_depth = paths[parent_id]
+                paths[chain_id] = (
+                    f"{parent_path}{parent_id}{PATH_SEPARATOR}",
+                    parent_depth + 1,
+                )
+    return paths
+
+
+def build_closure(item_id, path):
+    """Return the `(ancestor_id, descendant_id, depth)` closure rows linking an item to itself and its ancestors."""
+    ancestor_ids = split_path(path)
+    rows = [(item_id, item_id, 0)]
+    for distance, ancestor_id in enumerate(reversed(ancestor_ids), start=1):
+        rows.append((ancestor_id, item_id, distance))
+    return rows
+
+
+def build_counts(items):
+    """Build the expected counters from a list of `(item_id, path, item_status_id)` tuples for one project.
+
+    Returns a `{item_id: (num_children, num_descendants, num_descendants_by_status), ...}` lookup, with the counters
+    of the project itself under the key None.
+    """
+    num_children = Counter()
+    num_descendants = Counter()
+    by_status = defaultdict(Counter)
+    for item_id, path, item_status_id in items:
+        ancestor_ids = split_path(path)
+        num_children[ancestor_ids[-1] if ancestor_ids else None] += 1
+        for ancestor_id in [None, *ancestor_ids]:
+            num_descendants[ancestor_id] += 1
+            by_status[ancestor_id][str(item_status_id)] += 1
+    return {
+        key: (num_children[key], num_descendants[key], dict(by_status[key]))
+        for key in [None, *(item_id for item_id, _, _ in items)]
+    }
+
+
+class TreeNode:
+    """An item in a tree assembled in memory, with its parent and children in that tree.
+
+    Attributes:
+        item (Item): The item.
+        parent_id (int): The id of the item's nearest ancestor in the tree, or None for a root.
+        depth (int): The number of the item's ancestors in the tree.
+        children (list): The `TreeNode`s of the items nested directly below the item in the tree.
+    """
+
+    def __init__(self, item):
+        self.item = item
+        self.parent_id = None
+        self.depth = 0
+        self.children = []
+
+
+def build_tree(items):
+    """Assemble a list of items from one project into a tree in O(n), returning its root `TreeNode`s.
+
+    Each item is nested below its nearest ancestor in the list, so a filtered list still forms a tree, and siblings
+    keep the order of the list.
+    """
+    nodes = {item.id: TreeNode(item) for item in items}
+    roots = []
+    for node in nodes.values():
+        parent_id = node.item.parent_id
+        if parent_id is not None and parent_id not in nodes:
+            # Fall back to the nearest ancestor in the list, if any
+            parent_id = next(
+                (id for id in reversed(split_path(node.item.path)) if id in nodes),
+                None,
+            )
+        node.parent_id = parent_id
+        if parent_id is None:
+            roots.append(node)
+        else:
+            nodes[parent_id].children.append(node)
+
+    for node in flatten_tree(roots):
+        if node.parent_id is not None:
+            node.depth = nodes[node.parent_id].depth + 1
+    return roots
+
+
+def flatten_tree(roots):
+    """Return the nodes of a tree as a flat list in depth first order, each parent before its children."""
+    flat = []
+    nodes_to_process = list(reversed(roots))
+    while nodes_to_process:
+        node = nodes_to_process.pop()
+        flat.append(node)
+        nodes_to_process.extend(reversed(node.children))
+    return flat
@@ -0,0 +1,182 @@
+"""A cache of compact per-project indexes of the `Item` hierarchy.
+
+Walking the hierarchy in Python (see the "cte" strategy's fallback in `ItemQuerySet`) needs every parent relationship
+of a project. Rather than rebuilding a lookup for every item resolved in a request, each project's relationships are
+loaded once into a `TreeIndex` of flat integer arrays and cached in-process against the project's `tree_version`, which
+is bumped by every write that changes the project's hierarchy (see `CounterChanges` and `items.batch`). A cached index
+is therefore only used while the stored version still matches, however many processes are writing.
+
+The cache evicts the least recently used indexes once their total size exceeds `ITEM_TREE_INDEX_CACHE_BYTES` and
+counts its hits, misses and evictions (see `TreeIndexCache.stats`).
+"""
+
+import threading
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import transaction
+
+# The default memory budget of the cache, in bytes
+DEFAULT_CACHE_BYTES = 32 * 1024 * 1024
+
+
+class TreeIndex:
+    """The parent and child relationships of one project's items, stored in flat arrays.
+
+    Items are stored by position, in ascending id order. `parents` holds the position of each item's parent (or -1)
+    and the positions of each item's children are `children[child_offsets[i]:child_offsets[i + 1]]`.
+    """
+
+    def __init__(self, rows):
+        """Build the index from a list of `(id, parent_id)` rows sorted by id."""
+        self.ids = array("q", (id for id, _parent_id in rows))
+        positions = {id: position for position, id in enumerate(self.ids)}
+        self.parents = array(
+            "q", (positions.get(parent_id, -1) for _id, parent_id in rows)
+        )
+
+        num_children = [0] * (len(self.ids) + 1)
+        for parent in self.parents:
+            if parent >= 0:
+                num_children[parent + 1] += 1
+        self.child_offsets = array("q", num_children)
+        for position in range(len(self.ids)):
+            self.child_offsets[position + 1] += self.child_offsets[position]
+        self.children = array("q", [0]) * self.child_offsets[-1]
+        next_child = array("q", self.child_offsets)
+        for position, parent in enumerate(self.parents):
+            if parent >= 0:
+                self.children[next_child[parent]] = position
+                next_child[parent] += 1
+
+    @property
+    def nbytes(self):
+        """The number of bytes used by the arrays of the index."""
+        return sum(
+            a.itemsize * len(a)
+            for a in (self.ids, self.parents, self.child_offsets, self.children)
+        )
+
+    def _position(self, id):
+        position = bisect_left(self.ids, id)
+        if position < len(self.ids) and self.ids[position] == id:
+            return position
+        return None
+
+    def ancestor_ids(self, id):
+        """Return the ids of an item's ancestors, from its parent upwards (stopping at any cycle)."""
+        ancestor_ids = []
+        position = self._position(id)
+        if position is None:
+            return ancestor_ids
+        position = self.parents[position]
+        while position >= 0 and len(ancestor_ids) < len(self.ids):
+            ancestor_ids.append(self.ids[position])
+            position = self.parents[position]
+        return ancestor_ids
+
+    def descendant_ids(self, id):
+        """Return the ids of an item's descendants, breadth first."""
+        position = self._position(id)
+        if position is None:
+            return []
+        positions = [position]
+        for position in positions:  # Extended while iterating
+            positions.extend(
+                self.children[
+                    self.child_offsets[position] : self.child_offsets[position + 1]
+                ]
+            )
+            if len(positions) > len(self.ids):
+                break  # A cycle
+        return [self.ids[position] for position in positions[1:]]
+
+
+class TreeIndexCache:
+    """A least recently used cache of `TreeIndex`es by project id, each stored with the version it was built at."""
+
+    def __init__(self):
+        self._entries = OrderedDict()  # {project_id: (tree_version, TreeIndex), ...}
+        self._lock = threading.Lock()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def max_bytes(self):
+        return getattr(settings, "ITEM_TREE_INDEX_CACHE_BYTES", DEFAULT_CACHE_BYTES)
+
+    def get(self, project_id, tree_version, load, store=True):
+        """Return the index of a project at a version, building it from the rows returned by `load` if needed.
+
+        A newly built index is only cached if `store` is true.
+        """
+        with self._lock:
+            entry = self._entries.get(project_id)
+            if entry is not None and entry[0] == tree_version:
+                self._entries.move_to_end(project_id)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        index = TreeIndex(load())
+        if not store:
+            return index
+        with self._lock:
+            previous = self._entries.pop(project_id, None)
+            if previous is not None:
+                self.nbytes -= previous[1].nbytes
+            self._entries[project_id] = (tree_version, index)
+            self.nbytes += index.nbytes
+            # Evict the least recently used indexes, but always keep the one just built
+            while self.nbytes > self.max_bytes and len(self._entries) > 1:
+                _project_id, (_version, evicted) = self._entries.popitem(last=False)
+                self.nbytes -= evicted.nbytes
+                self.evictions += 1
+        return index
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+    def stats(self):
+        """Return the cache's counters and size."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self.nbytes,
+            }
+
+
+tree_index_cache = TreeIndexCache()
+
+
+def get_tree_index(project_id):
+    """Return the `TreeIndex` of a project, checking its current `tree_version` in one query.
+
+    Indexes built inside a transaction are not cached, as the version they were built at may yet be rolled back.
+    """
+    from items.models import Item, Project
+
+    tree_version = (
+        Project.objects.filter(id=project_id)
+        .values_list("tree_version", flat=True)
+        .first()
+    )
+    return tree_index_cache.get(
+        project_id,
+        tree_version,
+        lambda: list(
+            Item.objects.filter(project_id=project_id)
+            .order_by("id")
+            .values_list("id", "parent_id")
+        ),
+        store=not transaction.get_connection().in_atomic_block,
+    )
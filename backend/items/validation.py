@@ -0,0 +1,266 @@
+"""In-memory validation of `Item` writes against preloaded project data.
+
+Validating an item needs its project's attribute sets and, if its place in the hierarchy changes, its parent. `Item.clean`
+reads the attribute sets from a cached `ItemValidationContext` per project (see `get_validation_context`), loaded in a
+single query and invalidated whenever the project or its attributes are written. The context does not hold the
+project's items: a new parent is looked up on its own, and cycles are found from its materialized path, so validating a
+single write never reads the whole project. Writing many items at once (see `items.batch`) loads its own contexts with
+every item of the project preloaded (and any pending changes applied) instead. Either way each item is then validated
+with `validate_item`.
+
+The cache is kept per thread, so a context loaded inside one request's transaction is never seen by another, and is
+cleared when a request finishes (see `items.signals`).
+"""
+
+import threading
+from collections import namedtuple
+
+from django.core.exceptions import ValidationError
+from django.db.models import IntegerField, Value
+from django.db.models.functions import Cast
+from django.utils.translation import gettext_lazy as _
+
+from items.tree import join_path, split_path
+
+# The fields of the attributes and items that validation needs, as loaded into a context
+ItemTypeInfo = namedtuple("ItemTypeInfo", ["id", "order", "nestable"])
+ItemInfo = namedtuple("ItemInfo", ["id", "parent_id", "item_type_id", "path"])
+
+# The kinds of row returned by the query that loads a context
+ITEM_TYPE_ROW, ITEM_STATUS_ROW, ITEM_LOCATION_ROW = range(3)
+
+# The cached contexts of the current thread, {project_id: ItemValidationContext, ...}
+_local = threading.local()
+
+
+class ItemValidationContext:
+    """The attribute sets (and possibly the items) of a project, used to validate item writes in memory.
+
+    Attributes:
+        item_types (dict): The project's `ItemType`s by id.
+        item_status_ids (set): The ids of the project's `ItemStatus`es.
+        item_location_ids (set): The ids of the project's `ItemLocation`s.
+        items (dict): The project's `Item`s by id, with any pending changes applied (at least their `parent_id`,
+            `item_type_id` and `path` must be loaded), or None if they are looked up when needed.
+        project_id (int): The id of the project, to look up its items if they are not preloaded.
+    """
+
+    def __init__(
+        self,
+        item_types,
+        item_status_ids,
+        item_location_ids,
+        items=None,
+        project_id=None,
+    ):
+        self.item_types = item_types
+        self.item_status_ids = item_status_ids
+        self.item_location_ids = item_location_ids
+        self.items = items
+        self.project_id = project_id
+
+    @classmethod
+    def load(cls, project_id):
+        """Load the attribute sets of a project in a single query, as `ItemTypeInfo`s and ids."""
+        from items.models import ItemLocation, ItemStatus, ItemType
+
+        def rows(model, kind, a=Value(None), b=Value(None)):
+            return (
+                model.objects.filter(project_id=project_id)
+                .order_by()
+                .values_list(
+                    Value(kind),
+                    "id",
+                    Cast(a, IntegerField()),
+                    Cast(b, IntegerField()),
+                )
+            )
+
+        item_types, item_status_ids, item_location_ids = {}, set(), set()
+        for kind, id, a, b in rows(ItemType, ITEM_TYPE_ROW, "order", "nestable").union(
+            rows(ItemStatus, ITEM_STATUS_ROW),
+            rows(ItemLocation, ITEM_LOCATION_ROW),
+            all=True,
+        ):
+            if kind == ITEM_TYPE_ROW:
+                item_types[id] = ItemTypeInfo(id, a, bool(b))
+            elif kind == ITEM_STATUS_ROW:
+                item_status_ids.add(id)
+            else:
+                item_location_ids.add(id)
+        return cls(
+            item_types, item_status_ids, item_location_ids, project_id=project_id
+        )
+
+    def get_item(self, id):
+        """Return an item of the project (preloaded or as an `ItemInfo`), or None if the project has no such item."""
+        if self.items is not None:
+            return self.items.get(id)
+        from items.models import Item
+
+        row = (
+            Item.objects.filter(project_id=self.project_id, id=id)
+            .values_list("id", "parent_id", "item_type_id", "path")
+            .first()
+        )
+        return ItemInfo(*row) if row else None
+
+    def find_ancestor_ids(self, item, parent):
+        """Return the ids of an item's ancestors below its (pending) parent, from the root, stopping at any cycle."""
+        if self.items is None:
+            # Only the item's own write is pending, so the parent's stored path is up to date
+            return [*split_path(parent.path), parent.id]
+        ancestor_ids = []
+        current_id = item.parent_id
+        while current_id is not None and current_id not in ancestor_ids:
+            ancestor_ids.append(current_id)
+            current = self.items.get(current_id)
+            current_id = current.parent_id if current is not None else None
+        return ancestor_ids[::-1]
+
+    def get_subtree(self, item):
+        """Return the items of the subtree below an item (preloaded or as `ItemInfo`s), by id."""
+        if self.items is not None:
+            return self.items
+        from items.models import Item
+
+        subtree_path = join_path([*split_path(item.path), item.id])
+        return {
+            row[0]: ItemInfo(*row)
+            for row in Item.objects.filter(
+                project_id=self.project_id, path__startswith=subtree_path
+            ).values_list("id", "parent_id", "item_type_id", "path")
+        }
+
+
+def _get_contexts():
+    contexts = getattr(_local, "contexts", None)
+    if contexts is None:
+        contexts = _local.contexts = {}
+    return contexts
+
+
+def get_validation_context(project_id):
+    """Return the cached context for a project, loading it if it is not cached."""
+    contexts = _get_contexts()
+    context = contexts.get(project_id)
+    if context is None:
+        context = contexts[project_id] = ItemValidationContext.load(project_id)
+    return context
+
+
+def invalidate_validation_context(project_id=None):
+    """Remove the cached context for a project, or for all projects if no project is given."""
+    if project_id is None:
+        _get_contexts().clear()
+    else:
+        _get_contexts().pop(project_id, None)
+
+
+def validate_item(item, context):
+    """Validate an item (with any pending changes applied) against a context, raising a `ValidationError`.
+
+    Strips whitespace from the title and changelog.
+    """
+    item.title = item.title.strip()  # Strip whitespace
+    item.changelog = item.changelog.strip()  # Strip whitespace
+
+    if not item.title:
+        raise ValidationError(_(f"{item.__class__.__name__} title cannot be empty."))
+
+    if item._original_project_id and item.project_id != item._original_project_id:
+        raise ValidationError(_("An item cannot change project once created."))
+
+    if item.item_type_id not in context.item_types:
+        raise ValidationError(
+            _(
+                "Item type attribute selection must belong to the same project as the item."
+            )
+        )
+
+    if item.item_status_id not in context.item_status_ids:
+        raise ValidationError(
+            _(
+                "Item status attribute selection must belong to the same project as the item."
+            )
+        )
+
+    if item.item_location_id not in context.item_location_ids:
+        raise ValidationError(
+            _(
+                "Item location attribute selection must belong to the same project as the item."
+            )
+        )
+
+    if context.items is None and not _hierarchy_changed(item):
+        return  # The item's existing place in the hierarchy was validated when it was written
+
+    if item.parent_id:
+        if item.id is not None and item.parent_id == item.id:
+            raise ValidationError(_("An item cannot be its own parent."))
+
+        parent = context.get_item(item.parent_id)
+        if parent is None:
+            raise ValidationError(
+                _("An item must belong to the same project as its parent.")
+            )
+
+        if item.id is not None and item.id in context.find_ancestor_ids(item, parent):
+            raise ValidationError(_("An item cannot be its own ancestor."))
+
+        validate_nesting(
+            context.item_types[item.item_type_id],
+            context.item_types[parent.item_type_id],
+        )
+
+
+def _hierarchy_changed(item):
+    """Return whether an item is new or its parent or type has changed since it was loaded."""
+    return (
+        item._state.adding
+        or item.parent_id != item._original_parent_id
+        or item.item_type_id != item._original_item_type_id
+    )
+
+
+def validate_nesting(item_type, parent_item_type):
+    """Validate that an item of one type can be nested below an item of another, raising a `ValidationError`."""
+    if item_type.id == parent_item_type.id:
+        if not item_type.nestable:
+            raise ValidationError(
+                _(
+                    "An item cannot be the same type as its parent unless they are both of the same nestable type."
+                )
+            )
+    elif item_type.order <= parent_item_type.order:
+        raise ValidationError(
+            _(
+                "An item must be 'below' its parent in the hierarchy unless they are of the same nestable type."
+            )
+        )
+
+
+def validate_subtree(item, context):
+    """Validate moving an item (with its pending parent applied) and all its descendants, raising a `ValidationError`.
+
+    Walks the subtree once (loading only its items, if the context has not preloaded them), checking every item against
+    its parent's type with the project's current type orders.
+    """
+    validate_item(item, context)
+
+    subtree = context.get_subtree(item)
+    child_lookup = {}
+    for id, info in subtree.items():
+        child_lookup.setdefault(info.parent_id, []).append(id)
+
+    item_type_ids = {id: info.item_type_id for id, info in subtree.items()}
+    item_type_ids[item.id] = item.item_type_id
+    parents_to_process = [item.id]
+    while parents_to_process:
+        parent_id = parents_to_process.pop()
+        parent_item_type = context.item_types[item_type_ids[parent_id]]
+        for child_id in child_lookup.get(parent_id, []):
+            validate_nesting(
+                context.item_types[item_type_ids[child_id]], parent_item_type
+            )
+            parents_to_process.append(child_id)